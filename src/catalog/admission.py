@@ -0,0 +1,228 @@
+"""
+Admission control of the rpc calls of the catalog component.
+grpc.server queues every rpc call that finds no free thread in its thread pool, without a bound, so a load spike
+makes every caller wait until its deadline. Instead, rpc calls wait in a priority queue of a bounded depth:
+orders run before queries, and a call that finds the queue of its priority full is rejected at once
+with RESOURCE_EXHAUSTED. Rejections run on a thread of their own, so they do not wait for a free worker thread.
+
+The interceptor and the executor work together. grpc calls the interceptor and then submits the call
+to the executor on the same thread of the server, so the interceptor hands the priority of the call
+to the executor through a thread-local variable. grpc does not document this order, so the server also bounds
+the rpc calls in progress with maximum_concurrent_rpcs, which grpc rejects before they reach the executor
+(see ADMISSION_MAX_RPCS in catalog.py).
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent import futures
+
+import grpc
+
+from metrics import LATENCY_BOUNDS
+
+# Priorities of rpc calls (lower runs first)
+# Control calls (ex. Metrics, streams of replicas and front-ends) are never shed,
+# and rejections run on a thread of their own (see PriorityExecutor)
+REJECTION, CONTROL, ORDER, QUERY = -1, 0, 1, 2
+
+# The priority of each rpc call that can be shed
+PRIORITIES = {
+    'Order': ORDER,
+    'OrderMany': ORDER,
+    'CancelMany': ORDER,
+    'Query': QUERY,
+    'QueryMany': QUERY,
+    'ListProducts': QUERY,
+}
+
+# Names of the priorities in metrics
+PRIORITY_NAMES = {ORDER: 'orders', QUERY: 'queries'}
+
+
+class PriorityExecutor(futures.Executor):
+    """
+    An executor with a fixed number of worker threads that runs submitted work by priority
+    Work of the same priority runs in the order it was submitted.
+    Rejections run on a thread of their own, which never runs other work, so a rejection is sent at once
+    even when every worker thread is busy.
+    """
+
+    def __init__(self, max_workers, metrics=None):
+        """
+        :param max_workers: number of worker threads
+        :param metrics: a Metrics instance that reports the queue depth and the wait in the queue (optional)
+        """
+        # A heap of (priority, submission number, submission time, future, function, args, kwargs)
+        self.queue = []
+        self.counter = itertools.count()
+
+        # The number of queued work items of each priority and the number of running work items
+        self.queued_counts = [0] * (max(PRIORITIES.values()) + 1)
+        self.running = 0
+
+        self.condition = threading.Condition()
+        self.shutting_down = False
+        self.metrics = metrics
+
+        # The priority of the next submission on each thread (see prioritize)
+        self.local = threading.local()
+
+        # The thread that runs rejections
+        self.rejection_executor = futures.ThreadPoolExecutor(max_workers=1)
+
+        if metrics is not None:
+            metrics.derive('admission_queue_depth', lambda metrics: sum(self.queued_counts))
+            metrics.derive('admission_running', lambda metrics: self.running)
+            for priority, name in PRIORITY_NAMES.items():
+                metrics.derive('admission_queue_depth_%s' % name,
+                               lambda metrics, priority=priority: self.queued_counts[priority])
+
+        # Start the worker threads
+        self.threads = [threading.Thread(target=self.work, daemon=True) for _ in range(max_workers)]
+        for t in self.threads:
+            t.start()
+
+    def prioritize(self, priority):
+        """
+        Set the priority of the next work submitted by this thread
+        """
+        self.local.priority = priority
+
+    def queued(self, priority):
+        """
+        Get the number of queued work items that run before new work of a priority
+        :param priority: the priority of the new work
+        :return: the number of queued work items of the same or a higher priority
+                 (rejections and control calls are quick, so they are not counted)
+        """
+        return sum(self.queued_counts[CONTROL + 1:priority + 1])
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs) with the priority set by prioritize (CONTROL if it was not set)
+        :return: a Future of the result
+        """
+        priority = getattr(self.local, 'priority', CONTROL)
+        self.local.priority = CONTROL
+        if priority == REJECTION:
+            return self.rejection_executor.submit(fn, *args, **kwargs)
+
+        future = futures.Future()
+        self.condition.acquire()
+        if self.shutting_down:
+            self.condition.release()
+            raise RuntimeError('cannot schedule new futures after shutdown')
+        heapq.heappush(self.queue, (priority, next(self.counter), time.monotonic(), future, fn, args, kwargs))
+        self.queued_counts[priority] += 1
+        self.condition.notify()
+        self.condition.release()
+        return future
+
+    def work(self):
+        """
+        Run queued work until the executor shuts down
+        This function will be executed in each worker thread
+        """
+        while True:
+            # Wait for queued work
+            self.condition.acquire()
+            while len(self.queue) == 0 and not self.shutting_down:
+                self.condition.wait()
+            if len(self.queue) == 0:
+                self.condition.release()
+                return
+            priority, _, submitted, future, fn, args, kwargs = heapq.heappop(self.queue)
+            self.queued_counts[priority] -= 1
+            self.running += 1
+            self.condition.release()
+
+            if self.metrics is not None and priority != CONTROL:
+                self.metrics.observe('admission_wait_us', (time.monotonic() - submitted) * 1000000, LATENCY_BOUNDS)
+
+            # Run the work unless it has been cancelled
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+
+            self.condition.acquire()
+            self.running -= 1
+            self.condition.release()
+
+    def shutdown(self, wait=True, **kwargs):
+        """
+        Stop the worker threads after the queued work has run
+        """
+        self.condition.acquire()
+        self.shutting_down = True
+        self.condition.notify_all()
+        self.condition.release()
+        self.rejection_executor.shutdown(wait)
+        if wait:
+            for t in self.threads:
+                t.join()
+
+
+class AdmissionInterceptor(grpc.ServerInterceptor):
+    """
+    A server interceptor that sheds rpc calls when the queue of a PriorityExecutor is too deep
+    and gives the other rpc calls their priority in the executor
+    """
+
+    def __init__(self, executor, queue_limits, metrics):
+        """
+        :param executor: the PriorityExecutor of the server
+        :param queue_limits: a dictionary that maps priorities to the most queued work items
+                             that a new rpc call of the priority waits behind
+        :param metrics: the Metrics instance that counts shed and expired rpc calls
+        """
+        self.executor = executor
+        self.queue_limits = queue_limits
+        self.metrics = metrics
+
+    def intercept_service(self, continuation, handler_call_details):
+        """
+        Admit or reject an rpc call
+        Called by the server thread right before the rpc call is submitted to the executor
+        """
+        method = handler_call_details.method.rsplit('/', 1)[-1]
+        priority = PRIORITIES.get(method, CONTROL)
+
+        if priority == CONTROL:
+            self.executor.prioritize(CONTROL)
+            return continuation(handler_call_details)
+
+        if self.executor.queued(priority) >= self.queue_limits[priority]:
+            # Reject the call at once on the thread of the rejections
+            self.metrics.increment('admission_shed_%s' % PRIORITY_NAMES[priority])
+            self.executor.prioritize(REJECTION)
+            return grpc.unary_unary_rpc_method_handler(self.reject)
+
+        self.executor.prioritize(priority)
+        handler = continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None:
+            return handler
+        return handler._replace(unary_unary=self.expire(handler.unary_unary, priority))
+
+    def reject(self, request, context):
+        """
+        Behavior of a shed rpc call
+        """
+        context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, 'catalog overloaded')
+
+    def expire(self, behavior, priority):
+        """
+        Wrap the behavior of an rpc call so that a call whose deadline passed while it was queued is not run
+        The caller has already given up on such a call, so running it would only delay the calls behind it.
+        """
+        def run(request, context):
+            time_remaining = context.time_remaining()
+            if time_remaining is not None and time_remaining <= 0:
+                self.metrics.increment('admission_expired_%s' % PRIORITY_NAMES[priority])
+                context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, 'deadline exceeded in the admission queue')
+            return behavior(request, context)
+
+        return run
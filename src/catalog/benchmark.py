@@ -0,0 +1,284 @@
+"""
+This file is made to measure the performance of the catalog component in a single process.
+RPC handlers of CatalogServicer are called directly from several threads so that only the catalog is measured.
+ex. python3 benchmark.py --experiment contention --n_requests 20000
+ex. python3 benchmark.py --experiment memory --sizes 10000,100000,1000000
+ex. python3 benchmark.py --experiment durability --modes flush,fsync,group --data_dir data
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import catalog_pb2 as pb2
+import make_initial_csv
+from csv_tools import write_csv
+from catalog import CatalogServicer
+from stores import open_store
+
+
+def parse():
+    """
+    This function will be used to parse input arguments to the main function
+    Returns: arguments
+    """
+    parser = argparse.ArgumentParser(description='Measure the performance of the catalog component.')
+    parser.add_argument('--experiment', type=str, default='contention')
+    parser.add_argument('--n_products', type=int, default=1000)
+    parser.add_argument('--n_requests', type=int, default=20000)
+    parser.add_argument('--n_threads', type=str, default='1,2,4,8,16')
+    parser.add_argument('--lock_stripes', type=int, default=64)
+    parser.add_argument('--n_writers', type=str, default='0,1,4')
+    parser.add_argument('--duration', type=float, default=2)
+    parser.add_argument('--sizes', type=str, default='10000,100000,1000000')
+    parser.add_argument('--stores', type=str, default='csv,columnar')
+    parser.add_argument('--modes', type=str, default='flush,fsync,group')
+    parser.add_argument('--group_commit_window', type=float, default=0.002)
+    parser.add_argument('--group_commit_max_batch', type=int, default=64)
+    # Directory of the catalog files and write-ahead logs (default: a temporary directory)
+    # fsync costs depend on the disk, so use a directory on the disk of the catalog component
+    parser.add_argument('--data_dir', type=str, default=None)
+
+    args = parser.parse_args()
+    return args
+
+
+def make_catalog_file(n_products, quantity=100000000, data_dir=None):
+    """
+    Write a catalog file with generated products in a temporary directory
+    :param n_products: number of products to write
+    :param quantity: initial quantity of each product
+    :param data_dir: directory that contains the temporary directory (default: the system temporary directory)
+    :return: path to the catalog file
+    """
+    fields = ["product_name", "price", "quantity"]
+    rows = [["product_%d" % i, '%.2f' % (10 + i % 20), quantity] for i in range(n_products)]
+
+    file_name = os.path.join(tempfile.mkdtemp(dir=data_dir), "catalog.csv")
+    write_csv(file_name, [fields] + rows)
+    return file_name
+
+
+def make_servicer(n_products, data_dir=None, **kwargs):
+    """
+    Make a CatalogServicer with a generated catalog
+    """
+    return make_servicer_from_file(make_catalog_file(n_products, data_dir=data_dir), **kwargs)
+
+
+def make_servicer_from_file(catalog_file, **kwargs):
+    """
+    Make a CatalogServicer with a catalog file
+    Invalidate requests are not sent so that only the catalog is measured
+    """
+    servicer = CatalogServicer(catalog_file, **kwargs)
+    servicer.invalidate = lambda product_name, version: None
+    servicer.invalidate_many = lambda product_names, versions: None
+    return servicer
+
+
+def run_threads(n_threads, target):
+    """
+    Run target(thread_id) in n_threads threads and measure the elapsed time
+    :return: elapsed time in seconds
+    """
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n_threads)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.time() - start
+
+
+def contention(args):
+    """
+    Buy throughput of concurrent clients that order disjoint products
+    with a single global lock (1 stripe) and with a striped lock
+    """
+    n_threads_list = [int(n) for n in args.n_threads.split(',')]
+
+    results = []
+    for lock_stripes in (1, args.lock_stripes):
+        for n_threads in n_threads_list:
+            servicer = make_servicer(args.n_products, lock_stripes=lock_stripes)
+            n_requests = args.n_requests // n_threads
+
+            # Each thread orders products that no other thread orders
+            def buy(thread_id):
+                names = ["product_%d" % i for i in range(thread_id, args.n_products, n_threads)]
+                for i in range(n_requests):
+                    servicer.Order(pb2.order(product_name=names[i % len(names)], quantity=1), None)
+
+            elapsed = run_threads(n_threads, buy)
+            results.append((lock_stripes, n_threads, n_requests * n_threads / elapsed))
+
+    return ["stripes", "clients", "buys/s"], results
+
+
+def reads(args):
+    """
+    Query throughput of concurrent readers while writers keep ordering products
+    """
+    n_threads_list = [int(n) for n in args.n_threads.split(',')]
+    n_writers_list = [int(n) for n in args.n_writers.split(',')]
+
+    results = []
+    for n_writers in n_writers_list:
+        for n_threads in n_threads_list:
+            servicer = make_servicer(args.n_products)
+            stop = threading.Event()
+            counts = [0] * (n_threads + n_writers)
+
+            # The first n_threads threads are readers and the others are writers
+            def run(thread_id):
+                i = thread_id
+                while not stop.is_set():
+                    product_name = "product_%d" % (i % args.n_products)
+                    if thread_id < n_threads:
+                        servicer.Query(pb2.product(product_name=product_name), None)
+                    else:
+                        servicer.Order(pb2.order(product_name=product_name, quantity=1), None)
+                    counts[thread_id] += 1
+                    i += 7
+
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(n_threads + n_writers)]
+            for t in threads:
+                t.start()
+            time.sleep(args.duration)
+            stop.set()
+            for t in threads:
+                t.join()
+
+            results.append((n_writers, n_threads, sum(counts[:n_threads]) / args.duration,
+                            sum(counts[n_threads:]) / args.duration))
+
+    return ["writers", "readers", "queries/s", "buys/s"], results
+
+
+def memory(args):
+    """
+    Memory and latency of storage engines at several catalog sizes
+    Catalog files are generated by make_initial_csv.py.
+    The memory is what the records of the storage engine keep after loading the catalog file,
+    and the copy time is the part of a checkpoint that holds every lock.
+    """
+    sizes = [int(n) for n in args.sizes.split(',')]
+    stores = args.stores.split(',')
+
+    results = []
+    for n_products in sizes:
+        # Generate the catalog file once for each size
+        generated = os.path.join(tempfile.mkdtemp(), "catalog.csv")
+        make_initial_csv.main(argparse.Namespace(file_name=generated, binary=None, n_products=n_products,
+                                                 quantity=100000000))
+
+        for store in stores:
+            # Each storage engine gets its own copy of the catalog file and its own write-ahead log
+            file_name = os.path.join(tempfile.mkdtemp(), "catalog.csv")
+            shutil.copy(generated, file_name)
+
+            # Measure the memory and the time to load the catalog file
+            tracemalloc.start()
+            start = time.time()
+            loaded = open_store(store, file_name)
+            load_time = time.time() - start
+            size = tracemalloc.get_traced_memory()[0] / 2 ** 20
+            tracemalloc.stop()
+            loaded.wal.file.close()
+            del loaded
+
+            servicer = make_servicer_from_file(file_name, store=store)
+            names = [record[0] for record in servicer.catalog]
+            random.seed(0)
+            samples = [random.choice(names) for _ in range(args.n_requests)]
+
+            # Average latency of Query and Order calls
+            start = time.time()
+            for product_name in samples:
+                servicer.Query(pb2.product(product_name=product_name), None)
+            query_latency = (time.time() - start) / len(samples) * 1e6
+
+            start = time.time()
+            for product_name in samples:
+                servicer.Order(pb2.order(product_name=product_name, quantity=1), None)
+            order_latency = (time.time() - start) / len(samples) * 1e6
+
+            # Time to copy the records while holding every lock, and time of a whole checkpoint
+            start = time.time()
+            servicer.store.copy_records()
+            copy_time = (time.time() - start) * 1e3
+
+            start = time.time()
+            servicer.store.checkpoint(servicer.catalog_lock)
+            checkpoint_time = time.time() - start
+
+            results.append((n_products, store, size, load_time, copy_time, checkpoint_time,
+                            query_latency, order_latency))
+            del servicer, names, samples
+
+    return ["products", "store", "MB", "load s", "copy ms", "ckpt s", "query us", "order us"], results
+
+
+def durability(args):
+    """
+    Buy throughput and latency of concurrent clients in each durability mode
+    Latencies are measured around each Order call, and the fsyncs and group commit sizes are read from the metrics.
+    """
+    n_threads_list = [int(n) for n in args.n_threads.split(',')]
+    modes = args.modes.split(',')
+
+    results = []
+    for mode in modes:
+        for n_threads in n_threads_list:
+            servicer = make_servicer(args.n_products, data_dir=args.data_dir, durability=mode,
+                                     group_commit_window=args.group_commit_window,
+                                     group_commit_max_batch=args.group_commit_max_batch)
+            n_requests = args.n_requests // n_threads
+            latencies = [[] for _ in range(n_threads)]
+
+            # Each thread orders products that no other thread orders
+            def buy(thread_id):
+                names = ["product_%d" % i for i in range(thread_id, args.n_products, n_threads)]
+                for i in range(n_requests):
+                    start = time.time()
+                    servicer.Order(pb2.order(product_name=names[i % len(names)], quantity=1), None)
+                    latencies[thread_id].append(time.time() - start)
+
+            elapsed = run_threads(n_threads, buy)
+            latencies = sorted(latency for thread_latencies in latencies for latency in thread_latencies)
+            metrics = servicer.metrics.snapshot()
+            fsyncs = metrics.get('wal_fsyncs', 0)
+            group_size = metrics['group_commit_size_sum'] / metrics['group_commit_size_count'] \
+                if metrics.get('group_commit_size_count', 0) > 0 else 0.0
+
+            results.append((mode, n_threads, len(latencies) / elapsed,
+                            latencies[len(latencies) // 2] * 1e6, latencies[int(len(latencies) * 0.99)] * 1e6,
+                            fsyncs, float(group_size)))
+
+    return ["mode", "clients", "buys/s", "p50 us", "p99 us", "fsyncs", "group"], results
+
+
+def main():
+    args = parse()
+    experiment = {'contention': contention, 'reads': reads, 'memory': memory, 'durability': durability}[args.experiment]
+
+    # disable print while running the experiment
+    sys.stdout = open(os.devnull, 'w')
+    fields, results = experiment(args)
+    sys.stdout = sys.__stdout__
+
+    # Print the results as a table
+    print(("%12s" * len(fields)) % tuple(fields))
+    for row in results:
+        print(("%12s" * len(row)) % tuple("%.1f" % value if isinstance(value, float) else value for value in row))
+
+
+if __name__ == '__main__':
+    main()
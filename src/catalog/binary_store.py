@@ -0,0 +1,226 @@
+"""
+A catalog file format that keeps each product in a fixed-width record so that it can be used through mmap.
+The file starts with a header (magic, number of records, record size) followed by the records.
+Records added by imports may leave unused space at the end of the file for the next records.
+Each record has a product name (64 bytes), a price in cents (8 bytes integer) and a quantity (8 bytes integer).
+
+Conversion between csv and binary catalog files:
+ex. python3 binary_store.py csv2bin data/catalog.csv data/catalog.bin
+ex. python3 binary_store.py bin2csv data/catalog.bin data/catalog.csv
+"""
+
+import argparse
+import mmap
+import struct
+import threading
+
+from csv_tools import read_catalog, write_catalog
+
+MAGIC = b'TOYCAT01'
+HEADER = struct.Struct('<8sII')
+NAME = struct.Struct('<64s')
+VALUE = struct.Struct('<qq')
+RECORD_SIZE = NAME.size + VALUE.size
+
+# Columns of the catalog
+FIELDS = ["product_name", "price", "quantity"]
+
+
+class BinaryStore(object):
+    """
+    A storage engine that keeps the catalog in a memory-mapped binary catalog file
+    An update writes the price and the quantity of a product in place and marks the page as dirty.
+    Checkpoints only flush dirty pages to disk.
+    The store can be used as the sequence of (product_name, price in cents, quantity) records of the catalog.
+    """
+
+    def __init__(self, file_name):
+        """
+        :param file_name: path to the binary catalog file
+        """
+        self.file_name = file_name
+        self.fields = FIELDS
+
+        # Map the whole file in memory
+        self.file = open(file_name, 'r+b')
+        self.mmap = mmap.mmap(self.file.fileno(), 0)
+
+        # Check the header
+        magic, self.n_records, record_size = HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC or record_size != RECORD_SIZE or len(self.mmap) < offset(self.n_records):
+            raise ValueError('"%s" is not a valid binary catalog file' % file_name)
+
+        # Product names never change, so they are decoded only once
+        self.names = [decode(NAME.unpack_from(self.mmap, offset(i))[0]) for i in range(self.n_records)]
+
+        # Pages that have been modified since the last checkpoint
+        self.dirty_pages = set()
+        self.dirty_pages_lock = threading.Lock()
+
+        # The store is used as the list of records
+        self.records = self
+
+    def __len__(self):
+        return self.n_records
+
+    def __iter__(self):
+        for i in range(self.n_records):
+            yield self[i]
+
+    def __getitem__(self, index):
+        """
+        Read a record from the mapped file
+        :return: (product_name, price in cents, quantity)
+        """
+        price, quantity = VALUE.unpack_from(self.mmap, offset(index) + NAME.size)
+        return self.names[index], price, quantity
+
+    def __setitem__(self, index, record):
+        """
+        Write the price and the quantity of a record in place
+        The values are written with one copy, so readers see either the old or the new values
+        :param record: (product_name, price in cents, quantity)
+        """
+        product_name, price, quantity = record
+        VALUE.pack_into(self.mmap, offset(index) + NAME.size, price, quantity)
+
+        # Mark the pages of the record as dirty
+        start = offset(index) + NAME.size
+        self.dirty_pages_lock.acquire()
+        for page in range(start // mmap.PAGESIZE, (start + VALUE.size - 1) // mmap.PAGESIZE + 1):
+            self.dirty_pages.add(page)
+        self.dirty_pages_lock.release()
+
+    def append(self, record):
+        """
+        Add a record after the last record
+        The file grows to twice its records when it is full. The grown file is mapped again; the old mapping is
+        a shared mapping of the same file, so writers that still use it write to the same pages.
+        :param record: (product_name, price in cents, quantity)
+        """
+        product_name, price, quantity = record
+        if len(product_name.encode()) > NAME.size:
+            raise ValueError('"%s" does not fit in a fixed-width record' % product_name)
+
+        if len(self.mmap) < offset(self.n_records + 1):
+            self.mmap.flush()
+            self.file.truncate(offset(max(2 * self.n_records, self.n_records + 1024)))
+            self.mmap = mmap.mmap(self.file.fileno(), 0)
+
+        # Write the record before it is counted, so readers never see an unwritten record
+        NAME.pack_into(self.mmap, offset(self.n_records), product_name.encode())
+        self.names.append(product_name)
+        self[self.n_records] = record
+        self.n_records += 1
+        HEADER.pack_into(self.mmap, 0, MAGIC, self.n_records, RECORD_SIZE)
+
+        # Mark the pages of the header and of the name as dirty (the values are marked by __setitem__)
+        start = offset(self.n_records - 1)
+        self.dirty_pages_lock.acquire()
+        self.dirty_pages.add(0)
+        for page in range(start // mmap.PAGESIZE, (start + NAME.size - 1) // mmap.PAGESIZE + 1):
+            self.dirty_pages.add(page)
+        self.dirty_pages_lock.release()
+
+    def log(self, records):
+        """
+        Updates are already in the mapped file, so nothing has to be logged
+        """
+        return
+
+    def sync(self, sequence):
+        """
+        Pages are written to disk by checkpoints, so there is nothing to wait for
+        """
+        return
+
+    def checkpoint(self, catalog_lock):
+        """
+        Flush the pages that have been modified since the last checkpoint
+        :param catalog_lock: the lock of the catalog (not needed since each page is flushed as it is)
+        """
+        self.dirty_pages_lock.acquire()
+        dirty_pages, self.dirty_pages = sorted(self.dirty_pages), set()
+        self.dirty_pages_lock.release()
+
+        for page in dirty_pages:
+            start = page * mmap.PAGESIZE
+            self.mmap.flush(start, min(mmap.PAGESIZE, len(self.mmap) - start))
+
+
+def offset(index):
+    """
+    Position of a record in the binary catalog file
+    """
+    return HEADER.size + index * RECORD_SIZE
+
+
+def decode(value):
+    """
+    Decode a null-padded string
+    """
+    return value.rstrip(b'\0').decode()
+
+
+def write_binary(file_name, rows):
+    """
+    Write a binary catalog file
+    :param file_name: path of the file
+    :param rows: (product_name, price in cents, quantity) of each product
+    """
+    with open(file_name, 'wb') as binfile:
+        binfile.write(HEADER.pack(MAGIC, len(rows), RECORD_SIZE))
+        for product_name, price, quantity in rows:
+            if len(product_name.encode()) > NAME.size:
+                raise ValueError('"%s" does not fit in a fixed-width record' % product_name)
+            binfile.write(NAME.pack(product_name.encode()) + VALUE.pack(int(price), int(quantity)))
+
+
+def read_binary(file_name):
+    """
+    Read a binary catalog file
+    :param file_name: path of the file
+    :return:
+        fields: Column information
+        rows: Each row will contain data for each product
+    """
+    store = BinaryStore(file_name)
+    rows = [list(record) for record in store]
+    store.mmap.close()
+    store.file.close()
+    return store.fields, rows
+
+
+def csv2bin(csv_file, binary_file):
+    """
+    Convert a csv catalog file to a binary catalog file
+    """
+    _, rows = read_catalog(csv_file)
+    write_binary(binary_file, rows)
+
+
+def bin2csv(binary_file, csv_file):
+    """
+    Convert a binary catalog file to a csv catalog file
+    """
+    fields, rows = read_binary(binary_file)
+    write_catalog(csv_file, fields, rows)
+
+
+def parse():
+    """
+    This function will be used to parse input arguments to the main function
+    Returns: arguments
+    """
+    parser = argparse.ArgumentParser(description='Convert catalog files between csv and binary.')
+    parser.add_argument('conversion', type=str, choices=['csv2bin', 'bin2csv'])
+    parser.add_argument('input_file', type=str)
+    parser.add_argument('output_file', type=str)
+
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == '__main__':
+    args = parse()
+    {'csv2bin': csv2bin, 'bin2csv': bin2csv}[args.conversion](args.input_file, args.output_file)
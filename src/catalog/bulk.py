@@ -0,0 +1,108 @@
+"""
+Import products into running catalog components and export their products, without restarting them.
+A csv file in the format of the catalog file is streamed to the ImportProducts rpc call of each shard in chunks,
+and the ExportProducts rpc call of each shard is streamed back to a csv file, so only one chunk is kept in memory.
+ex. python3 bulk.py import data/new_season.csv --shards 127.0.0.1:1130,127.0.0.1:1131
+ex. python3 bulk.py export data/export.csv --shards 127.0.0.1:1130,127.0.0.1:1131
+
+Each product is sent to the shard that owns it (see catalog_router.py).
+Imported products are added if they are new and get the imported price and quantity otherwise.
+"""
+
+import argparse
+import csv
+
+import catalog_pb2 as pb2
+from catalog_router import CatalogRouter, parse_shards
+from csv_tools import parse_cents, format_cents, TRAILER
+
+# Columns of the exported csv file
+FIELDS = ["product_name", "price", "quantity"]
+
+
+def parse():
+    """
+    This function will be used to parse input arguments to the main function
+    Returns: arguments
+    """
+    parser = argparse.ArgumentParser(description='Import products into catalog components or export their products.')
+    parser.add_argument('operation', type=str, choices=['import', 'export'])
+    parser.add_argument('file_name', type=str)
+    # Comma separated addresses of the catalog shards in the order of CATALOG_SHARDS
+    parser.add_argument('--shards', type=str, default='127.0.0.1:1130')
+    # Number of products in each chunk of the stream
+    parser.add_argument('--chunk_size', type=int, default=1000)
+
+    args = parser.parse_args()
+    return args
+
+
+def read_chunks(file_name, chunk_size, owner=None):
+    """
+    Read a csv catalog file in chunks of product_info messages
+    :param file_name: path to the csv file with a header of product_name,price,quantity
+    :param chunk_size: number of products in each chunk
+    :param owner: a function that tells whether a product is sent (default: every product)
+    :return: an iterator of product_chunk messages
+    """
+    with open(file_name, 'r') as csvfile:
+        csvreader = csv.reader(csvfile)
+
+        # Skip the header
+        next(csvreader, None)
+
+        products = []
+        for row in csvreader:
+            # Skip the trailer of a catalog file written by a checkpoint
+            if row[0] == TRAILER:
+                continue
+            if owner is not None and not owner(row[0]):
+                continue
+            products.append(pb2.product_info(product_name=row[0], price=row[1], price_cents=parse_cents(row[1]),
+                                             quantity=int(row[2])))
+            if len(products) == chunk_size:
+                yield pb2.product_chunk(products=products)
+                products = []
+
+        if len(products) > 0:
+            yield pb2.product_chunk(products=products)
+
+
+def import_products(router, file_name, chunk_size):
+    """
+    Stream the products of a csv file to the shards that own them
+    The file is read once for each shard, so memory does not grow with the size of the file.
+    """
+    for shard, stub in router.stubs.items():
+        chunks = read_chunks(file_name, chunk_size, lambda product_name: router.ring.owner(product_name) == shard)
+        result = stub.ImportProducts(chunks)
+        print("%s: added %d, updated %d, rejected %d" % (shard, result.added, result.updated, result.rejected))
+
+
+def export_products(router, file_name, chunk_size):
+    """
+    Stream the products of every shard to a csv file
+    """
+    with open(file_name, 'w') as csvfile:
+        csvwriter = csv.writer(csvfile)
+        csvwriter.writerow(FIELDS)
+
+        for shard, stub in router.stubs.items():
+            n_products = 0
+            for chunk in stub.ExportProducts(pb2.export_request(chunk_size=chunk_size)):
+                csvwriter.writerows((product.product_name, format_cents(product.price_cents), product.quantity)
+                                    for product in chunk.products)
+                n_products += len(chunk.products)
+            print("%s: exported %d" % (shard, n_products))
+
+
+def main(args):
+    router = CatalogRouter(parse_shards(args.shards))
+    if args.operation == 'import':
+        import_products(router, args.file_name, args.chunk_size)
+    else:
+        export_products(router, args.file_name, args.chunk_size)
+
+
+if __name__ == '__main__':
+    main(parse())
@@ -1,74 +1,306 @@
 # Import required packages
 import threading
+import itertools
+import asyncio
 import grpc
 from concurrent import futures
-from readerwriterlock import rwlock
 import time
+import queue
 import os, sys
-import copy
 
 # Import other files
 import catalog_pb2 as pb2
 import catalog_pb2_grpc as pb2_grpc
 import front_end_pb2, front_end_pb2_grpc
-from csv_tools import read_catalog, write_csv
+from striped_lock import StripedLock
+from stores import open_store
+from restock_scheduler import RestockScheduler
+from csv_tools import read_restock_config, format_cents, parse_cents
+from binary_store import NAME
+from metrics import Metrics, LATENCY_BOUNDS
+from invalidation import InvalidationBatcher, InvalidationSender
+from change_log import ChangeLog
+from dedup import DedupTable
+from product_index import ProductIndex
+from admission import PriorityExecutor, AdmissionInterceptor, ORDER, QUERY
+from sync_replication import SyncReplication
 
 # Get the value for CATALOG_FILE, CATALOG_PORT, and MAX_WORKERS
 # through the os.getenv function.
+# Invalidations are pushed to the front-end component at FRONT_HOST:FRONT_PORT (an empty FRONT_HOST disables the push)
 FRONT_HOST = os.getenv("FRONT_HOST", "127.0.0.1")
 FRONT_PORT = int(os.getenv("FRONT_PORT", 1111))
 CATALOG_FILE = os.getenv("CATALOG_FILE", "data/catalog.csv")
+WAL_FILE = os.getenv("WAL_FILE", os.path.splitext(CATALOG_FILE)[0] + ".wal")
 CATALOG_PORT = int(os.getenv("CATALOG_PORT", 1130))
+
+# The server that runs the catalog ('thread': grpc.server with a thread pool of MAX_WORKERS threads,
+# 'asyncio': grpc.aio server that handles every rpc call on one event loop)
+CATALOG_SERVER = os.getenv("CATALOG_SERVER", "thread")
+
+# The storage engine of the catalog ('csv': csv catalog file with a write-ahead log,
+# 'columnar': same files as 'csv' with compact columnar records in memory, 'mmap': binary catalog file)
+CATALOG_STORE = os.getenv("CATALOG_STORE", "csv")
 MAX_WORKERS = int(os.getenv("MAX_WORKERS", 100))
 
-# The time interval between restock attempts
-RESTOCK_INTERVAL = int(os.getenv("RESTOCK_INTERVAL", 10))
+# The most queued rpc calls that a new order waits behind, and that a new query waits behind
+# Orders run before queries, and a call that finds a full queue is rejected with RESOURCE_EXHAUSTED
+# (thread server only, 0: no admission control)
+ADMISSION_QUEUE = int(os.getenv("ADMISSION_QUEUE", 200))
+ADMISSION_QUERY_QUEUE = int(os.getenv("ADMISSION_QUERY_QUEUE", 50))
+
+# The most rpc calls in progress (running, queued or streaming) before grpc rejects new calls
+# with RESOURCE_EXHAUSTED, whatever their priority (0: no bound)
+ADMISSION_MAX_RPCS = int(os.getenv("ADMISSION_MAX_RPCS", 1000))
+
+# The number of locks shared by the products of the catalog (1: a single global lock)
+LOCK_STRIPES = int(os.getenv("LOCK_STRIPES", 64))
+
+# The default time interval between a product going out of stock and its restock
+RESTOCK_INTERVAL = float(os.getenv("RESTOCK_INTERVAL", 10))
+
+# The default quantity of a product after its restock
+RESTOCK_LEVEL = int(os.getenv("RESTOCK_LEVEL", 100))
+
+# A csv file with the restock delay and the restock level of each product (product_name,restock_delay,restock_level)
+# Products that are not in the file use RESTOCK_INTERVAL and RESTOCK_LEVEL
+RESTOCK_FILE = os.getenv("RESTOCK_FILE", "data/restock.csv")
+
+# Seconds to coalesce invalidations before sending them to the front-end component in one batch
+INVALIDATION_WINDOW = float(os.getenv("INVALIDATION_WINDOW", 0.01))
+
+# The most invalidate requests in flight to the front-end component, the most invalidations that wait for one,
+# and the timeout of each request in seconds
+# When the queue overflows, the queued invalidations are dropped and the front-end component is asked to resync
+INVALIDATION_IN_FLIGHT = int(os.getenv("INVALIDATION_IN_FLIGHT", 2))
+INVALIDATION_QUEUE = int(os.getenv("INVALIDATION_QUEUE", 10000))
+INVALIDATION_TIMEOUT = float(os.getenv("INVALIDATION_TIMEOUT", 1))
+
+# The time interval between checkpoints that write modified data in the catalog file
+CHECKPOINT_INTERVAL = int(os.getenv("CHECKPOINT_INTERVAL", 60))
+
+# How orders are made durable before they are answered (csv and columnar stores)
+# 'flush': mutations are handed to the operating system (lost if the machine crashes)
+# 'fsync': every mutation is written to disk with its own fsync while the products are locked
+# 'group': orders wait for a group commit, where one fsync covers every order of a short window
+CATALOG_DURABILITY = os.getenv("CATALOG_DURABILITY", "flush")
+
+# Seconds the result of an order with a request ID is kept to answer its retries,
+# and the most results kept (the oldest are evicted first)
+DEDUP_TTL = float(os.getenv("DEDUP_TTL", 600))
+DEDUP_CAPACITY = int(os.getenv("DEDUP_CAPACITY", 100000))
+
+# Seconds a group commit waits for more orders before the fsync, and the number of orders that ends the wait early
+GROUP_COMMIT_WINDOW = float(os.getenv("GROUP_COMMIT_WINDOW", 0.002))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 64))
+
+# The number of invalidation events kept for the SubscribeInvalidations rpc call
+# A subscriber that falls further behind has to resynchronize its cache
+CHANGE_LOG_SIZE = int(os.getenv("CHANGE_LOG_SIZE", 10000))
+
+# The number of mutations kept for the Replicate rpc call
+# A read replica that falls further behind receives a new snapshot
+REPLICATION_LOG_SIZE = int(os.getenv("REPLICATION_LOG_SIZE", 100000))
+
+# Seconds between heartbeats sent to idle read replicas, so they can tell they are up to date
+REPLICATION_HEARTBEAT = float(os.getenv("REPLICATION_HEARTBEAT", 0.5))
+
+# The number of products in each snapshot event sent to a read replica
+SNAPSHOT_CHUNK = int(os.getenv("SNAPSHOT_CHUNK", 1000))
+
+# The default and the largest number of products in a page of the ListProducts rpc call
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", 100))
+LIST_MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", 1000))
+
+# The other catalog component of a primary / hot standby pair ('' for a catalog component without a standby)
+# and the role this component starts with ('primary' or 'standby')
+# A component whose peer already is the primary starts as the standby (ex. an old primary restarted after a failover)
+CATALOG_PEER = os.getenv("CATALOG_PEER", "")
+CATALOG_ROLE = os.getenv("CATALOG_ROLE", "primary")
+
+# Seconds an order waits for the acknowledgement of the standby before the standby is considered out of sync
+STANDBY_TIMEOUT = float(os.getenv("STANDBY_TIMEOUT", 1))
+
+# Seconds without a message from the primary after which the standby takes over
+FAILOVER_TIMEOUT = float(os.getenv("FAILOVER_TIMEOUT", 2))
+
+# Roles of the catalog components of a primary / hot standby pair
+PRIMARY, STANDBY = 'primary', 'standby'
+
+# An OrderMany and the CancelMany with the same request ID undo each other (see forget_undone)
+UNDONE_BY = {'OrderMany': 'CancelMany', 'CancelMany': 'OrderMany'}
 
 
 class CatalogServicer(pb2_grpc.CatalogServicer):
     """
     A CatalogServicer object provides Query and Order services through gRPC
     Use and modify data from self.catalog_file
+
+    Each product in self.catalog is an immutable (product_name, price, quantity) record.
+    Prices are integer numbers of cents. Replies carry both price_cents and the decimal price string
+    that older clients read.
+    Writers build a new record while holding the lock of the product and publish it with one reference swap,
+    so readers always see either the old or the new record without taking any lock.
+
+    Records are kept by a storage engine (see stores.py).
+    Every mutation is given to the storage engine before it is published.
+
+    Each product also has a version that increases with every mutation of the product.
+    Versions are returned with query results and carried in invalidations,
+    so the front-end component can tell whether a cached record is older than an invalidation.
+
+    A catalog component can have a hot standby (see sync_replication.py): the standby follows the mutations
+    of the primary, only answers queries, and takes over when the primary stops answering.
     """
 
-    def __init__(self, catalog_file):
+    def __init__(self, catalog_file, lock_stripes=LOCK_STRIPES, wal_file=None, store=CATALOG_STORE,
+                 restock_file=RESTOCK_FILE, durability=CATALOG_DURABILITY, group_commit_window=GROUP_COMMIT_WINDOW,
+                 group_commit_max_batch=GROUP_COMMIT_MAX_BATCH, peer='', role=PRIMARY):
         """
         :param catalog_file: path to the catalog file to read and write data
+        :param lock_stripes: number of locks shared by the products of the catalog
+        :param wal_file: path to the write-ahead log (default: catalog_file with the extension ".wal")
+        :param store: the storage engine of the catalog ('csv', 'columnar' or 'mmap')
+        :param restock_file: path to the csv file with the restock delay and level of products
+        :param durability: how orders are made durable before they are answered ('flush', 'fsync' or 'group')
+        :param group_commit_window: seconds a group commit waits for more orders before the fsync
+        :param group_commit_max_batch: the number of waiting orders that ends the window of a group commit early
+        :param peer: address of the other component of a primary / hot standby pair ('' for no standby)
+        :param role: the role this component starts with ('primary' or 'standby')
         """
 
         # Path to the catalog file
         self.catalog_file = catalog_file
 
-        # Read the catalog file
-        self.fields, self.catalog = read_catalog(self.catalog_file)
+        # Metrics reported through the Metrics rpc call
+        self.metrics = Metrics()
+
+        # Results of orders with request IDs, so that retried orders are not applied twice
+        self.dedup = DedupTable(DEDUP_CAPACITY, DEDUP_TTL, self.metrics)
+
+        # Open the storage engine and use its records as the catalog
+        self.durability = durability
+        self.store = open_store(store, catalog_file, wal_file, durability=durability, window=group_commit_window,
+                                max_batch=group_commit_max_batch, metrics=self.metrics)
+        self.fields, self.catalog = self.store.fields, self.store.records
 
         # A dictionary that stores product names as keys and give the index of the product in self.catalog
         self.retriever = dict()
         for i, row in enumerate(self.catalog):
             self.retriever[row[0]] = i
 
-        # A readwritelock used for the synchronization of the product catalog
-        catalog_lock = rwlock.RWLockFair()
-        self.reader_lock = catalog_lock.gen_rlock()
-        self.writer_lock = catalog_lock.gen_wlock()
-
-        # A boolean that is used to check whether self.catalog has been modified
-        self.catalog_modified = False
-        self.catalog_modified_lock = threading.Lock()
-
+        # A sorted index of product names used to list products and to search them by prefix
+        self.index = ProductIndex(self.retriever.keys())
+
+        # The version of each product in self.catalog
+        # Versions are drawn from one counter that starts from the start time in microseconds,
+        # so the version of a product keeps increasing across restarts of the catalog component
+        self.version_counter = itertools.count(int(time.time() * 1000000))
+        self.versions = [next(self.version_counter)] * len(self.catalog)
+
+        # A striped lock used for the synchronization of writers of the product catalog
+        # Each product is guarded by one lock from a fixed pool chosen by its index in self.catalog
+        # Readers do not use this lock
+        self.catalog_lock = StripedLock(lock_stripes)
+
+        # A counter of the mutations of self.catalog and its value when the last checkpoint started
+        # The writer thread checks whether the counter has moved instead of clearing a flag after the checkpoint,
+        # so a mutation made while a checkpoint is written is included in the next checkpoint
+        self.generation = 0
+        self.checkpoint_generation = 0
+        self.generation_lock = threading.Lock()
+        self.metrics.derive('uncheckpointed_mutations', lambda metrics: self.generation - self.checkpoint_generation)
+
+        # A lock that applies the chunks of imports one at a time, so new products get consecutive indices
+        self.import_lock = threading.Lock()
+
+        # A timer heap of products that are out of stock
+        self.restock_scheduler = RestockScheduler(self.restock, RESTOCK_INTERVAL, RESTOCK_LEVEL,
+                                                  read_restock_config(restock_file))
+        for product_name, _, quantity in self.catalog:
+            if quantity == 0:
+                self.restock_scheduler.schedule(product_name)
+
+        # A stub that will send invalidate requests to the front-end component (None if the push is disabled)
+        self.front_stub = FrontStub(FRONT_HOST, FRONT_PORT) if FRONT_HOST != "" else None
+
+        # Sends the invalidate requests without waiting for them, so a front-end component that is down
+        # does not hold up the invalidation stream
+        self.invalidation_sender = None
+        if self.front_stub is not None:
+            self.invalidation_sender = InvalidationSender(self.front_stub.InvalidateMany, INVALIDATION_IN_FLIGHT,
+                                                          INVALIDATION_QUEUE, self.metrics)
+
+        # Invalidation events streamed to the subscribers of the SubscribeInvalidations rpc call
+        self.change_log = ChangeLog(CHANGE_LOG_SIZE)
+
+        # Mutations streamed to the read replicas through the Replicate rpc call
+        # Each event is a list of (product_name, price, quantity, version) after one mutation
+        self.mutation_log = ChangeLog(REPLICATION_LOG_SIZE)
+
+        # Coalesces invalidations and sends them to the front-end components in batches
+        self.invalidation_batcher = InvalidationBatcher(self.send_invalidations, INVALIDATION_WINDOW,
+                                                        self.metrics)
+
+        # Orders wait for the acknowledgement of the hot standby, and are rejected while it is out of sync
+        self.sync_replication = SyncReplication(STANDBY_TIMEOUT, self.metrics, required=peer != '')
+
+        # Request IDs and sequence numbers of orders that were applied but rejected because the standby
+        # did not acknowledge them (see reject_unacknowledged)
+        self.unacknowledged = []
+
+        # A stub of the other component of the pair (None without a standby)
+        self.peer_stub = pb2_grpc.CatalogStub(grpc.insecure_channel(peer)) if peer != '' else None
+
+        # The role of this component and its term, which increases with every failover
+        # The term is kept in a file next to the catalog file, so a restarted component does not follow
+        # a primary of an older term. A lock guards the changes of the role
+        self.term_file = os.path.splitext(catalog_file)[0] + '.term'
+        self.role_lock = threading.Lock()
+        self.role, self.term = self.initial_role(role)
+        self.write_term()
+
+        # The term in which this primary proceeded alone (see proceed_alone), 0 if it did not
+        self.alone_term = 0
+        self.metrics.derive('primary', lambda metrics: 1 if self.role == PRIMARY else 0)
+        self.metrics.derive('term', lambda metrics: self.term)
+        self.metrics.derive('fenced', lambda metrics: 1 if self.role == PRIMARY and not self.sync_replication.writable()
+                            else 0)
+        print("[CatalogServicer]", "Starting as the %s (term %d)" % (self.role, self.term))
+
+        # The position of the standby in the mutation stream of the primary, the Follow call it reads,
+        # the last time it heard from the primary, and whether it has caught up with the primary
+        self.followed = (0, 0)
+        self.follow_stream = None
+        self.heard_at = time.monotonic()
+        self.synced = False
+
+        self.start_background_threads()
+
+    def start_background_threads(self):
+        """
+        Start the threads that run in the background of the servicer
+        """
         # A thread periodically writes the data in self.catalog to the catalog_file in disk
-        self.writer_thread = threading.Thread(target=self.write_catalog_file)
+        self.writer_thread = threading.Thread(target=self.write_catalog_file, daemon=True)
         self.writer_thread.start()
 
-        # A thread periodically restock toys that are out of stock
-        self.restock_thread = threading.Thread(target=self.restock_out_of_stocks)
+        # A thread restocks products that are out of stock when they are due
+        self.restock_thread = threading.Thread(target=self.restock_scheduler.run, daemon=True)
         self.restock_thread.start()
 
-        # A stub that will send invalidate requests to the front-end component
-        self.front_stub = FrontStub(FRONT_HOST, FRONT_PORT)
+        # A thread sends batches of invalidations to the front-end components
+        self.invalidation_thread = threading.Thread(target=self.invalidation_batcher.run, daemon=True)
+        self.invalidation_thread.start()
+
+        if self.peer_stub is not None:
+            # A thread follows the primary while this component is the standby
+            self.follow_thread = threading.Thread(target=self.follow_peer, daemon=True)
+            self.follow_thread.start()
 
-        #
-        self.threadpool = futures.ThreadPoolExecutor(MAX_WORKERS)
+            # A thread takes over when the primary has failed, or steps down when the peer has taken over
+            self.failover_thread = threading.Thread(target=self.watch_peer, daemon=True)
+            self.failover_thread.start()
 
     def Query(self, request, context):
         """
@@ -77,21 +309,18 @@ class CatalogServicer(pb2_grpc.CatalogServicer):
 
         # If the product_name is not found, return -1, -1 to the client
         if request.product_name not in self.retriever.keys():
-            price, quantity = '-1', -1
+            price, price_cents, quantity, version = '-1', -1, -1, 0
         else:
             index = self.retriever[request.product_name]
 
-            # Acquire a reader lock for self.catalog
-            self.reader_lock.acquire(blocking=True, timeout=1)
-
-            # Read required data from self.catalog
-            price, quantity = self.catalog[index][1:3]
-
-            # Release the reader lock after reading from self.catalog
-            self.reader_lock.release()
+            # Read the current record of the product from self.catalog without a lock
+            # The version is read before the record, so the record is never older than the version
+            version = self.versions[index]
+            _, price_cents, quantity = self.catalog[index]
+            price = format_cents(price_cents)
 
         # Send back the response to the client
-        result = {'price': price, 'quantity': quantity}
+        result = {'price': price, 'price_cents': price_cents, 'quantity': quantity, 'version': version}
 
         # Print Results
         print("[CatalogServicer]", "Query(%s):" % request.product_name, result)
@@ -99,7 +328,45 @@ class CatalogServicer(pb2_grpc.CatalogServicer):
         # Reply to the client
         return pb2.query_response(**result)
 
+    def QueryMany(self, request, context):
+        """
+        QueryMany rpc call
+        Each product is read from its current record without a lock
+        """
+
+        products = []
+
+        for product_name in request.product_names:
+            # If the product_name is not found, return -1, -1 for the product
+            if product_name not in self.retriever.keys():
+                price, price_cents, quantity, version = '-1', -1, -1, 0
+            else:
+                # Read the version and then the current record of the product from self.catalog
+                version = self.versions[self.retriever[product_name]]
+                _, price_cents, quantity = self.catalog[self.retriever[product_name]]
+                price = format_cents(price_cents)
+
+            products.append({'product_name': product_name, 'price': price, 'price_cents': price_cents,
+                             'quantity': quantity, 'version': version})
+
+        # Print Results
+        print("[CatalogServicer]", "QueryMany(%d products):" % len(products), products)
+
+        # Reply to the client
+        return pb2.query_many_response(products=[pb2.product_info(**product) for product in products])
+
     def Order(self, request, context):
+        """
+        Order rpc call
+        An order with a request ID is applied once, and its retries get the result of the first call
+        """
+        self.check_primary(context)
+        if request.request_id != '':
+            return self.dedup.run(('Order', request.request_id), lambda: self.apply_order(request, context))
+        return self.apply_order(request, context)
+
+    def apply_order(self, request, context):
+        start = time.time()
 
         # Read relevant data from self.catalog and modify it if needed
         if request.product_name not in self.retriever.keys():
@@ -114,26 +381,37 @@ class CatalogServicer(pb2_grpc.CatalogServicer):
             # Get the index of the product for self.catalog
             index = self.retriever[request.product_name]
 
-            # Acquire a writer lock for self.catalog
-            self.writer_lock.acquire(blocking=True, timeout=1)
-            quantity = self.catalog[index][2]
+            # Acquire the lock of the product
+            self.catalog_lock.acquire([index])
+            _, price, quantity = self.catalog[index]
 
             # 3) When there is enough quantity: buy successful
             if quantity >= request.quantity:
 
-                # Reduce quantity in self.catalog
-                self.catalog[index][2] -= request.quantity
+                # Log the mutation and publish a new record with the reduced quantity in self.catalog
+                sequence = self.store.log([(request.product_name, quantity - request.quantity)])
+                self.catalog[index] = (request.product_name, price, quantity - request.quantity)
+
+                # Give the product a new version after the new record is published
+                version = next(self.version_counter)
+                self.versions[index] = version
 
-                # Release ther writer lock
-                self.writer_lock.release()
+                # Send the new record to the read replicas and the standby, with the result of the order
+                replicated = self.replicate([index], self.replicated_request(
+                    'Order', request, pb2.order_result(order_result=1, price_cents=[price])))
+
+                # Release the lock of the product
+                self.catalog_lock.release([index])
 
                 # Order result: 1 (successful)
                 order_result = 1
 
-                # Change self.catalog_modified to True so that another thread could change the catalog file in disk
-                self.catalog_modified_lock.acquire()
-                self.catalog_modified = True
-                self.catalog_modified_lock.release()
+                # Count the mutation so that the writer thread writes it in the next checkpoint
+                self.mark_modified()
+
+                # Schedule a restock if the product is out of stock
+                if quantity == request.quantity:
+                    self.restock_scheduler.schedule(request.product_name)
 
                 # Print the buy result
                 print("(Buy Successful) %s: (before: %d) -> (after: %d)" % (
@@ -142,8 +420,8 @@ class CatalogServicer(pb2_grpc.CatalogServicer):
             # 4) Not enough quantity: but failed
             else:
 
-                # Release the writer lock
-                self.writer_lock.release()
+                # Release the lock of the product
+                self.catalog_lock.release([index])
 
                 # Order result: -1 (not enough stock)
                 order_result = -1
@@ -152,21 +430,265 @@ class CatalogServicer(pb2_grpc.CatalogServicer):
                 print("(Buy Failed) %s: (remaining: %d) < (requested: %d)" % (
                 request.product_name, quantity, request.quantity))
 
-        # Send back the response to the client
-        result = {'order_result': order_result}
+        # Hold the response until the mutation is on disk (see CATALOG_DURABILITY) and on the standby
+        acknowledged = True
+        if order_result == 1:
+            self.store.sync(sequence)
+            acknowledged = self.sync_replication.wait(replicated)
+
+        # Send back the response to the client with the price the product was bought at
+        result = {'order_result': order_result, 'price_cents': [price] if order_result == 1 else []}
 
         # Print the results
         print("[CatalogServicer]", "Order(%s, %d): {'order_result': %d}"
               % (request.product_name, request.quantity, order_result))
 
         # Send an invalidate request to the front-end component since the catalog information has changed
-        self.invalidate(request.product_name)
+        if order_result == 1:
+            self.invalidate(request.product_name, version)
 
+        if not acknowledged:
+            self.reject_unacknowledged(context, replicated, 'Order', request, pb2.order_result(**result))
+
+        self.metrics.observe('order_latency_us', (time.time() - start) * 1e6, LATENCY_BOUNDS)
         return pb2.order_result(**result)
 
-    def write_catalog_file(self, interval=1):
+    def OrderMany(self, request, context):
+        """
+        OrderMany rpc call
+        An order with a request ID is applied once, and its retries get the result of the first call
         """
-        One thread will write data from self.catalog to disk periodically
+        self.check_primary(context)
+        if request.request_id != '':
+            return self.dedup.run(('OrderMany', request.request_id), lambda: self.apply_order_many(request, context))
+        return self.apply_order_many(request, context)
+
+    def apply_order_many(self, request, context):
+        """
+        Every line item is checked and decremented while holding the locks of all products in the order.
+        Either all line items are bought or none of them is.
+        """
+        start = time.time()
+
+        # Add up the requested quantities of each product while keeping the order of the products
+        requested = dict()
+        for order in request.orders:
+            requested[order.product_name] = requested.get(order.product_name, 0) + order.quantity
+
+        if any(product_name not in self.retriever.keys() for product_name in requested.keys()):
+            # 1) If any product name is not found
+            order_result = -3
+            print("(Buy Failed) %s: invalid item" % [name for name in requested.keys() if name not in self.retriever.keys()])
+        elif len(request.orders) == 0 or any(order.quantity < 1 for order in request.orders):
+            # 2) If there is no line item or any quantity is not bigger than 0
+            order_result = -2
+            print("(Buy Failed) %s: invalid quantity" % [order.quantity for order in request.orders])
+        else:
+            # Get the indices of the products for self.catalog
+            indices = {product_name: self.retriever[product_name] for product_name in requested.keys()}
+
+            # Acquire the locks of all products in the order at once
+            self.catalog_lock.acquire(indices.values())
+            records = {product_name: self.catalog[index] for product_name, index in indices.items()}
+            quantities = {product_name: record[2] for product_name, record in records.items()}
+
+            # 3) When there is enough quantity for every product: buy successful
+            if all(quantities[product_name] >= quantity for product_name, quantity in requested.items()):
+
+                # Log the mutations and publish new records with the reduced quantities in self.catalog
+                sequence = self.store.log([(product_name, quantities[product_name] - quantity)
+                                           for product_name, quantity in requested.items()])
+                versions = dict()
+                for product_name, quantity in requested.items():
+                    self.catalog[indices[product_name]] = (product_name, records[product_name][1],
+                                                           quantities[product_name] - quantity)
+
+                    # Give the product a new version after the new record is published
+                    versions[product_name] = next(self.version_counter)
+                    self.versions[indices[product_name]] = versions[product_name]
+
+                # Send the new records to the read replicas and the standby, with the result of the order
+                replicated = self.replicate(indices.values(), self.replicated_request(
+                    'OrderMany', request, pb2.order_result(order_result=1, price_cents=[
+                        records[order.product_name][1] for order in request.orders])))
+
+                # Release the locks of the products
+                self.catalog_lock.release(indices.values())
+
+                # Order result: 1 (successful)
+                order_result = 1
+
+                # A later cancellation with the same request ID gives the products back again
+                self.forget_undone('OrderMany', request.request_id)
+
+                # Count the mutation so that the writer thread writes it in the next checkpoint
+                self.mark_modified()
+
+                # Schedule restocks of products that are out of stock
+                for product_name, quantity in requested.items():
+                    if quantities[product_name] == quantity:
+                        self.restock_scheduler.schedule(product_name)
+
+                # Print the buy result
+                for product_name, quantity in requested.items():
+                    print("(Buy Successful) %s: (before: %d) -> (after: %d)" % (
+                    product_name, quantities[product_name], quantities[product_name] - quantity))
+
+            # 4) Not enough quantity for any product: buy failed and nothing is changed
+            else:
+
+                # Release the locks of the products
+                self.catalog_lock.release(indices.values())
+
+                # Order result: -1 (not enough stock)
+                order_result = -1
+
+                # Print the buy result
+                for product_name, quantity in requested.items():
+                    if quantities[product_name] < quantity:
+                        print("(Buy Failed) %s: (remaining: %d) < (requested: %d)" % (
+                        product_name, quantities[product_name], quantity))
+
+        # Hold the response until the mutations are on disk (see CATALOG_DURABILITY) and on the standby
+        acknowledged = True
+        if order_result == 1:
+            self.store.sync(sequence)
+            acknowledged = self.sync_replication.wait(replicated)
+
+        # Send back the response to the client with the price each line item was bought at
+        result = {'order_result': order_result,
+                  'price_cents': [records[order.product_name][1] for order in request.orders] if order_result == 1 else []}
+
+        # Print the results
+        print("[CatalogServicer]", "OrderMany(%s): {'order_result': %d}"
+              % ([(order.product_name, order.quantity) for order in request.orders], order_result))
+
+        # Send invalidate requests to the front-end component since the catalog information has changed
+        if order_result == 1:
+            self.invalidate_many(list(versions.keys()), list(versions.values()))
+
+        if not acknowledged:
+            self.reject_unacknowledged(context, replicated, 'OrderMany', request, pb2.order_result(**result))
+
+        self.metrics.observe('order_latency_us', (time.time() - start) * 1e6, LATENCY_BOUNDS)
+        return pb2.order_result(**result)
+
+    def CancelMany(self, request, context):
+        """
+        CancelMany rpc call
+        A cancellation with a request ID is applied once, and its retries get the result of the first call
+        """
+        self.check_primary(context)
+        if request.request_id != '':
+            return self.dedup.run(('CancelMany', request.request_id), lambda: self.apply_cancel_many(request, context))
+        return self.apply_cancel_many(request, context)
+
+    def apply_cancel_many(self, request, context):
+        """
+        Give back the quantities of line items that were bought with an OrderMany call.
+        An order with products of several catalog shards is sent to each shard as an OrderMany call,
+        and the shards that succeeded are cancelled when another shard fails.
+        """
+
+        # Add up the quantities of each product while keeping the order of the products
+        returned = dict()
+        for order in request.orders:
+            returned[order.product_name] = returned.get(order.product_name, 0) + order.quantity
+
+        if any(product_name not in self.retriever.keys() for product_name in returned.keys()):
+            # 1) If any product name is not found
+            order_result = -3
+        elif len(request.orders) == 0 or any(order.quantity < 1 for order in request.orders):
+            # 2) If there is no line item or any quantity is not bigger than 0
+            order_result = -2
+        else:
+            # Get the indices of the products for self.catalog
+            indices = {product_name: self.retriever[product_name] for product_name in returned.keys()}
+
+            # Log the mutations and publish new records with the returned quantities while holding the locks
+            self.catalog_lock.acquire(indices.values())
+            records = {product_name: self.catalog[index] for product_name, index in indices.items()}
+            sequence = self.store.log([(product_name, records[product_name][2] + quantity)
+                                       for product_name, quantity in returned.items()])
+            versions = dict()
+            for product_name, quantity in returned.items():
+                self.catalog[indices[product_name]] = (product_name, records[product_name][1],
+                                                       records[product_name][2] + quantity)
+                versions[product_name] = next(self.version_counter)
+                self.versions[indices[product_name]] = versions[product_name]
+            replicated = self.replicate(indices.values(), self.replicated_request(
+                'CancelMany', request, pb2.order_result(order_result=1)))
+            self.catalog_lock.release(indices.values())
+
+            # Order result: 1 (successful)
+            order_result = 1
+
+            # A retry of the cancelled order with the same request ID takes the products again
+            self.forget_undone('CancelMany', request.request_id)
+
+            # Count the mutation so that the writer thread writes it in the next checkpoint
+            self.mark_modified()
+
+            # Send invalidate requests to the front-end component since the catalog information has changed
+            self.invalidate_many(list(versions.keys()), list(versions.values()))
+
+            # Hold the response until the mutations are on disk (see CATALOG_DURABILITY) and on the standby
+            self.store.sync(sequence)
+            if not self.sync_replication.wait(replicated):
+                self.reject_unacknowledged(context, replicated, 'CancelMany', request,
+                                           pb2.order_result(order_result=order_result))
+
+        # Print the results
+        print("[CatalogServicer]", "CancelMany(%s): {'order_result': %d}"
+              % ([(order.product_name, order.quantity) for order in request.orders], order_result))
+
+        return pb2.order_result(order_result=order_result)
+
+    def forget_undone(self, method, request_id):
+        """
+        Forget the result of the OrderMany or CancelMany call that a successful call with the same request ID undoes
+        A cross-shard order cancels the shards that succeeded with the request ID of the order, and a retry of the
+        order uses the request ID again: the retry must take the products again instead of replaying the cancelled
+        order, and the next cancellation must give them back again instead of replaying the first one.
+        :param method: the name of the successful rpc call
+        :param request_id: the request ID of the call ('' for none)
+        """
+        if request_id != '' and method in UNDONE_BY.keys():
+            self.dedup.discard((UNDONE_BY[method], request_id))
+
+    def reject_unacknowledged(self, context, sequence, method, request, result):
+        """
+        Reject an order whose mutation the standby did not acknowledge in time (the standby fell out of sync)
+        The mutation stays applied on this component, like an order whose reply was lost: the result of an order
+        with a request ID is kept, so a retry on this component does not apply the order twice. The result is
+        forgotten if a snapshot of a new primary replaces the mutation (see step_down).
+        :param sequence: the sequence number of the mutation in the mutation stream
+        :param method: the name of the rpc call
+        :param result: the order_result message of the order
+        """
+        self.metrics.increment('unacknowledged_orders')
+        if request.request_id != '':
+            self.dedup.put((method, request.request_id), result)
+            # Mutations that a standby has acknowledged since then are on the standby
+            self.role_lock.acquire()
+            self.unacknowledged = [(pending, key) for pending, key in self.unacknowledged
+                                   if pending > self.sync_replication.confirmed]
+            self.unacknowledged.append((sequence, (method, request.request_id)))
+            self.role_lock.release()
+        context.abort(grpc.StatusCode.UNAVAILABLE, "the standby did not acknowledge the order")
+
+    def mark_modified(self):
+        """
+        Count a mutation of self.catalog
+        Called after the mutation has been published
+        """
+        self.generation_lock.acquire()
+        self.generation += 1
+        self.generation_lock.release()
+
+    def write_catalog_file(self, interval=CHECKPOINT_INTERVAL):
+        """
+        One thread will make the storage engine write a checkpoint of self.catalog to disk periodically
         only if self.catalog has been modified since last write
         :param interval: seconds to wait between each attempt to write
         """
@@ -174,58 +696,780 @@ class CatalogServicer(pb2_grpc.CatalogServicer):
             # Sleep for 'interval' seconds to attempt writing periodically
             time.sleep(interval)
 
-            # Write only if self.catalog has been modified
-            if self.catalog_modified:
-                # Copy data in self.catalog using a reader lock
-                self.reader_lock.acquire(blocking=True, timeout=5)
-                to_write = copy.deepcopy(self.catalog)
-                self.reader_lock.release()
+            # Write only if self.catalog has been modified since the last checkpoint started
+            # The counter is read before the snapshot is taken, so every mutation counted after this point
+            # makes the next attempt write again, even if the snapshot already includes it
+            generation = self.generation
+            if generation != self.checkpoint_generation:
+                self.checkpoint(generation)
+
+    def checkpoint(self, generation):
+        """
+        Make the storage engine write a checkpoint and remember the mutations it includes
+        A failed checkpoint (ex. a full disk) is retried at the next attempt
+        :param generation: the value of self.generation before the checkpoint started
+        """
+        try:
+            self.store.checkpoint(self.catalog_lock)
+        except OSError as e:
+            print("[CatalogServicer]", "Checkpoint failed: %s" % e)
+            self.metrics.increment('checkpoint_failures')
+            return
+
+        self.checkpoint_generation = generation
+        self.metrics.increment('checkpoints')
+
+    def restock(self, batch):
+        """
+        Restock a batch of products that are due
+        The whole batch is restocked under one acquisition of the locks of its products
+        and the front-end component is notified once for the batch.
+        :param batch: a list of (product_name, restock level)
+        """
+        # The standby gets restocks from the primary (due restocks are scheduled again when it takes over)
+        if self.role != PRIMARY:
+            return
+
+        indices = [self.retriever[product_name] for product_name, _ in batch]
+
+        # Publish new records with the restock levels of products that are still out of stock
+        self.catalog_lock.acquire(indices)
+        restocked = []
+        for index, (product_name, level) in zip(indices, batch):
+            _, price, quantity = self.catalog[index]
+            if quantity == 0:
+                restocked.append((index, product_name, price, level))
+        sequence = self.store.log([(product_name, level) for _, product_name, _, level in restocked])
+        versions = []
+        for index, product_name, price, level in restocked:
+            print('Restocking', self.catalog[index], end=" -> ")
+            self.catalog[index] = (product_name, price, level)
+            print(self.catalog[index])
+
+            # Give the product a new version after the new record is published
+            versions.append(next(self.version_counter))
+            self.versions[index] = versions[-1]
+        if len(restocked) > 0:
+            self.replicate([index for index, _, _, _ in restocked])
+        self.catalog_lock.release(indices)
+
+        # Every logged mutation waits for its group commit (see CATALOG_DURABILITY)
+        self.store.sync(sequence)
+
+        if len(restocked) > 0:
+            # Send one invalidate request for the batch since the catalog information has changed
+            self.invalidate_many([product_name for _, product_name, _, _ in restocked], versions)
+
+            # Count the mutation so that the writer thread writes it in the next checkpoint
+            self.mark_modified()
+
+    def Metrics(self, request, context):
+        """
+        Metrics rpc call
+        """
+        metrics = self.metrics.snapshot()
+
+        # Reply to the client
+        return pb2.metrics_response(metrics=[pb2.metric(name=name, value=value) for name, value in sorted(metrics.items())])
+
+    def SubscribeInvalidations(self, request, context):
+        """
+        SubscribeInvalidations rpc call
+        Stream invalidation events after request.since_sequence until the subscriber cancels the call.
+        If events after request.since_sequence are no longer kept, or request.epoch is not the epoch of this run,
+        a resync event that carries the current sequence number is sent first.
+        """
+        self.check_primary(context)
+        epoch, sequence = request.epoch, request.since_sequence
+        self.metrics.increment('invalidation_subscribers')
+        print("[CatalogServicer]", "SubscribeInvalidations(%d, %d)" % (epoch, sequence))
+
+        try:
+            while context.is_active():
+                # Wait for new events, waking up periodically to check whether the subscriber is still connected
+                events = self.change_log.events_since(epoch, sequence, timeout=1)
+
+                if events is None:
+                    # The subscriber missed events: make it resynchronize and continue from the current sequence
+                    self.change_log.condition.acquire()
+                    epoch, sequence = self.change_log.epoch, self.change_log.sequence
+                    self.change_log.condition.release()
+                    self.metrics.increment('invalidation_resyncs')
+                    yield pb2.invalidation_event(epoch=epoch, sequence=sequence, resync=True)
+                    continue
+
+                for sequence, product_names, versions, prices, quantities in events:
+                    yield pb2.invalidation_event(epoch=epoch, sequence=sequence, product_names=product_names,
+                                                 versions=versions, price_cents=prices, quantities=quantities)
+        finally:
+            self.metrics.increment('invalidation_subscribers', -1)
+
+    def Replicate(self, request, context):
+        """
+        Replicate rpc call
+        Stream the mutations after request.since_sequence to a read replica until the replica cancels the call.
+        If the mutations after request.since_sequence are no longer kept, or request.epoch is not the epoch of
+        this run, a snapshot of the catalog is sent first. A heartbeat is sent when there is no mutation.
+        """
+        epoch, sequence = request.epoch, request.since_sequence
+        self.metrics.increment('replicas')
+        print("[CatalogServicer]", "Replicate(%d, %d)" % (epoch, sequence))
+
+        try:
+            while context.is_active():
+                events = self.mutation_log.events_since(epoch, sequence, timeout=REPLICATION_HEARTBEAT)
+                for event in self.replication_events(events, sequence):
+                    epoch, sequence = event.epoch, event.sequence
+                    yield event
+        finally:
+            self.metrics.increment('replicas', -1)
+
+    def Changes(self, request, context):
+        """
+        Changes rpc call
+        Stream every price and quantity change after request.since_sequence to a downstream consumer
+        (ex. a search indexer) until the consumer cancels the call, so it does not have to poll every product.
+        The changes come from the bounded log of the read replicas: a consumer that has fallen off the end of the log,
+        or whose epoch is not the epoch of this run, gets a snapshot of every product first and then the live tail.
+        A heartbeat is sent when there is no change.
+        """
+        epoch, sequence = request.epoch, request.since_sequence
+        self.metrics.increment('change_subscribers')
+        print("[CatalogServicer]", "Changes(%d, %d)" % (epoch, sequence))
+
+        try:
+            while context.is_active():
+                events = self.mutation_log.events_since(epoch, sequence, timeout=REPLICATION_HEARTBEAT)
+                for event in self.replication_events(events, sequence, 'change_snapshots'):
+                    epoch, sequence = event.epoch, event.sequence
+                    yield event
+        finally:
+            self.metrics.increment('change_subscribers', -1)
+
+    def Follow(self, request_iterator, context):
+        """
+        Follow rpc call
+        Stream the mutations to the hot standby like the Replicate rpc call, with the results of orders.
+        The first message of the standby is its position in the mutation stream, and each later message
+        acknowledges the last mutation it has applied (see SyncReplication).
+        Each event tells the standby the term of this component and whether orders wait for the standby,
+        since only a standby in sync may take over.
+        The stream ends when this component is no longer the primary.
+        """
+        # A primary whose standby is out of sync rejects orders, but not the standby that catches up
+        if self.role != PRIMARY:
+            context.abort(grpc.StatusCode.FAILED_PRECONDITION, "standby: follow the primary")
+        request = next(request_iterator, None)
+        if request is None:
+            return
+        epoch, sequence = request.epoch, request.since_sequence
+        follower = self.sync_replication.attach()
+        print("[CatalogServicer]", "Follow(%d, %d)" % (epoch, sequence))
+
+        # The acknowledgements of the standby are read by a separate thread while the mutations are streamed
+        threading.Thread(target=self.read_acknowledgements, args=(request_iterator, follower), daemon=True).start()
+
+        try:
+            while context.is_active() and self.role == PRIMARY:
+                events = self.mutation_log.events_since(epoch, sequence, timeout=REPLICATION_HEARTBEAT)
+                for event in self.replication_events(events, sequence, 'standby_snapshots'):
+                    epoch, sequence = event.epoch, event.sequence
+                    event.in_sync = self.sync_replication.in_sync
+                    event.term = self.term
+                    yield event
+        finally:
+            self.sync_replication.detach(follower)
+
+    def read_acknowledgements(self, request_iterator, follower):
+        """
+        Record the acknowledgements of a standby until its Follow call ends
+        This function will be executed in a separate thread
+        """
+        try:
+            for request in request_iterator:
+                # Acknowledgements of a snapshot of an older run of this component do not count
+                if request.epoch == self.mutation_log.epoch:
+                    self.sync_replication.acknowledge(follower, request.since_sequence, self.mutation_log.sequence)
+        except grpc.RpcError:
+            # The Follow call was cancelled
+            pass
+
+    def Role(self, request, context):
+        """
+        Role rpc call
+        """
+        return pb2.role_response(role=self.role, term=self.term)
+
+    def check_primary(self, context):
+        """
+        Reject an rpc call that modifies the catalog on the standby, or on a primary whose standby is out of sync
+        A primary without a standby in sync might be cut off from a standby that is about to take over,
+        so it does not answer orders until the standby has caught up or FAILOVER_TIMEOUT has passed
+        (see proceed_alone).
+        The clients retry the call on the other component of the pair, and give up when neither component
+        takes orders (see catalog_router.FailoverStub).
+        """
+        if self.role != PRIMARY:
+            context.abort(grpc.StatusCode.FAILED_PRECONDITION, "standby: send orders to the primary")
+        if not self.sync_replication.writable():
+            context.abort(grpc.StatusCode.FAILED_PRECONDITION, "primary: the standby is out of sync")
+
+    def ImportProducts(self, request_iterator, context):
+        """
+        ImportProducts rpc call
+        Each chunk is applied under the locks of its own products only, so orders and queries keep running
+        during a large import, and only one chunk of the import is kept in memory.
+        """
+        self.check_primary(context)
+        added, updated, rejected = 0, 0, 0
+        for chunk in request_iterator:
+            counts = self.import_chunk(chunk.products)
+            added, updated, rejected = added + counts[0], updated + counts[1], rejected + counts[2]
+
+            # The standby falls out of sync when it does not acknowledge a chunk in time
+            if not self.sync_replication.writable():
+                context.abort(grpc.StatusCode.UNAVAILABLE, "the standby did not acknowledge the import")
+
+        print("[CatalogServicer]", "ImportProducts: {'added': %d, 'updated': %d, 'rejected': %d}"
+              % (added, updated, rejected))
+        return pb2.import_result(added=added, updated=updated, rejected=rejected)
+
+    def import_chunk(self, products):
+        """
+        Add or overwrite the products of one chunk of an import
+        New products are added after the last product, and existing products get the imported price and quantity.
+        :param products: product_info messages
+        :return: the numbers of added, updated and rejected products
+        """
+        # The last row of a product in the chunk wins
+        rows = dict()
+        rejected = 0
+        for product in products:
+            try:
+                price = product_price(product)
+            except (ValueError, ArithmeticError):
+                # An invalid decimal price string
+                price = -1
+
+            # Reject values that do not fit in the records of every storage engine
+            if product.product_name == '' or len(product.product_name.encode()) > NAME.size \
+                    or not 0 <= price < 2 ** 31 or product.quantity < 0:
+                rejected += 1
+            else:
+                rows[product.product_name] = (price, product.quantity)
+        product_names = list(rows.keys())
+        if len(product_names) == 0:
+            return 0, 0, rejected
+
+        self.import_lock.acquire()
+
+        # New products get the indices after the last product in the order of the chunk
+        n_products = len(self.catalog)
+        new_names = [product_name for product_name in product_names if product_name not in self.retriever.keys()]
+        new_indices = {product_name: n_products + i for i, product_name in enumerate(new_names)}
+        indices = [self.retriever[product_name] if product_name not in new_indices.keys() else new_indices[product_name]
+                   for product_name in product_names]
+
+        # Acquire the locks of the products, including the locks of the new indices,
+        # so that a checkpoint includes either every record of the chunk or none of them
+        self.catalog_lock.acquire(indices)
+        sequence = self.store.log([(product_name, rows[product_name][1], rows[product_name][0])
+                                   for product_name in product_names])
+        versions = []
+        for product_name, index in zip(product_names, indices):
+            price, quantity = rows[product_name]
+            versions.append(next(self.version_counter))
+            if index < n_products:
+                # Publish a new record, then give the product a new version
+                self.catalog[index] = (product_name, price, quantity)
+                self.versions[index] = versions[-1]
+            else:
+                # Publish the record and the version of a new product before it can be found by readers
+                self.catalog.append((product_name, price, quantity))
+                self.versions.append(versions[-1])
+                self.retriever[product_name] = index
+
+        # Send the new records to the read replicas and the standby
+        replicated = self.replicate(indices)
+        self.catalog_lock.release(indices)
+
+        # New products can be listed once they can be found by name
+        self.index.add(new_names)
+        self.import_lock.release()
+
+        # Every logged mutation waits for its group commit (see CATALOG_DURABILITY) and for the standby
+        self.store.sync(sequence)
+        self.sync_replication.wait(replicated)
+
+        # Schedule a restock of imported products that are out of stock
+        for product_name in product_names:
+            if rows[product_name][1] == 0:
+                self.restock_scheduler.schedule(product_name)
+
+        # Send one invalidate request for the chunk since the catalog information has changed
+        self.invalidate_many(product_names, versions)
+
+        # Count the mutation so that the writer thread writes it in the next checkpoint
+        self.mark_modified()
+
+        self.metrics.increment('imported_products', len(product_names))
+        return len(new_names), len(product_names) - len(new_names), rejected
+
+    def ExportProducts(self, request, context):
+        """
+        ExportProducts rpc call
+        Stream every product in chunks of request.chunk_size products (default: SNAPSHOT_CHUNK)
+        Each chunk is read under the locks of its products, so the record and the version of a product match,
+        but products can change between chunks. Products added during the export are sent if they are reached.
+        """
+        chunk_size = request.chunk_size if request.chunk_size > 0 else SNAPSHOT_CHUNK
+        print("[CatalogServicer]", "ExportProducts(%d)" % chunk_size)
+
+        start = 0
+        while start < len(self.catalog):
+            chunk, start = self.export_chunk(start, chunk_size)
+            yield chunk
+
+    def export_chunk(self, start, chunk_size):
+        """
+        Read a chunk of products for ExportProducts
+        :param start: the index of the first product of the chunk
+        :param chunk_size: the number of products in the chunk
+        :return: (product_chunk message, index of the first product of the next chunk)
+        """
+        indices = list(range(start, min(start + chunk_size, len(self.catalog))))
+
+        self.catalog_lock.acquire(indices)
+        records = [self.catalog[index] + (self.versions[index],) for index in indices]
+        self.catalog_lock.release(indices)
+
+        self.metrics.increment('exported_products', len(records))
+        return pb2.product_chunk(products=product_infos(records)), indices[-1] + 1
+
+    def ListProducts(self, request, context):
+        """
+        ListProducts rpc call
+        Answer a page of the products whose names start with request.prefix, in the order of their names
+        The page starts after request.page_token, the name of the last product of the previous page.
+        Names work as cursors on every catalog shard, so a front-end can merge the pages of several shards.
+        """
+        page_size = request.page_size if request.page_size > 0 else LIST_PAGE_SIZE
+        product_names, more = self.index.page(request.prefix, request.page_token, min(page_size, LIST_MAX_PAGE_SIZE))
 
-                # Write the copied data to disk
-                write_csv(self.catalog_file, [self.fields] + to_write)
+        # Read records without locks like Query (the version before the record)
+        records = []
+        for product_name in product_names:
+            index = self.retriever[product_name]
+            version = self.versions[index]
+            records.append(self.catalog[index] + (version,))
 
-                # Change the self.catalog_modified to False
-                self.catalog_modified_lock.acquire()
-                self.catalog_modified = False
-                self.catalog_modified_lock.release()
+        # Print the results
+        print("[CatalogServicer]", "ListProducts(%s, %s, %d): %d products"
+              % (request.prefix, request.page_token, page_size, len(records)))
 
-    def restock_out_of_stocks(self):
+        return pb2.list_response(products=product_infos(records),
+                                 next_page_token=product_names[-1] if more else '')
+
+    def replication_events(self, events, sequence, snapshot_metric='replication_snapshots'):
+        """
+        Make the replication events for the mutations after a sequence number
+        :param events: events of self.mutation_log after the sequence number, or None to send a snapshot
+        :param sequence: the sequence number of the last mutation the replica has received
+        :param snapshot_metric: the name of the metric that counts snapshots
+        :return: a list of replication_event messages
+        """
+        epoch = self.mutation_log.epoch
+
+        if events is None:
+            # Take a snapshot while holding every lock, so it includes exactly the mutations up to its sequence
+            self.catalog_lock.acquire_all()
+            records = [record + (version,) for record, version in zip(self.catalog, self.versions)]
+            sequence = self.mutation_log.sequence
+            self.catalog_lock.release_all()
+            self.metrics.increment(snapshot_metric)
+
+            chunks = [records[i:i + SNAPSHOT_CHUNK] for i in range(0, len(records), SNAPSHOT_CHUNK)] or [[]]
+            return [pb2.replication_event(epoch=epoch, sequence=sequence, products=product_infos(chunk),
+                                          snapshot=True, snapshot_done=(i == len(chunks) - 1),
+                                          primary_sequence=self.mutation_log.sequence)
+                    for i, chunk in enumerate(chunks)]
+
+        if len(events) == 0:
+            # A heartbeat
+            return [pb2.replication_event(epoch=epoch, sequence=sequence, primary_sequence=self.mutation_log.sequence)]
+
+        # Mutations of orders with request IDs carry the result of the order, so that the standby
+        # answers retries of the order with the same result after a failover
+        return [pb2.replication_event(epoch=epoch, sequence=sequence, products=product_infos(records),
+                                      primary_sequence=self.mutation_log.sequence,
+                                      **({'request_method': request[0], 'request_id': request[1],
+                                          'result': request[2]} if request is not None else {}))
+                for sequence, records, request in events]
+
+    def replicate(self, indices, request=None):
+        """
+        Send the current records of products to the read replicas and the standby
+        Called while holding the locks of the products, after their new records and versions are published
+        :param indices: indices of the products in self.catalog
+        :param request: (method, request ID, order_result) of the order that made the mutation, or None
+        :return: the sequence number of the mutation, to wait for the standby with
+        """
+        return self.mutation_log.publish([self.catalog[index] + (self.versions[index],) for index in indices], request)
+
+    def replicated_request(self, method, request, result):
+        """
+        Get the request of an order that is sent with its mutation (see replicate)
+        :return: (method, request ID, result), or None for an order without a request ID
+        """
+        return (method, request.request_id, result) if request.request_id != '' else None
+
+    def initial_role(self, role):
+        """
+        Get the role this component starts with
+        A component whose peer already is the primary starts as its standby, whatever its configured role,
+        so an old primary restarted after a failover does not take the shard back. A peer that is the primary
+        of an older term (ex. it was cut off while this component took over) steps down instead,
+        and a peer that is the standby is the standby of this component.
+        :param role: the configured role
+        :return: (role, term)
+        """
+        term = self.read_term()
+        if self.peer_stub is None:
+            return PRIMARY, term
+
+        peer_role, peer_term = self.peer_role()
+        if peer_role == PRIMARY and peer_term >= term:
+            return STANDBY, peer_term
+        if peer_role is not None:
+            return PRIMARY, term
+        return role, term
+
+    def read_term(self):
         """
-        Periodically check the catalog and restock out-of-stock items to 100.
+        Read the term kept in self.term_file
+        :return: the term, or 0 if the file does not exist
         """
+        if not os.path.exists(self.term_file):
+            return 0
+        with open(self.term_file, 'r') as term_file:
+            return int(term_file.read())
 
+    def write_term(self):
+        """
+        Keep self.term in self.term_file (written to a temporary file that replaces the term file)
+        """
+        with open(self.term_file + '.tmp', 'w') as term_file:
+            term_file.write('%d' % self.term)
+        os.replace(self.term_file + '.tmp', self.term_file)
+
+    def peer_role(self):
+        """
+        Ask the other component of the pair for its role
+        :return: (role, term), or (None, 0) if the peer does not answer
+        """
+        try:
+            response = self.peer_stub.Role(pb2.role_request(), timeout=min(1, FAILOVER_TIMEOUT / 2))
+            return response.role, response.term
+        except grpc.RpcError:
+            return None, 0
+
+    def follow_peer(self):
+        """
+        Follow the primary whenever this component is the standby
+        The Follow call is made again after the last applied mutation when it breaks.
+        This function will be executed in a separate thread
+        """
         while True:
-            # Restock periodically (default: 10 seconds)
-            time.sleep(RESTOCK_INTERVAL)
-
-            # Gather information about products that are out of stock.
-            items_to_restock_idx = []
-            self.reader_lock.acquire()
-            for i, row in enumerate(self.catalog):
-                if row[2] == 0:
-                    items_to_restock_idx.append(i)
-            self.reader_lock.release()
-
-            if len(items_to_restock_idx) > 0:
-                for idx in items_to_restock_idx:
-                    # Modify the quantity of out-of-stock products
-                    self.writer_lock.acquire()
-                    print('Restocking', self.catalog[idx], end=" -> ")
-                    self.catalog[idx][2] = 100
-                    print(self.catalog[idx])
-                    self.writer_lock.release()
-
-                    # Send an invalidate request to the front-end component since the catalog information has changed
-                    self.invalidate(self.catalog[idx][0])
-
-            # Leave a mark so that the writer thread could know that the catalog information has changed
-            self.catalog_modified_lock.acquire()
-            self.catalog_modified = True
-            self.catalog_modified_lock.release()
-
-    def invalidate(self, product_name):
-        # Send a in validation request using a threadpool
-        self.threadpool.submit(self.front_stub.Invalidate, product_name)
+            if self.role == STANDBY:
+                self.follow_primary()
+
+            # Wait before following again
+            time.sleep(REPLICATION_HEARTBEAT)
+
+    def follow_primary(self):
+        """
+        Apply the mutations of the primary and acknowledge each of them, until the Follow call breaks
+        The standby is in sync when the primary says so: the primary then waits for its acknowledgements.
+        """
+        # Acknowledgements are sent on the request stream of the Follow call, starting with the position
+        acknowledgements = queue.Queue()
+        epoch, sequence = self.followed
+        acknowledgements.put(pb2.subscription(epoch=epoch, since_sequence=sequence))
+
+        try:
+            self.follow_stream = self.peer_stub.Follow(iter(acknowledgements.get, None))
+            for event in self.follow_stream:
+                if event.term < self.term:
+                    # A primary of an older term (this component has followed a newer primary): do not follow it
+                    print("[CatalogServicer] The peer is the primary of the older term %d < %d"
+                          % (event.term, self.term))
+                    self.follow_stream.cancel()
+                    break
+                if event.term > self.term:
+                    self.term = event.term
+                    self.write_term()
+
+                self.heard_at = time.monotonic()
+                if event.snapshot:
+                    # Apply the chunks of a snapshot as they arrive; the standby is not in sync before the last one
+                    self.synced = False
+                    self.apply_replicated(event)
+                    if not event.snapshot_done:
+                        continue
+                elif len(event.products) > 0:
+                    if event.epoch != epoch or event.sequence != sequence + 1:
+                        # Should not happen on one stream: start again from a snapshot
+                        print("[CatalogServicer] Unexpected mutation (%d, %d) after (%d, %d)"
+                              % (event.epoch, event.sequence, epoch, sequence))
+                        self.followed = (0, 0)
+                        self.follow_stream.cancel()
+                        break
+                    self.apply_replicated(event)
+
+                # Acknowledge the position once the mutation is applied
+                epoch, sequence = event.epoch, event.sequence
+                self.followed = (epoch, sequence)
+                acknowledgements.put(pb2.subscription(epoch=epoch, since_sequence=sequence))
+
+                # The standby can take over while the primary waits for it (the primary answers no order without it)
+                if event.in_sync != self.synced:
+                    self.synced = event.in_sync
+                    print("[CatalogServicer] Standby %s with the primary at (%d, %d)"
+                          % ('in sync' if self.synced else 'out of sync', epoch, sequence))
+        except grpc.RpcError as e:
+            print("[CatalogServicer] Follow stream closed:", e.code())
+            if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                print("[CatalogServicer] The peer cannot have a hot standby (CATALOG_SERVER=asyncio)")
+        finally:
+            # End the request stream of the Follow call
+            acknowledgements.put(None)
+
+    def apply_replicated(self, event):
+        """
+        Apply the records of a mutation or of a snapshot chunk of the primary (hot standby)
+        Products keep the versions given by the primary, so the versions cached by the front-end components
+        still compare after a failover. The records are logged with their prices, so a restarted standby
+        recovers new products and new prices.
+        :param event: a replication_event message
+        """
+        # The last record of a product in the event wins
+        rows = {product.product_name: (product_price(product), product.quantity, product.version)
+                for product in event.products}
+        product_names = list(rows.keys())
+
+        if len(product_names) > 0:
+            self.import_lock.acquire()
+
+            # New products get the indices after the last product
+            n_products = len(self.catalog)
+            new_names = [product_name for product_name in product_names if product_name not in self.retriever.keys()]
+            new_indices = {product_name: n_products + i for i, product_name in enumerate(new_names)}
+            indices = [self.retriever[product_name] if product_name not in new_indices.keys()
+                       else new_indices[product_name] for product_name in product_names]
+
+            self.catalog_lock.acquire(indices)
+            sequence = self.store.log([(product_name, rows[product_name][1], rows[product_name][0])
+                                       for product_name in product_names])
+            for product_name, index in zip(product_names, indices):
+                price, quantity, version = rows[product_name]
+                if index < n_products:
+                    self.catalog[index] = (product_name, price, quantity)
+                    self.versions[index] = version
+                else:
+                    self.catalog.append((product_name, price, quantity))
+                    self.versions.append(version)
+                    self.retriever[product_name] = index
+
+            # Pass the records on to the read replicas and the change feed of the standby
+            self.replicate(indices)
+            self.catalog_lock.release(indices)
+
+            self.index.add(new_names)
+            self.import_lock.release()
+
+            # Count the mutation so that the writer thread writes it in the next checkpoint
+            self.mark_modified()
+
+            # The mutation is acknowledged once it is on disk (see CATALOG_DURABILITY)
+            self.store.sync(sequence)
+
+        # Keep the result of an order with a request ID for its retries after a failover
+        if event.request_id != '':
+            self.dedup.put((event.request_method, event.request_id), event.result)
+            self.forget_undone(event.request_method, event.request_id)
+
+    def watch_peer(self):
+        """
+        Take over when the primary has failed while this component is the standby,
+        and step down when the peer has taken over while this component is the primary
+        This function will be executed in a separate thread
+        """
+        while True:
+            time.sleep(FAILOVER_TIMEOUT / 4)
+
+            if self.role == STANDBY:
+                if time.monotonic() - self.heard_at <= FAILOVER_TIMEOUT:
+                    continue
+
+                # The primary has been silent: take over unless it still answers as the primary
+                # (a primary of an older term does not count, see follow_primary)
+                peer_role, peer_term = self.peer_role()
+                if peer_role == PRIMARY and peer_term >= self.term:
+                    continue
+                if not self.synced:
+                    # A standby out of sync (or in the middle of a snapshot) may not have every answered order
+                    print("[CatalogServicer] The primary is down, but the standby is not in sync with it")
+                    continue
+                self.promote(peer_term)
+            else:
+                # Two primaries after a partition: the one with the older term steps down, and the one that
+                # proceeded alone steps down for the standby that took over in the same term
+                peer_role, peer_term = self.peer_role()
+                if peer_role == PRIMARY and (peer_term > self.term or peer_term == self.term == self.alone_term):
+                    self.step_down(peer_term)
+                elif self.sync_replication.out_of_sync_for() > FAILOVER_TIMEOUT:
+                    self.proceed_alone()
+
+    def promote(self, peer_term):
+        """
+        Take over as the primary after the primary has failed (hot standby)
+        :param peer_term: the term of the peer if it answered (0 if it did not)
+        """
+        self.role_lock.acquire()
+        if self.role != STANDBY:
+            self.role_lock.release()
+            return
+
+        # New versions follow the versions given by the old primary,
+        # so the front-end components accept the changes made after the failover
+        self.version_counter = itertools.count(max(max(self.versions, default=0) + 1, int(time.time() * 1000000)))
+        self.term = max(self.term, peer_term) + 1
+        self.write_term()
+
+        # The old primary cannot answer orders without this component, so orders do not wait for a standby
+        # until the old primary (or another standby) follows this component
+        self.sync_replication.proceed_alone()
+        self.role = PRIMARY
+        self.role_lock.release()
+
+        # Stop following the old primary
+        if self.follow_stream is not None:
+            self.follow_stream.cancel()
+
+        self.metrics.increment('failovers')
+        print("[CatalogServicer] Took over as the primary (term %d)" % self.term)
+
+        # Restocks are made by the primary: schedule the products that are out of stock
+        for product_name, _, quantity in self.catalog:
+            if quantity == 0:
+                self.restock_scheduler.schedule(product_name)
+
+    def proceed_alone(self):
+        """
+        Answer orders without the standby after it has been out of sync for longer than FAILOVER_TIMEOUT
+        (ex. it is down, or it is still catching up after a restart), so a failed standby does not stop the orders.
+        The new term tells the standby that it has missed orders when it follows again. If the standby was cut off
+        and has taken over meanwhile, this component steps down when they reach each other again (see watch_peer),
+        and the orders it answered alone are lost.
+        """
+        self.role_lock.acquire()
+        if self.role != PRIMARY or self.sync_replication.writable():
+            self.role_lock.release()
+            return
+
+        self.term += 1
+        self.alone_term = self.term
+        self.write_term()
+        self.sync_replication.proceed_alone()
+        self.role_lock.release()
+
+        self.metrics.increment('standby_losses')
+        print("[CatalogServicer] Proceeding without the standby (term %d)" % self.term)
+
+    def step_down(self, term):
+        """
+        Become the standby of a newer primary (ex. after this component was cut off and its standby took over)
+        The new primary has every order this component answered while waiting for its standby. A snapshot of
+        the new primary replaces the mutations of rejected orders that the standby did not acknowledge, so their
+        results are forgotten, and of the orders answered after proceeding alone (see proceed_alone).
+        :param term: the term of the new primary
+        """
+        self.role_lock.acquire()
+        self.role = STANDBY
+        self.term = term
+        self.alone_term = 0
+        self.write_term()
+        self.followed = (0, 0)
+        self.synced = False
+        self.heard_at = time.monotonic()
+        for sequence, key in self.unacknowledged:
+            if sequence > self.sync_replication.confirmed:
+                self.dedup.discard(key)
+        self.unacknowledged = []
+        self.role_lock.release()
+
+        self.metrics.increment('step_downs')
+        print("[CatalogServicer] Stepped down to the standby of the primary of term %d" % term)
+
+    def send_invalidations(self, product_names, versions):
+        """
+        Send a batch of invalidations to the subscribers and to the front-end component
+        Each invalidation carries the current price, quantity and version of the product,
+        so front-end components can update their cached products instead of removing them.
+        :param product_names: names of the changed products
+        :param versions: versions of the products in the batch (the current versions are at least as new)
+        """
+        prices, quantities, versions = self.current_values(product_names)
+
+        # Give the batch a sequence number and wake up the subscribers
+        self.change_log.publish(list(product_names), versions, prices, quantities)
+
+        # Push the batch to the front-end component
+        if self.invalidation_sender is not None:
+            self.invalidation_sender.send(product_names, versions, prices, quantities)
+
+    def current_values(self, product_names):
+        """
+        Read the current price, quantity and version of products
+        The locks of the products are held so that each price and quantity is read with its own version.
+        :return: a list of prices in cents, a list of quantities and a list of versions
+        """
+        indices = [self.retriever[product_name] for product_name in product_names]
+
+        self.catalog_lock.acquire(indices)
+        records = [self.catalog[index] for index in indices]
+        versions = [self.versions[index] for index in indices]
+        self.catalog_lock.release(indices)
+
+        return [record[1] for record in records], [record[2] for record in records], versions
+
+    def invalidate(self, product_name, version):
+        # Add an invalidation to the next batch sent to the front-end component
+        self.invalidation_batcher.add([product_name], [version])
+
+    def invalidate_many(self, product_names, versions):
+        # Add invalidations for several products to the next batch sent to the front-end component
+        self.invalidation_batcher.add(product_names, versions)
+
+
+def product_infos(records):
+    """
+    Make product_info messages
+    :param records: a list of (product_name, price in cents, quantity, version)
+    """
+    return [pb2.product_info(product_name=product_name, price=format_cents(price), price_cents=price,
+                             quantity=quantity, version=version)
+            for product_name, price, quantity, version in records]
+
+
+def product_price(product):
+    """
+    Get the price in cents of a product_info message
+    Clients that do not send price_cents only send the decimal price string
+    """
+    if product.price_cents == 0 and product.price != '':
+        return parse_cents(product.price)
+    return product.price_cents
 
 
 class FrontStub(object):
@@ -241,12 +1485,12 @@ class FrontStub(object):
         # Initialize the stub
         self.stub = front_end_pb2_grpc.FrontStub(channel)
 
-    def Invalidate(self, product_name):
+    def Invalidate(self, product_name, version):
         """
         Send a invalidate request to the front-end component
         """
         # Make the message to send
-        message = front_end_pb2.product_front(product_name=product_name)
+        message = front_end_pb2.product_front(product_name=product_name, version=version)
 
         # Send the request
         result = self.stub.Invalidate(message, timeout=1)
@@ -256,17 +1500,261 @@ class FrontStub(object):
 
         return
 
+    def InvalidateMany(self, product_names, versions, prices=(), quantities=(), resync=False):
+        """
+        Start one invalidate request for several products to the front-end component without waiting for it
+        :param prices: prices in cents of the products at their versions (empty to only invalidate)
+        :param quantities: quantities of the products at their versions (empty to only invalidate)
+        :param resync: True to make the front-end component query every cached product again
+        :return: a grpc future of the result
+        """
+        # Make the message to send
+        message = front_end_pb2.product_list_front(product_names=product_names, versions=versions,
+                                                   price_cents=prices, quantities=quantities, resync=resync)
+
+        # Start the request
+        future = self.stub.InvalidateMany.future(message, timeout=INVALIDATION_TIMEOUT)
+
+        # Print out the request
+        print("[FrontStub]", "InvalidateMany(%s)" % ('resync' if resync else ','.join(product_names)))
+
+        return future
+
+
+class AsyncCatalogServicer(CatalogServicer):
+    """
+    A CatalogServicer that runs on a grpc.aio server
+    Queries read immutable records without locks, so they run on the event loop and an rpc call does not occupy
+    a thread of a thread pool. Work that takes the locks of the catalog or waits for the disk (orders, imports,
+    exports, snapshots, restocks and checkpoints) runs in the default executor, so a checkpoint that holds every
+    lock or an fsync does not stall the event loop.
+    The writer, restock and invalidation work runs as asyncio tasks instead of threads (see start_background_tasks).
+    """
+
+    def start_background_threads(self):
+        # Background work is started as asyncio tasks by start_background_tasks
+        pass
+
+    def start_background_tasks(self):
+        """
+        Start the asyncio tasks that run in the background of the servicer
+        Called on the running event loop
+        :return: the list of the tasks
+        """
+        # Wake up subscribers of the invalidation stream and read replicas on the event loop
+        self.change_log.attach(asyncio.get_running_loop())
+        self.mutation_log.attach(asyncio.get_running_loop())
+
+        return [
+            asyncio.ensure_future(self.write_catalog_file_async()),
+            asyncio.ensure_future(self.restock_scheduler.run_async()),
+            asyncio.ensure_future(self.invalidation_batcher.run_async()),
+        ]
+
+    async def write_catalog_file_async(self, interval=CHECKPOINT_INTERVAL):
+        """
+        Make the storage engine write a checkpoint of self.catalog to disk periodically
+        only if self.catalog has been modified since last write
+        The checkpoint writes a file, so it runs in the default executor instead of the event loop.
+        :param interval: seconds to wait between each attempt to write
+        """
+        while True:
+            # Sleep for 'interval' seconds to attempt writing periodically
+            await asyncio.sleep(interval)
+
+            # Write only if self.catalog has been modified since the last checkpoint started
+            generation = self.generation
+            if generation != self.checkpoint_generation:
+                await asyncio.get_running_loop().run_in_executor(None, self.checkpoint, generation)
+
+    async def Query(self, request, context):
+        return CatalogServicer.Query(self, request, context)
+
+    async def QueryMany(self, request, context):
+        return CatalogServicer.QueryMany(self, request, context)
+
+    async def Order(self, request, context):
+        return await self.run_mutation(CatalogServicer.Order, request, context)
+
+    async def OrderMany(self, request, context):
+        return await self.run_mutation(CatalogServicer.OrderMany, request, context)
+
+    async def CancelMany(self, request, context):
+        return await self.run_mutation(CatalogServicer.CancelMany, request, context)
+
+    async def run_mutation(self, handler, request, context):
+        """
+        Run the handler of an rpc call that modifies the catalog in the default executor
+        The handler takes the locks of products, which a checkpoint holds while it copies the catalog,
+        and may wait for an fsync (see CATALOG_DURABILITY).
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, handler, self, request, context)
+
+    async def Metrics(self, request, context):
+        return CatalogServicer.Metrics(self, request, context)
+
+    async def ListProducts(self, request, context):
+        return CatalogServicer.ListProducts(self, request, context)
+
+    async def Role(self, request, context):
+        return CatalogServicer.Role(self, request, context)
+
+    async def Follow(self, request_iterator, context):
+        """
+        Follow rpc call
+        A hot standby is only supported by the thread-based server: the standby is told so instead of waiting
+        for mutations that never come
+        """
+        await context.abort(grpc.StatusCode.UNIMPLEMENTED, "a hot standby needs CATALOG_SERVER=thread")
+
+    async def ImportProducts(self, request_iterator, context):
+        """
+        ImportProducts rpc call
+        Same as CatalogServicer.ImportProducts, but each chunk is applied in the default executor,
+        so the event loop keeps serving other rpc calls during a large import
+        """
+        added, updated, rejected = 0, 0, 0
+        async for chunk in request_iterator:
+            counts = await asyncio.get_running_loop().run_in_executor(None, self.import_chunk, chunk.products)
+            added, updated, rejected = added + counts[0], updated + counts[1], rejected + counts[2]
+
+        print("[AsyncCatalogServicer]", "ImportProducts: {'added': %d, 'updated': %d, 'rejected': %d}"
+              % (added, updated, rejected))
+        return pb2.import_result(added=added, updated=updated, rejected=rejected)
+
+    async def ExportProducts(self, request, context):
+        """
+        ExportProducts rpc call
+        Same as CatalogServicer.ExportProducts, but each chunk is read in the default executor,
+        and sending it waits for the client (flow control)
+        """
+        chunk_size = request.chunk_size if request.chunk_size > 0 else SNAPSHOT_CHUNK
+        print("[AsyncCatalogServicer]", "ExportProducts(%d)" % chunk_size)
+
+        start = 0
+        while start < len(self.catalog):
+            chunk, start = await asyncio.get_running_loop().run_in_executor(None, self.export_chunk, start, chunk_size)
+            yield chunk
+
+    async def SubscribeInvalidations(self, request, context):
+        """
+        SubscribeInvalidations rpc call
+        Same as CatalogServicer.SubscribeInvalidations, but waits for new events on the event loop
+        The call is cancelled when the subscriber goes away.
+        """
+        epoch, sequence = request.epoch, request.since_sequence
+        self.metrics.increment('invalidation_subscribers')
+        print("[AsyncCatalogServicer]", "SubscribeInvalidations(%d, %d)" % (epoch, sequence))
+
+        try:
+            while True:
+                # Wait for new events, waking up periodically like the thread-based call
+                events = await self.change_log.events_since_async(epoch, sequence, timeout=1)
+
+                if events is None:
+                    # The subscriber missed events: make it resynchronize and continue from the current sequence
+                    epoch, sequence = self.change_log.epoch, self.change_log.sequence
+                    self.metrics.increment('invalidation_resyncs')
+                    yield pb2.invalidation_event(epoch=epoch, sequence=sequence, resync=True)
+                    continue
+
+                for sequence, product_names, versions, prices, quantities in events:
+                    yield pb2.invalidation_event(epoch=epoch, sequence=sequence, product_names=product_names,
+                                                 versions=versions, price_cents=prices, quantities=quantities)
+        finally:
+            self.metrics.increment('invalidation_subscribers', -1)
+
+
+    async def Replicate(self, request, context):
+        """
+        Replicate rpc call
+        Same as CatalogServicer.Replicate, but waits for new mutations on the event loop
+        """
+        epoch, sequence = request.epoch, request.since_sequence
+        self.metrics.increment('replicas')
+        print("[AsyncCatalogServicer]", "Replicate(%d, %d)" % (epoch, sequence))
+
+        try:
+            while True:
+                events = await self.mutation_log.events_since_async(epoch, sequence, timeout=REPLICATION_HEARTBEAT)
+                for event in await self.replication_events_async(events, sequence):
+                    epoch, sequence = event.epoch, event.sequence
+                    yield event
+        finally:
+            self.metrics.increment('replicas', -1)
+
+    async def Changes(self, request, context):
+        """
+        Changes rpc call
+        Same as CatalogServicer.Changes, but waits for new changes on the event loop
+        """
+        epoch, sequence = request.epoch, request.since_sequence
+        self.metrics.increment('change_subscribers')
+        print("[AsyncCatalogServicer]", "Changes(%d, %d)" % (epoch, sequence))
+
+        try:
+            while True:
+                events = await self.mutation_log.events_since_async(epoch, sequence, timeout=REPLICATION_HEARTBEAT)
+                for event in await self.replication_events_async(events, sequence, 'change_snapshots'):
+                    epoch, sequence = event.epoch, event.sequence
+                    yield event
+        finally:
+            self.metrics.increment('change_subscribers', -1)
+
+    async def replication_events_async(self, events, sequence, snapshot_metric='replication_snapshots'):
+        """
+        Same as replication_events, but a snapshot, which holds every lock of the catalog, is taken
+        in the default executor
+        """
+        if events is None:
+            return await asyncio.get_running_loop().run_in_executor(None, self.replication_events, events, sequence,
+                                                                    snapshot_metric)
+        return self.replication_events(events, sequence, snapshot_metric)
+
+
+async def serve_async(catalog_file, port):
+    # Make a grpc.aio server that handles every rpc call on the event loop of this thread
+    print(port)
+    server = grpc.aio.server()
+
+    # Register AsyncCatalogServicer to the server and start its background tasks
+    # (references to the tasks are kept so that they are not garbage collected)
+    # A hot standby is only supported by the thread-based server
+    if CATALOG_PEER != '':
+        raise ValueError("CATALOG_PEER is not supported with CATALOG_SERVER=asyncio")
+    servicer = AsyncCatalogServicer(catalog_file=catalog_file, wal_file=WAL_FILE, store=CATALOG_STORE)
+    pb2_grpc.add_CatalogServicer_to_server(servicer, server)
+    tasks = servicer.start_background_tasks()
+
+    # Connect the server to a port number
+    server.add_insecure_port(f'[::]:{port}')
+
+    # Start the server
+    await server.start()
+
+    # Block current coroutine until the server stops
+    await server.wait_for_termination()
+
 
 def serve(catalog_file, port, max_workers):
     # Make a server that consist of a dynamic thread pool using a built-in method
     # with limited maximum number of threads passed on using the argument "max_workers"
     print(port)
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    servicer = CatalogServicer(catalog_file=catalog_file, wal_file=WAL_FILE, store=CATALOG_STORE,
+                               peer=CATALOG_PEER, role=CATALOG_ROLE)
+
+    if ADMISSION_QUEUE > 0:
+        # Queue rpc calls by priority in a queue of a bounded depth and shed the calls that find it full
+        executor = PriorityExecutor(max_workers, servicer.metrics)
+        interceptor = AdmissionInterceptor(executor, {ORDER: ADMISSION_QUEUE, QUERY: ADMISSION_QUERY_QUEUE},
+                                           servicer.metrics)
+        server = grpc.server(executor, interceptors=[interceptor],
+                             maximum_concurrent_rpcs=ADMISSION_MAX_RPCS if ADMISSION_MAX_RPCS > 0 else None)
+    else:
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
 
     # Register CatalogServicer to the thread pool
-    pb2_grpc.add_CatalogServicer_to_server(
-        CatalogServicer(catalog_file=catalog_file),
-        server)
+    pb2_grpc.add_CatalogServicer_to_server(servicer, server)
 
     # Connect the server to a port number
     server.add_insecure_port(f'[::]:{port}')
@@ -284,4 +1772,7 @@ if __name__ == '__main__':
     sys.stdout = open(os.devnull, 'w')
 
     # Start the server
-    serve(CATALOG_FILE, CATALOG_PORT, MAX_WORKERS)
+    if CATALOG_SERVER == 'asyncio':
+        asyncio.run(serve_async(CATALOG_FILE, CATALOG_PORT))
+    else:
+        serve(CATALOG_FILE, CATALOG_PORT, MAX_WORKERS)
@@ -14,14 +14,31 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rcatalog.proto\x12\x05unary\"\x1f\n\x07product\x12\x14\n\x0cproduct_name\x18\x01 \x01(\t\"1\n\x0equery_response\x12\r\n\x05price\x18\x01 \x01(\t\x12\x10\n\x08quantity\x18\x02 \x01(\x05\"/\n\x05order\x12\x14\n\x0cproduct_name\x18\x01 \x01(\t\x12\x10\n\x08quantity\x18\x02 \x01(\x05\"$\n\x0corder_result\x12\x14\n\x0corder_result\x18\x01 \x01(\x05\x32i\n\x07\x43\x61talog\x12\x30\n\x05Query\x12\x0e.unary.product\x1a\x15.unary.query_response\"\x00\x12,\n\x05Order\x12\x0c.unary.order\x1a\x13.unary.order_result\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rcatalog.proto\x12\x05unary\"\x1f\n\x07product\x12\x14\n\x0cproduct_name\x18\x01 \x01(\t\"j\n\x0equery_response\x12\r\n\x05price\x18\x01 \x01(\t\x12\x10\n\x08quantity\x18\x02 \x01(\x05\x12\x0f\n\x07version\x18\x03 \x01(\x03\x12\x11\n\tstaleness\x18\x04 \x01(\x01\x12\x13\n\x0bprice_cents\x18\x05 \x01(\x03\"%\n\x0cproduct_list\x12\x15\n\rproduct_names\x18\x01 \x03(\t\"k\n\x0cproduct_info\x12\x14\n\x0cproduct_name\x18\x01 \x01(\t\x12\r\n\x05price\x18\x02 \x01(\t\x12\x10\n\x08quantity\x18\x03 \x01(\x05\x12\x0f\n\x07version\x18\x04 \x01(\x03\x12\x13\n\x0bprice_cents\x18\x05 \x01(\x03\"O\n\x13query_many_response\x12%\n\x08products\x18\x01 \x03(\x0b\x32\x13.unary.product_info\x12\x11\n\tstaleness\x18\x02 \x01(\x01\"C\n\x05order\x12\x14\n\x0cproduct_name\x18\x01 \x01(\t\x12\x10\n\x08quantity\x18\x02 \x01(\x05\x12\x12\n\nrequest_id\x18\x03 \x01(\t\">\n\norder_list\x12\x1c\n\x06orders\x18\x01 \x03(\x0b\x32\x0c.unary.order\x12\x12\n\nrequest_id\x18\x02 \x01(\t\"9\n\x0corder_result\x12\x14\n\x0corder_result\x18\x01 \x01(\x05\x12\x13\n\x0bprice_cents\x18\x02 \x03(\x03\"\x11\n\x0fmetrics_request\"%\n\x06metric\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01\"2\n\x10metrics_response\x12\x1e\n\x07metrics\x18\x01 \x03(\x0b\x32\r.unary.metric\"5\n\x0csubscription\x12\r\n\x05\x65poch\x18\x01 \x01(\x03\x12\x16\n\x0esince_sequence\x18\x02 \x01(\x03\"\x97\x01\n\x12invalidation_event\x12\r\n\x05\x65poch\x18\x01 \x01(\x03\x12\x10\n\x08sequence\x18\x02 \x01(\x03\x12\x15\n\rproduct_names\x18\x03 \x03(\t\x12\x0e\n\x06resync\x18\x04 \x01(\x08\x12\x10\n\x08versions\x18\x05 \x03(\x03\x12\x13\n\x0bprice_cents\x18\x06 \x03(\x03\x12\x12\n\nquantities\x18\x07 \x03(\x05\"\x8e\x02\n\x11replication_event\x12\r\n\x05\x65poch\x18\x01 \x01(\x03\x12\x10\n\x08sequence\x18\x02 \x01(\x03\x12%\n\x08products\x18\x03 \x03(\x0b\x32\x13.unary.product_info\x12\x10\n\x08snapshot\x18\x04 \x01(\x08\x12\x15\n\rsnapshot_done\x18\x05 \x01(\x08\x12\x18\n\x10primary_sequence\x18\x06 \x01(\x03\x12\x16\n\x0erequest_method\x18\x07 \x01(\t\x12\x12\n\nrequest_id\x18\x08 \x01(\t\x12#\n\x06result\x18\t \x01(\x0b\x32\x13.unary.order_result\x12\x0f\n\x07in_sync\x18\n \x01(\x08\x12\x0c\n\x04term\x18\x0b \x01(\x03\"\x0e\n\x0crole_request\"+\n\rrole_response\x12\x0c\n\x04role\x18\x01 \x01(\t\x12\x0c\n\x04term\x18\x02 \x01(\x03\"6\n\rproduct_chunk\x12%\n\x08products\x18\x01 \x03(\x0b\x32\x13.unary.product_info\"A\n\rimport_result\x12\r\n\x05\x61\x64\x64\x65\x64\x18\x01 \x01(\x05\x12\x0f\n\x07updated\x18\x02 \x01(\x05\x12\x10\n\x08rejected\x18\x03 \x01(\x05\"$\n\x0e\x65xport_request\x12\x12\n\nchunk_size\x18\x01 \x01(\x05\"E\n\x0clist_request\x12\x0e\n\x06prefix\x18\x01 \x01(\t\x12\x12\n\npage_token\x18\x02 \x01(\t\x12\x11\n\tpage_size\x18\x03 \x01(\x05\"O\n\rlist_response\x12%\n\x08products\x18\x01 \x03(\x0b\x32\x13.unary.product_info\x12\x17\n\x0fnext_page_token\x18\x02 \x01(\t2\xd8\x06\n\x07\x43\x61talog\x12\x30\n\x05Query\x12\x0e.unary.product\x1a\x15.unary.query_response\"\x00\x12,\n\x05Order\x12\x0c.unary.order\x1a\x13.unary.order_result\"\x00\x12>\n\tQueryMany\x12\x13.unary.product_list\x1a\x1a.unary.query_many_response\"\x00\x12\x35\n\tOrderMany\x12\x11.unary.order_list\x1a\x13.unary.order_result\"\x00\x12\x36\n\nCancelMany\x12\x11.unary.order_list\x1a\x13.unary.order_result\"\x00\x12<\n\x07Metrics\x12\x16.unary.metrics_request\x1a\x17.unary.metrics_response\"\x00\x12L\n\x16SubscribeInvalidations\x12\x13.unary.subscription\x1a\x19.unary.invalidation_event\"\x00\x30\x01\x12>\n\tReplicate\x12\x13.unary.subscription\x1a\x18.unary.replication_event\"\x00\x30\x01\x12<\n\x07\x43hanges\x12\x13.unary.subscription\x1a\x18.unary.replication_event\"\x00\x30\x01\x12@\n\x0eImportProducts\x12\x14.unary.product_chunk\x1a\x14.unary.import_result\"\x00(\x01\x12\x41\n\x0e\x45xportProducts\x12\x15.unary.export_request\x1a\x14.unary.product_chunk\"\x00\x30\x01\x12;\n\x0cListProducts\x12\x13.unary.list_request\x1a\x14.unary.list_response\"\x00\x12=\n\x06\x46ollow\x12\x13.unary.subscription\x1a\x18.unary.replication_event\"\x00(\x01\x30\x01\x12\x33\n\x04Role\x12\x13.unary.role_request\x1a\x14.unary.role_response\"\x00\x62\x06proto3')
 
 
 
 _PRODUCT = DESCRIPTOR.message_types_by_name['product']
 _QUERY_RESPONSE = DESCRIPTOR.message_types_by_name['query_response']
+_PRODUCT_LIST = DESCRIPTOR.message_types_by_name['product_list']
+_PRODUCT_INFO = DESCRIPTOR.message_types_by_name['product_info']
+_QUERY_MANY_RESPONSE = DESCRIPTOR.message_types_by_name['query_many_response']
 _ORDER = DESCRIPTOR.message_types_by_name['order']
+_ORDER_LIST = DESCRIPTOR.message_types_by_name['order_list']
 _ORDER_RESULT = DESCRIPTOR.message_types_by_name['order_result']
+_METRICS_REQUEST = DESCRIPTOR.message_types_by_name['metrics_request']
+_METRIC = DESCRIPTOR.message_types_by_name['metric']
+_METRICS_RESPONSE = DESCRIPTOR.message_types_by_name['metrics_response']
+_SUBSCRIPTION = DESCRIPTOR.message_types_by_name['subscription']
+_INVALIDATION_EVENT = DESCRIPTOR.message_types_by_name['invalidation_event']
+_REPLICATION_EVENT = DESCRIPTOR.message_types_by_name['replication_event']
+_ROLE_REQUEST = DESCRIPTOR.message_types_by_name['role_request']
+_ROLE_RESPONSE = DESCRIPTOR.message_types_by_name['role_response']
+_PRODUCT_CHUNK = DESCRIPTOR.message_types_by_name['product_chunk']
+_IMPORT_RESULT = DESCRIPTOR.message_types_by_name['import_result']
+_EXPORT_REQUEST = DESCRIPTOR.message_types_by_name['export_request']
+_LIST_REQUEST = DESCRIPTOR.message_types_by_name['list_request']
+_LIST_RESPONSE = DESCRIPTOR.message_types_by_name['list_response']
 product = _reflection.GeneratedProtocolMessageType('product', (_message.Message,), {
   'DESCRIPTOR' : _PRODUCT,
   '__module__' : 'catalog_pb2'
@@ -36,6 +53,27 @@ query_response = _reflection.GeneratedProtocolMessageType('query_response', (_me
   })
 _sym_db.RegisterMessage(query_response)
 
+product_list = _reflection.GeneratedProtocolMessageType('product_list', (_message.Message,), {
+  'DESCRIPTOR' : _PRODUCT_LIST,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.product_list)
+  })
+_sym_db.RegisterMessage(product_list)
+
+product_info = _reflection.GeneratedProtocolMessageType('product_info', (_message.Message,), {
+  'DESCRIPTOR' : _PRODUCT_INFO,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.product_info)
+  })
+_sym_db.RegisterMessage(product_info)
+
+query_many_response = _reflection.GeneratedProtocolMessageType('query_many_response', (_message.Message,), {
+  'DESCRIPTOR' : _QUERY_MANY_RESPONSE,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.query_many_response)
+  })
+_sym_db.RegisterMessage(query_many_response)
+
 order = _reflection.GeneratedProtocolMessageType('order', (_message.Message,), {
   'DESCRIPTOR' : _ORDER,
   '__module__' : 'catalog_pb2'
@@ -43,6 +81,13 @@ order = _reflection.GeneratedProtocolMessageType('order', (_message.Message,), {
   })
 _sym_db.RegisterMessage(order)
 
+order_list = _reflection.GeneratedProtocolMessageType('order_list', (_message.Message,), {
+  'DESCRIPTOR' : _ORDER_LIST,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.order_list)
+  })
+_sym_db.RegisterMessage(order_list)
+
 order_result = _reflection.GeneratedProtocolMessageType('order_result', (_message.Message,), {
   'DESCRIPTOR' : _ORDER_RESULT,
   '__module__' : 'catalog_pb2'
@@ -50,6 +95,97 @@ order_result = _reflection.GeneratedProtocolMessageType('order_result', (_messag
   })
 _sym_db.RegisterMessage(order_result)
 
+metrics_request = _reflection.GeneratedProtocolMessageType('metrics_request', (_message.Message,), {
+  'DESCRIPTOR' : _METRICS_REQUEST,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.metrics_request)
+  })
+_sym_db.RegisterMessage(metrics_request)
+
+metric = _reflection.GeneratedProtocolMessageType('metric', (_message.Message,), {
+  'DESCRIPTOR' : _METRIC,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.metric)
+  })
+_sym_db.RegisterMessage(metric)
+
+metrics_response = _reflection.GeneratedProtocolMessageType('metrics_response', (_message.Message,), {
+  'DESCRIPTOR' : _METRICS_RESPONSE,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.metrics_response)
+  })
+_sym_db.RegisterMessage(metrics_response)
+
+subscription = _reflection.GeneratedProtocolMessageType('subscription', (_message.Message,), {
+  'DESCRIPTOR' : _SUBSCRIPTION,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.subscription)
+  })
+_sym_db.RegisterMessage(subscription)
+
+invalidation_event = _reflection.GeneratedProtocolMessageType('invalidation_event', (_message.Message,), {
+  'DESCRIPTOR' : _INVALIDATION_EVENT,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.invalidation_event)
+  })
+_sym_db.RegisterMessage(invalidation_event)
+
+replication_event = _reflection.GeneratedProtocolMessageType('replication_event', (_message.Message,), {
+  'DESCRIPTOR' : _REPLICATION_EVENT,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.replication_event)
+  })
+_sym_db.RegisterMessage(replication_event)
+
+role_request = _reflection.GeneratedProtocolMessageType('role_request', (_message.Message,), {
+  'DESCRIPTOR' : _ROLE_REQUEST,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.role_request)
+  })
+_sym_db.RegisterMessage(role_request)
+
+role_response = _reflection.GeneratedProtocolMessageType('role_response', (_message.Message,), {
+  'DESCRIPTOR' : _ROLE_RESPONSE,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.role_response)
+  })
+_sym_db.RegisterMessage(role_response)
+
+product_chunk = _reflection.GeneratedProtocolMessageType('product_chunk', (_message.Message,), {
+  'DESCRIPTOR' : _PRODUCT_CHUNK,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.product_chunk)
+  })
+_sym_db.RegisterMessage(product_chunk)
+
+import_result = _reflection.GeneratedProtocolMessageType('import_result', (_message.Message,), {
+  'DESCRIPTOR' : _IMPORT_RESULT,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.import_result)
+  })
+_sym_db.RegisterMessage(import_result)
+
+export_request = _reflection.GeneratedProtocolMessageType('export_request', (_message.Message,), {
+  'DESCRIPTOR' : _EXPORT_REQUEST,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.export_request)
+  })
+_sym_db.RegisterMessage(export_request)
+
+list_request = _reflection.GeneratedProtocolMessageType('list_request', (_message.Message,), {
+  'DESCRIPTOR' : _LIST_REQUEST,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.list_request)
+  })
+_sym_db.RegisterMessage(list_request)
+
+list_response = _reflection.GeneratedProtocolMessageType('list_response', (_message.Message,), {
+  'DESCRIPTOR' : _LIST_RESPONSE,
+  '__module__' : 'catalog_pb2'
+  # @@protoc_insertion_point(class_scope:unary.list_response)
+  })
+_sym_db.RegisterMessage(list_response)
+
 _CATALOG = DESCRIPTOR.services_by_name['Catalog']
 if _descriptor._USE_C_DESCRIPTORS == False:
 
@@ -57,11 +193,45 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   _PRODUCT._serialized_start=24
   _PRODUCT._serialized_end=55
   _QUERY_RESPONSE._serialized_start=57
-  _QUERY_RESPONSE._serialized_end=106
-  _ORDER._serialized_start=108
-  _ORDER._serialized_end=155
-  _ORDER_RESULT._serialized_start=157
-  _ORDER_RESULT._serialized_end=193
-  _CATALOG._serialized_start=195
-  _CATALOG._serialized_end=300
+  _QUERY_RESPONSE._serialized_end=163
+  _PRODUCT_LIST._serialized_start=165
+  _PRODUCT_LIST._serialized_end=202
+  _PRODUCT_INFO._serialized_start=204
+  _PRODUCT_INFO._serialized_end=311
+  _QUERY_MANY_RESPONSE._serialized_start=313
+  _QUERY_MANY_RESPONSE._serialized_end=392
+  _ORDER._serialized_start=394
+  _ORDER._serialized_end=461
+  _ORDER_LIST._serialized_start=463
+  _ORDER_LIST._serialized_end=525
+  _ORDER_RESULT._serialized_start=527
+  _ORDER_RESULT._serialized_end=584
+  _METRICS_REQUEST._serialized_start=586
+  _METRICS_REQUEST._serialized_end=603
+  _METRIC._serialized_start=605
+  _METRIC._serialized_end=642
+  _METRICS_RESPONSE._serialized_start=644
+  _METRICS_RESPONSE._serialized_end=694
+  _SUBSCRIPTION._serialized_start=696
+  _SUBSCRIPTION._serialized_end=749
+  _INVALIDATION_EVENT._serialized_start=752
+  _INVALIDATION_EVENT._serialized_end=903
+  _REPLICATION_EVENT._serialized_start=906
+  _REPLICATION_EVENT._serialized_end=1176
+  _ROLE_REQUEST._serialized_start=1178
+  _ROLE_REQUEST._serialized_end=1192
+  _ROLE_RESPONSE._serialized_start=1194
+  _ROLE_RESPONSE._serialized_end=1237
+  _PRODUCT_CHUNK._serialized_start=1239
+  _PRODUCT_CHUNK._serialized_end=1293
+  _IMPORT_RESULT._serialized_start=1295
+  _IMPORT_RESULT._serialized_end=1360
+  _EXPORT_REQUEST._serialized_start=1362
+  _EXPORT_REQUEST._serialized_end=1398
+  _LIST_REQUEST._serialized_start=1400
+  _LIST_REQUEST._serialized_end=1469
+  _LIST_RESPONSE._serialized_start=1471
+  _LIST_RESPONSE._serialized_end=1550
+  _CATALOG._serialized_start=1553
+  _CATALOG._serialized_end=2409
 # @@protoc_insertion_point(module_scope)
@@ -0,0 +1,115 @@
+import asyncio
+import collections
+import itertools
+import threading
+import time
+
+
+class ChangeLog(object):
+    """
+    A bounded in-memory log of catalog change events
+    Each event is given the next sequence number, so subscribers can tell whether they have missed events.
+    An event is a tuple of (sequence number, *fields), where the fields are given to publish.
+    Only the latest events are kept; subscribers that fall behind them have to resynchronize.
+    """
+
+    def __init__(self, capacity):
+        """
+        :param capacity: maximum number of events to keep
+        """
+        self.events = collections.deque(maxlen=capacity)
+
+        # The sequence number of the last event
+        self.sequence = 0
+
+        # Identifies this run of the catalog component, since sequence numbers start again from 1 after a restart
+        self.epoch = int(time.time() * 1000)
+
+        # A condition variable used to wake up subscribers waiting for new events
+        self.condition = threading.Condition()
+
+        # The event loop and the event used to wake up subscribers waiting on asyncio (see attach)
+        self.loop = None
+        self.event = None
+
+    def attach(self, loop):
+        """
+        Wake up subscribers waiting in events_since_async on an asyncio event loop
+        :param loop: the running event loop
+        """
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def wake_async(self):
+        """
+        Wake up every subscriber waiting on the event loop and give later subscribers a new event
+        Called on the event loop
+        """
+        event, self.event = self.event, asyncio.Event()
+        event.set()
+
+    def publish(self, *fields):
+        """
+        Add an event for changed products
+        :param fields: the fields of the event (ex. names of the changed products and their versions)
+        :return: the sequence number of the event
+        """
+        self.condition.acquire()
+        self.sequence += 1
+        self.events.append((self.sequence,) + fields)
+        sequence = self.sequence
+        self.condition.notify_all()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wake_async)
+        self.condition.release()
+
+        return sequence
+
+    def events_since(self, epoch, sequence, timeout=None):
+        """
+        Get the events after a sequence number, waiting for a new event if there is none
+        :param epoch: the epoch of the sequence number
+        :param sequence: the sequence number of the last event the subscriber has received
+        :param timeout: seconds to wait for a new event
+        :return: a list of (sequence, *fields), or None if events after the sequence number are not kept
+        """
+        self.condition.acquire()
+
+        # A sequence number from another run of the catalog component cannot be continued
+        if epoch != self.epoch or sequence > self.sequence:
+            self.condition.release()
+            return None
+
+        # Wait for a new event
+        if sequence == self.sequence:
+            self.condition.wait(timeout)
+
+        # Sequence numbers of the kept events are consecutive, so the events after the sequence number
+        # are the last (self.sequence - sequence) events, if that many are still kept
+        count = self.sequence - sequence
+        if count > len(self.events):
+            events = None
+        else:
+            # Read them from the end of the log, so a poll costs the number of new events, not the size of the log
+            events = list(itertools.islice(reversed(self.events), count))
+            events.reverse()
+        self.condition.release()
+
+        return events
+
+    async def events_since_async(self, epoch, sequence, timeout=None):
+        """
+        Get the events after a sequence number, waiting on the event loop for a new event if there is none
+        Same as events_since but for subscribers running on the event loop given to attach
+        """
+        # Take the event before checking for new events, so an event published after the check wakes up this call
+        event = self.event
+        events = self.events_since(epoch, sequence, timeout=0)
+        if events is not None and len(events) == 0:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            events = self.events_since(epoch, sequence, timeout=0)
+
+        return events
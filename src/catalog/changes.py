@@ -0,0 +1,92 @@
+"""
+Follow the change feed of a catalog component (the Changes rpc call) and print every change as a csv line.
+A downstream consumer (ex. a search indexer) can read the lines instead of polling every product with Query.
+ex. python3 changes.py --catalog_host 127.0.0.1 --catalog_port 1130 --state_file data/changes.state
+
+Columns: kind,sequence,product_name,price,quantity,version
+kind is 'snapshot' for the products of a snapshot and 'change' for a change after it.
+A snapshot is sent when the feed cannot continue from the saved position (the consumer fell off the end of the
+change log, or the catalog component restarted); the consumer replaces what it has with the snapshot.
+
+The position in the feed (epoch and sequence number) is saved to the state file after each event,
+so a restarted consumer continues where it stopped.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+import grpc
+import catalog_pb2 as pb2
+import catalog_pb2_grpc as pb2_grpc
+from csv_tools import format_cents
+
+
+def parse():
+    """
+    This function will be used to parse input arguments to the main function
+    Returns: arguments
+    """
+    parser = argparse.ArgumentParser(description='Print the changes of the products of a catalog component.')
+    parser.add_argument('--catalog_host', type=str, default='127.0.0.1')
+    parser.add_argument('--catalog_port', type=int, default=1130)
+    # File that keeps the position in the change feed across restarts (empty to start with a snapshot)
+    parser.add_argument('--state_file', type=str, default='')
+
+    args = parser.parse_args()
+    return args
+
+
+def read_state(file_name):
+    """
+    Read the saved position in the change feed
+    :return: (epoch, sequence), or (0, 0) to start with a snapshot
+    """
+    if file_name == '' or not os.path.exists(file_name):
+        return 0, 0
+    with open(file_name, 'r') as state_file:
+        epoch, sequence = state_file.read().split(',')
+    return int(epoch), int(sequence)
+
+
+def write_state(file_name, epoch, sequence):
+    """
+    Save the position in the change feed (written to a temporary file that replaces the state file)
+    """
+    if file_name == '':
+        return
+    with open(file_name + '.tmp', 'w') as state_file:
+        state_file.write('%d,%d' % (epoch, sequence))
+    os.replace(file_name + '.tmp', file_name)
+
+
+def main(args):
+    channel = grpc.insecure_channel('{}:{}'.format(args.catalog_host, args.catalog_port))
+    stub = pb2_grpc.CatalogStub(channel)
+    csvwriter = csv.writer(sys.stdout)
+
+    epoch, sequence = read_state(args.state_file)
+    while True:
+        try:
+            for event in stub.Changes(pb2.subscription(epoch=epoch, since_sequence=sequence)):
+                kind = 'snapshot' if event.snapshot else 'change'
+                csvwriter.writerows((kind, event.sequence, product.product_name, format_cents(product.price_cents),
+                                     product.quantity, product.version)
+                                    for product in event.products)
+                sys.stdout.flush()
+
+                # A snapshot is only complete with its last chunk, so the position is saved after it
+                if not event.snapshot or event.snapshot_done:
+                    epoch, sequence = event.epoch, event.sequence
+                    write_state(args.state_file, epoch, sequence)
+        except grpc.RpcError as e:
+            print("Change feed closed:", e.code(), file=sys.stderr)
+
+        # Wait before subscribing again
+        time.sleep(1)
+
+
+if __name__ == '__main__':
+    main(parse())
@@ -1,4 +1,13 @@
 import csv
+import io
+import os
+import zlib
+
+from prices import parse_cents, format_cents
+
+# The first column of the last line of a catalog file written by write_catalog
+TRAILER = '#checkpoint'
+
 
 def write_csv(file_name, rows):
     """
@@ -11,28 +20,113 @@ def write_csv(file_name, rows):
         csvwriter.writerows(rows)
 
 
-def read_catalog(file_name):
+def read_catalog(file_name, require_trailer=False):
     """
     Read catalog from a csv file
+    A file written by write_catalog ends with a trailer, and a file whose trailer does not match its content
+    (ex. a checkpoint cut short by a crash of the machine) is rejected.
     :param file_name: path of the file
+    :param require_trailer: reject a file without a trailer too (ex. when a previous checkpoint exists,
+                            every complete catalog file has one)
     :return:
         fields: Column information from the csv file
         rows: Each row will contain data for each product
     """
+    # Read the file and check its trailer
+    with open(file_name, 'rb') as csvfile:
+        data = csvfile.read()
+    content, n_products = check_trailer(file_name, data, require_trailer)
+
     # Read each row from the file
-    rows = []
-    with open(file_name, 'r') as csvfile:
-        csvreader = csv.reader(csvfile)
-        for row in csvreader:
-            rows.append(row)
+    rows = list(csv.reader(io.StringIO(content.decode(), newline='')))
+    if len(rows) == 0:
+        raise ValueError('"%s" has no header' % file_name)
 
     # The first row is the field variable that contains the column information
     field, rows = rows[0], rows[1:]
+    if n_products is not None and len(rows) != n_products:
+        raise ValueError('"%s" has %d products instead of %d' % (file_name, len(rows), n_products))
 
-    # Change the data type of the third column into int
-    # This is the quantity of the product
+    # Change the data type of the second column into an integer number of cents (the price of the product)
+    # and the data type of the third column into int (the quantity of the product)
     for row in rows:
+        row[1] = parse_cents(row[1])
         row[2] = int(row[2])
 
     # Return results
-    return field, rows
\ No newline at end of file
+    return field, rows
+
+
+def check_trailer(file_name, data, require_trailer):
+    """
+    Split the content of a catalog file from its trailer and check the checksum of the content
+    :param file_name: path of the file (for error messages)
+    :param data: the bytes of the file
+    :param require_trailer: raise ValueError if the file has no trailer
+    :return: the content before the trailer and the number of products in the trailer (None without a trailer)
+    """
+    # The trailer is the last line
+    start = data.rfind(b'\n', 0, len(data) - 1) + 1
+    line = data[start:]
+    if not line.startswith(TRAILER.encode() + b','):
+        if require_trailer:
+            raise ValueError('"%s" has no trailer' % file_name)
+        return data, None
+
+    # "#checkpoint,<number of products>,<crc32 of the lines before the trailer>"
+    try:
+        _, n_products, checksum = line.decode().strip().split(',')
+        n_products, checksum = int(n_products), int(checksum)
+    except ValueError:
+        raise ValueError('"%s" has an invalid trailer' % file_name)
+    if zlib.crc32(data[:start]) != checksum:
+        raise ValueError('The checksum of "%s" does not match its trailer' % file_name)
+    return data[:start], n_products
+
+
+def write_catalog(file_name, fields, records):
+    """
+    Write catalog records to a csv file
+    Prices are written as decimal strings (ex. 26.89), so the file can be read by older versions
+    The last line is a trailer with the number of products and the crc32 of the lines before it,
+    so that read_catalog can tell a complete file from one cut short.
+    :param file_name: path of the file
+    :param fields: Column information
+    :param records: (product_name, price in cents, quantity) of each product
+    """
+    n_products = 0
+    with open(file_name, 'w', newline='') as csvfile:
+        csvwriter = csv.writer(csvfile)
+        csvwriter.writerow(fields)
+        for product_name, price, quantity in records:
+            csvwriter.writerow((product_name, format_cents(price), quantity))
+            n_products += 1
+
+    # Read the file back for the checksum instead of computing it row by row (it is still in the page cache)
+    with open(file_name, 'rb') as csvfile:
+        checksum = zlib.crc32(csvfile.read())
+    with open(file_name, 'a', newline='') as csvfile:
+        csv.writer(csvfile).writerow((TRAILER, n_products, checksum))
+
+
+def read_restock_config(file_name):
+    """
+    Read the restock delay and the restock level of products from a csv file
+    Columns: product_name, restock_delay (seconds), restock_level
+    :param file_name: path of the file
+    :return: a dictionary that maps product names to (restock_delay, restock_level)
+    """
+    # Products that are not in the file use the default restock delay and level
+    if not os.path.exists(file_name):
+        return dict()
+
+    config = dict()
+    with open(file_name, 'r') as csvfile:
+        csvreader = csv.reader(csvfile)
+
+        # Skip the header
+        next(csvreader, None)
+        for row in csvreader:
+            config[row[0]] = (float(row[1]), int(row[2]))
+
+    return config
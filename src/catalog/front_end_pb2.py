@@ -14,11 +14,12 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0f\x66ront_end.proto\x12\x05unary\"%\n\rproduct_front\x12\x14\n\x0cproduct_name\x18\x01 \x01(\t\")\n\x15invalidation_response\x12\x10\n\x08response\x18\x01 \x01(\x05\x32K\n\x05\x46ront\x12\x42\n\nInvalidate\x12\x14.unary.product_front\x1a\x1c.unary.invalidation_response\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0f\x66ront_end.proto\x12\x05unary\"6\n\rproduct_front\x12\x14\n\x0cproduct_name\x18\x01 \x01(\t\x12\x0f\n\x07version\x18\x02 \x01(\x03\"v\n\x12product_list_front\x12\x15\n\rproduct_names\x18\x01 \x03(\t\x12\x10\n\x08versions\x18\x02 \x03(\x03\x12\x13\n\x0bprice_cents\x18\x03 \x03(\x03\x12\x12\n\nquantities\x18\x04 \x03(\x05\x12\x0e\n\x06resync\x18\x05 \x01(\x08\")\n\x15invalidation_response\x12\x10\n\x08response\x18\x01 \x01(\x05\x32\x98\x01\n\x05\x46ront\x12\x42\n\nInvalidate\x12\x14.unary.product_front\x1a\x1c.unary.invalidation_response\"\x00\x12K\n\x0eInvalidateMany\x12\x19.unary.product_list_front\x1a\x1c.unary.invalidation_response\"\x00\x62\x06proto3')
 
 
 
 _PRODUCT_FRONT = DESCRIPTOR.message_types_by_name['product_front']
+_PRODUCT_LIST_FRONT = DESCRIPTOR.message_types_by_name['product_list_front']
 _INVALIDATION_RESPONSE = DESCRIPTOR.message_types_by_name['invalidation_response']
 product_front = _reflection.GeneratedProtocolMessageType('product_front', (_message.Message,), {
   'DESCRIPTOR' : _PRODUCT_FRONT,
@@ -27,6 +28,13 @@ product_front = _reflection.GeneratedProtocolMessageType('product_front', (_mess
   })
 _sym_db.RegisterMessage(product_front)
 
+product_list_front = _reflection.GeneratedProtocolMessageType('product_list_front', (_message.Message,), {
+  'DESCRIPTOR' : _PRODUCT_LIST_FRONT,
+  '__module__' : 'front_end_pb2'
+  # @@protoc_insertion_point(class_scope:unary.product_list_front)
+  })
+_sym_db.RegisterMessage(product_list_front)
+
 invalidation_response = _reflection.GeneratedProtocolMessageType('invalidation_response', (_message.Message,), {
   'DESCRIPTOR' : _INVALIDATION_RESPONSE,
   '__module__' : 'front_end_pb2'
@@ -39,9 +47,11 @@ if _descriptor._USE_C_DESCRIPTORS == False:
 
   DESCRIPTOR._options = None
   _PRODUCT_FRONT._serialized_start=26
-  _PRODUCT_FRONT._serialized_end=63
-  _INVALIDATION_RESPONSE._serialized_start=65
-  _INVALIDATION_RESPONSE._serialized_end=106
-  _FRONT._serialized_start=108
-  _FRONT._serialized_end=183
+  _PRODUCT_FRONT._serialized_end=80
+  _PRODUCT_LIST_FRONT._serialized_start=82
+  _PRODUCT_LIST_FRONT._serialized_end=200
+  _INVALIDATION_RESPONSE._serialized_start=202
+  _INVALIDATION_RESPONSE._serialized_end=243
+  _FRONT._serialized_start=246
+  _FRONT._serialized_end=398
 # @@protoc_insertion_point(module_scope)
@@ -0,0 +1,266 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class InvalidationBatcher(object):
+    """
+    Coalesce product names to invalidate over a short window and send them in one batch
+    A product that is invalidated several times during a window is sent only once with its latest version.
+    """
+
+    def __init__(self, send, window, metrics):
+        """
+        :param send: a function that sends a list of product names to invalidate and a list of their versions
+        :param window: seconds to wait for more product names after the first one of a batch
+        :param metrics: the Metrics instance to report batch sizes and the dedup ratio
+        """
+        self.send = send
+        self.window = window
+        self.metrics = metrics
+
+        # Product names waiting to be sent and their latest versions
+        self.pending = dict()
+
+        # A condition variable used to wake up the sender thread when the first product name of a batch arrives
+        self.condition = threading.Condition()
+
+        # The event loop and the event used to wake up the sender task when the batcher runs on asyncio
+        self.loop = None
+        self.wakeup = None
+
+        # Ratio of invalidations removed by coalescing
+        self.metrics.derive('invalidation_dedup_ratio', lambda metrics: (
+            1 - metrics.get('invalidations_sent') / metrics.get('invalidations_requested')
+            if metrics.get('invalidations_requested') > 0 else 0))
+
+    def add(self, product_names, versions):
+        """
+        Add product names to the next batch
+        :param product_names: names of the changed products
+        :param versions: versions of the products after the changes
+        """
+        self.condition.acquire()
+        for product_name, version in zip(product_names, versions):
+            self.pending[product_name] = max(version, self.pending.get(product_name, 0))
+        self.condition.notify()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+        self.condition.release()
+
+        self.metrics.increment('invalidations_requested', len(product_names))
+
+    def run(self):
+        """
+        Send a batch of product names once per window
+        This function will be executed in a separate thread
+        """
+        while True:
+            # Wait for the first product name of a batch
+            self.condition.acquire()
+            while len(self.pending) == 0:
+                self.condition.wait()
+            self.condition.release()
+
+            # Let more product names join the batch
+            time.sleep(self.window)
+
+            try:
+                self.send(*self.take_batch())
+            except Exception as e:
+                # The front-end component might be down
+                self.metrics.increment('invalidation_batches_failed')
+                print("[InvalidationBatcher] Failed to send invalidations:", e)
+
+    def take_batch(self):
+        """
+        Take the pending product names as a batch
+        :return: a list of product names and a list of their versions
+        """
+        self.condition.acquire()
+        batch, self.pending = self.pending, dict()
+        self.condition.release()
+
+        self.metrics.increment('invalidation_batches')
+        self.metrics.increment('invalidations_sent', len(batch))
+        self.metrics.observe('invalidation_batch_size', len(batch))
+
+        return list(batch.keys()), list(batch.values())
+
+    async def run_async(self):
+        """
+        Send a batch of product names once per window
+        This coroutine will be executed as an asyncio task instead of run()
+        The send function is called in the default executor since it makes a blocking rpc call.
+        """
+        self.wakeup = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+
+        while True:
+            # Wait for the first product name of a batch
+            while len(self.pending) == 0:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+
+            # Let more product names join the batch
+            await asyncio.sleep(self.window)
+
+            try:
+                await self.loop.run_in_executor(None, self.send, *self.take_batch())
+            except Exception as e:
+                # The front-end component might be down
+                self.metrics.increment('invalidation_batches_failed')
+                print("[InvalidationBatcher] Failed to send invalidations:", e)
+
+
+class InvalidationSender(object):
+    """
+    Push batches of invalidations to the front-end component without waiting for the rpc calls
+    At most max_in_flight rpc calls are in flight, and later batches wait in a queue of at most queue_size
+    invalidations. When the queue overflows, the queued batches are dropped and one resync request is sent instead,
+    which makes the front-end component query every cached product again. A batch whose rpc call fails
+    (ex. the front-end component is down) is replaced by a resync request in the same way.
+    The front-end component only applies changes that are newer than its cached products,
+    so batches may arrive in any order.
+    """
+
+    def __init__(self, call, max_in_flight, queue_size, metrics, retry_delay=1):
+        """
+        :param call: a function that starts the rpc call of a batch and returns a grpc future
+                     (see FrontStub.InvalidateMany)
+        :param max_in_flight: the most rpc calls in flight
+        :param queue_size: the most invalidations waiting for an rpc call
+        :param metrics: the Metrics instance that counts queued, sent, failed and dropped invalidations
+        :param retry_delay: seconds to wait before a failed resync request is sent again
+        """
+        self.call = call
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.metrics = metrics
+        self.retry_delay = retry_delay
+
+        # Batches of (product_names, versions, prices, quantities) waiting for an rpc call
+        # and the number of invalidations in them
+        self.queue = deque()
+        self.queued = 0
+
+        # The number of rpc calls in flight and whether a resync request has to be sent
+        self.in_flight = 0
+        self.resync = False
+
+        self.lock = threading.Lock()
+
+        self.metrics.derive('invalidation_push_in_flight', lambda metrics: self.in_flight)
+        self.metrics.derive('invalidation_push_queue_depth', lambda metrics: self.queued)
+
+    def send(self, product_names, versions, prices, quantities):
+        """
+        Send a batch of invalidations, or queue it if max_in_flight rpc calls are in flight
+        Never waits for the front-end component.
+        """
+        batch = (product_names, versions, prices, quantities)
+
+        self.lock.acquire()
+        if self.resync:
+            # The resync request that is going to be sent covers this batch as well
+            self.metrics.increment('invalidation_push_dropped', len(product_names))
+            batch = None
+        elif self.in_flight >= self.max_in_flight and self.queued + len(product_names) > self.queue_size:
+            # Overflow: drop the queue and resync the front-end component instead
+            self.metrics.increment('invalidation_push_dropped', self.queued + len(product_names))
+            self.queue.clear()
+            self.queued = 0
+            self.resync = True
+            batch = None
+        elif self.in_flight >= self.max_in_flight:
+            self.queue.append(batch)
+            self.queued += len(product_names)
+            self.metrics.increment('invalidation_push_queued', len(product_names))
+            batch = None
+        start = self.next_call(batch)
+        self.lock.release()
+
+        if start is not None:
+            self.start(*start)
+
+    def next_call(self, batch=None):
+        """
+        Take the next rpc call to start if fewer than max_in_flight rpc calls are in flight
+        A pending resync request goes first, then the given batch, then the oldest queued batch.
+        Called while holding self.lock
+        :return: (batch, resync) to pass to start, or None
+        """
+        if self.in_flight >= self.max_in_flight:
+            return None
+        if self.resync:
+            self.resync = False
+            self.in_flight += 1
+            return ((), (), (), ()), True
+        if batch is None and len(self.queue) > 0:
+            batch = self.queue.popleft()
+            self.queued -= len(batch[0])
+        if batch is None:
+            return None
+        self.in_flight += 1
+        return batch, False
+
+    def start(self, batch, resync):
+        """
+        Start the rpc call of a batch or of a resync request
+        """
+        try:
+            future = self.call(*batch, resync=resync)
+        except Exception as e:
+            self.done(batch, resync, e)
+            return
+        future.add_done_callback(lambda future: self.done(batch, resync, future.exception()))
+
+    def retry(self):
+        """
+        Start the pending resync request (or the next batch) after a failed resync request
+        """
+        self.lock.acquire()
+        start = self.next_call()
+        self.lock.release()
+
+        if start is not None:
+            self.start(*start)
+
+    def done(self, batch, resync, exception):
+        """
+        Count the result of an rpc call and start the next one
+        Called by grpc when the rpc call finishes
+        """
+        self.lock.acquire()
+        self.in_flight -= 1
+        dropped = 0
+        if exception is not None:
+            # The front-end component might have missed the changes, so it is resynced with the next rpc call,
+            # which also covers the queued batches
+            dropped, self.queued = self.queued, 0
+            self.queue.clear()
+            self.resync = True
+            print("[InvalidationSender] Failed to send invalidations:", exception)
+
+        # A failed resync request is retried after a delay, so that a front-end component that is down
+        # is not called in a loop
+        start = self.next_call() if exception is None or not resync else None
+        if exception is not None and resync:
+            timer = threading.Timer(self.retry_delay, self.retry)
+            timer.daemon = True
+            timer.start()
+        self.lock.release()
+
+        if dropped > 0:
+            self.metrics.increment('invalidation_push_dropped', dropped)
+
+        if exception is not None:
+            self.metrics.increment('invalidation_push_failed', len(batch[0]))
+        elif resync:
+            self.metrics.increment('invalidation_push_resyncs')
+        else:
+            self.metrics.increment('invalidation_push_sent', len(batch[0]))
+
+        if start is not None:
+            self.start(*start)
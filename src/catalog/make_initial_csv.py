@@ -1,22 +1,63 @@
 from csv_tools import write_csv
+from binary_store import csv2bin
 from toynames import toy_names
+import argparse
 import random
 
-def main():
-    # Declare fields that will be place on the first row of the csv file to write
-    fields = ["product_name", "price", "quantity"]
 
+def parse():
+    """
+    This function will be used to parse input arguments to the main function
+    Returns: arguments
+    """
+    parser = argparse.ArgumentParser(description='Write the initial catalog file.')
+    parser.add_argument('--file_name', type=str, default='data/catalog.csv')
+    # Also write a binary catalog file for CATALOG_STORE=mmap (ex. --binary data/catalog.bin)
+    parser.add_argument('--binary', type=str, default=None)
+    # Total number of products; generated products are added after the toy names (ex. --n_products 1000000)
+    parser.add_argument('--n_products', type=int, default=None)
+    parser.add_argument('--quantity', type=int, default=100000000)
+
+    args = parser.parse_args()
+    return args
+
+
+def make_rows(n_products=None, quantity=100000000):
+    """
+    Make the rows of a catalog file
+    :param n_products: total number of products (default: one product for each toy name)
+                       Products named "Toy_<number>" are generated after the toy names.
+    :param quantity: initial quantity of each product
+    :return: a list of [product_name, price, quantity]
+    """
     random.seed(0)
     # Data to write
     # rows = [[toy_name, '%.2f' % random.uniform(10, 30), 100] for toy_name in set(toy_names)]
-    rows = [[toy_name, '%.2f' % random.uniform(10, 30), 100000000] for toy_name in set(toy_names)]
+    rows = [[toy_name, '%.2f' % random.uniform(10, 30), quantity] for toy_name in set(toy_names)]
+
+    if n_products is not None:
+        rows = rows[:n_products]
+        rows += [["Toy_%07d" % i, '%.2f' % random.uniform(10, 30), quantity] for i in range(len(rows), n_products)]
+
+    return rows
 
 
+def main(args):
+    # Declare fields that will be place on the first row of the csv file to write
+    fields = ["product_name", "price", "quantity"]
+
+    # Data to write
+    rows = make_rows(args.n_products, args.quantity)
+
     # Write data in a file
-    file_name = "data/catalog.csv"
+    file_name = args.file_name
     write_csv(file_name, [fields] + rows)
 
+    # Convert the csv catalog file to a binary catalog file
+    if args.binary is not None:
+        csv2bin(file_name, args.binary)
+
 
 if __name__ == '__main__':
     # Write a catalog file
-    main()
+    main(parse())
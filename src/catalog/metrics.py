@@ -0,0 +1,128 @@
+"""
+Counters, gauges and histograms of the catalog component.
+They are reported through the Metrics rpc call of the Catalog service.
+
+To print the metrics of a running catalog component:
+ex. python3 metrics.py --catalog_host 127.0.0.1 --catalog_port 1130
+"""
+
+import argparse
+import bisect
+import threading
+
+import grpc
+import catalog_pb2 as pb2
+import catalog_pb2_grpc as pb2_grpc
+
+# Default upper bounds of histogram buckets
+DEFAULT_BOUNDS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# Upper bounds of the buckets of latency histograms in microseconds
+LATENCY_BOUNDS = (50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+
+class Metrics(object):
+    """
+    A thread-safe registry of metrics
+    """
+
+    def __init__(self):
+        # Counters and gauges map a name to a value
+        self.values = dict()
+
+        # Histograms map a name to (bucket bounds, bucket counts, sum of observed values)
+        self.histograms = dict()
+
+        # Functions that compute a value when the metrics are reported
+        self.derived = dict()
+
+        self.lock = threading.Lock()
+
+    def increment(self, name, value=1):
+        """
+        Add a value to a counter
+        """
+        self.lock.acquire()
+        self.values[name] = self.values.get(name, 0) + value
+        self.lock.release()
+
+    def set(self, name, value):
+        """
+        Set the value of a gauge
+        """
+        self.lock.acquire()
+        self.values[name] = value
+        self.lock.release()
+
+    def get(self, name):
+        """
+        Get the value of a counter or a gauge
+        """
+        return self.values.get(name, 0)
+
+    def observe(self, name, value, bounds=DEFAULT_BOUNDS):
+        """
+        Add a value to a histogram
+        :param bounds: upper bounds of the buckets used when the histogram is created
+        """
+        self.lock.acquire()
+        if name not in self.histograms.keys():
+            self.histograms[name] = (tuple(bounds), [0] * (len(bounds) + 1), [0])
+        bounds, counts, total = self.histograms[name]
+        counts[bisect.bisect_left(bounds, value)] += 1
+        total[0] += value
+        self.lock.release()
+
+    def derive(self, name, function):
+        """
+        Register a value that is computed from other metrics when the metrics are reported
+        :param function: a function that receives this Metrics instance and returns the value
+        """
+        self.derived[name] = function
+
+    def snapshot(self):
+        """
+        Get every metric as a flat dictionary
+        A histogram is reported as <name>_count, <name>_sum and cumulative <name>_le_<bound> buckets
+        :return: a dictionary that maps metric names to values
+        """
+        self.lock.acquire()
+        result = dict(self.values)
+        for name, (bounds, counts, total) in self.histograms.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                result['%s_le_%s' % (name, bound)] = cumulative
+            result['%s_count' % name] = sum(counts)
+            result['%s_sum' % name] = total[0]
+        self.lock.release()
+
+        for name, function in self.derived.items():
+            result[name] = function(self)
+        return result
+
+
+def parse():
+    """
+    This function will be used to parse input arguments to the main function
+    Returns: arguments
+    """
+    parser = argparse.ArgumentParser(description='Print the metrics of a catalog component.')
+    parser.add_argument('--catalog_host', type=str, default='127.0.0.1')
+    parser.add_argument('--catalog_port', type=int, default=1130)
+
+    args = parser.parse_args()
+    return args
+
+
+def main(args):
+    # Make a Metrics rpc call to the catalog component
+    channel = grpc.insecure_channel('{}:{}'.format(args.catalog_host, args.catalog_port))
+    result = pb2_grpc.CatalogStub(channel).Metrics(pb2.metrics_request(), timeout=3)
+
+    for metric in result.metrics:
+        print("%s %s" % (metric.name, metric.value))
+
+
+if __name__ == '__main__':
+    main(parse())
@@ -0,0 +1,63 @@
+import bisect
+
+
+class ProductIndex(object):
+    """
+    A sorted index of product names for prefix search and listing
+    Pages are found by binary search from the last name of the previous page (the cursor),
+    so a deep page costs as much as the first page.
+    The sorted list is never modified in place: added names are merged into a new list that replaces it
+    with one reference swap, so readers use the index without taking any lock.
+    """
+
+    def __init__(self, product_names):
+        """
+        :param product_names: names of the products of the catalog
+        """
+        self.names = sorted(product_names)
+
+    def add(self, product_names):
+        """
+        Add the names of new products
+        Callers add names one batch at a time (ex. a chunk of an import).
+        The new names are merged by binary search, so a batch costs one copy of the list
+        instead of comparing every name again.
+        :param product_names: names of the new products
+        """
+        names = self.names
+        merged = []
+        start = 0
+        for product_name in sorted(product_names):
+            end = bisect.bisect_left(names, product_name, start)
+            merged += names[start:end]
+            merged.append(product_name)
+            start = end
+        merged += names[start:]
+
+        self.names = merged
+
+    def page(self, prefix, after, limit):
+        """
+        Get the names of a page of products that start with a prefix
+        :param prefix: the prefix of the product names ('' for every product)
+        :param after: the last name of the previous page ('' for the first page)
+        :param limit: the most names in the page
+        :return: the names of the page and whether more names follow them
+        """
+        names = self.names
+
+        # The page starts after the cursor, and not before the first name with the prefix
+        start = bisect.bisect_left(names, prefix)
+        if after != '':
+            start = max(start, bisect.bisect_right(names, after))
+
+        page = []
+        end = start
+        while end < len(names) and len(page) < limit and names[end].startswith(prefix):
+            page.append(names[end])
+            end += 1
+
+        return page, end < len(names) and names[end].startswith(prefix)
+
+    def __len__(self):
+        return len(self.names)
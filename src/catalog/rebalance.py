@@ -0,0 +1,120 @@
+"""
+Move products between the catalog files of the catalog shards when the list of shards changes.
+Each product is written to the catalog file of the shard that owns it on the new hash ring (see catalog_router.py).
+
+Procedure:
+1. Stop every catalog shard. The write-ahead log of each input catalog file is replayed by this tool.
+2. Write the catalog files of the new shards
+ex. python3 rebalance.py --shards 127.0.0.1:1130,127.0.0.1:1131 --input data/catalog.csv --output data/shard{}.csv
+ex. python3 rebalance.py --old_shards 127.0.0.1:1130,127.0.0.1:1131 --input data/shard0.csv data/shard1.csv \
+        --shards 127.0.0.1:1130,127.0.0.1:1131,127.0.0.1:1132 --output data/shard{}.csv
+3. Start one catalog component per shard with CATALOG_FILE=data/shard<index>.csv and the port of its address
+4. Restart the order and front-end components with CATALOG_SHARDS set to the new list of shards
+
+Nothing is deleted. The new catalog files are first written next to their final names ("<output>.rebalancing").
+Every file that the new shards must not read is then renamed with the suffix ".rebalanced":
+- the input and output files that are replaced
+- their write-ahead logs
+- the previous checkpoints of the new catalog files
+Finally the new catalog files are moved to their final names. Check the new shards, then remove the ".rebalanced"
+files. To undo a rebalance, move them back. The tool refuses to run while ".rebalanced" files of an earlier run
+are still there.
+Binary catalog files (CATALOG_STORE=mmap) have to be converted to csv first (see binary_store.py).
+"""
+
+import argparse
+import os
+
+from catalog_router import HashRing, parse_shards
+from csv_tools import write_catalog
+from wal import previous_file_name, rotated_file_name
+from stores import CsvStore
+
+# Suffix of the new catalog files while they are written, and of the files that are set aside
+WRITING_SUFFIX = '.rebalancing'
+BACKUP_SUFFIX = '.rebalanced'
+
+
+def parse():
+    """
+    This function will be used to parse input arguments to the main function
+    Returns: arguments
+    """
+    parser = argparse.ArgumentParser(description='Move products between the catalog files of catalog shards.')
+    # Comma separated addresses of the new shards in the order of CATALOG_SHARDS
+    parser.add_argument('--shards', type=str, required=True)
+    # Catalog files of the old shards
+    parser.add_argument('--input', type=str, nargs='+', required=True)
+    # Comma separated addresses of the old shards in the order of --input (only used to count moved products)
+    parser.add_argument('--old_shards', type=str, default='')
+    # Path of the catalog file of each new shard, "{}" is replaced by the index of the shard
+    parser.add_argument('--output', type=str, default='data/shard{}.csv')
+
+    args = parser.parse_args()
+    return args
+
+
+def main(args):
+    shards = parse_shards(args.shards)
+    ring = HashRing(shards)
+    old_shards = parse_shards(args.old_shards)
+
+    # Read every product of the old shards, including mutations in their write-ahead logs
+    fields, products, wal_files = None, dict(), []
+    for i, file_name in enumerate(args.input):
+        store = CsvStore(file_name)
+        store.wal.file.close()
+        wal_files.append(store.wal_file)
+
+        fields = store.fields if fields is None else fields
+        for record in store.records:
+            if record[0] in products.keys():
+                raise ValueError('Product "%s" is in more than one catalog file' % record[0])
+            products[record[0]] = (i, record)
+
+    # Group the products by their new shards
+    rows = {shard: [] for shard in shards}
+    moved = 0
+    for product_name, (i, record) in products.items():
+        shard = ring.owner(product_name)
+        rows[shard].append(list(record))
+
+        # A product moves if its new shard is not the shard of its input file
+        if i < len(old_shards) and old_shards[i] != shard:
+            moved += 1
+
+    # Files that the new shards must not read: the replaced catalog files, the write-ahead logs that have been
+    # included in the new catalog files (or that belong to replaced output files),
+    # and the previous checkpoints of the new catalog files, which hold the products of the old shards
+    outputs = [args.output.format(index) for index in range(len(shards))]
+    wal_files += [os.path.splitext(file_name)[0] + ".wal" for file_name in outputs]
+    replaced = list(args.input) + outputs + [previous_file_name(file_name) for file_name in outputs]
+    replaced += [log for wal_file in wal_files
+                 for log in (wal_file, rotated_file_name(wal_file), previous_file_name(wal_file))]
+    replaced = [file_name for file_name in dict.fromkeys(replaced) if os.path.exists(file_name)]
+
+    # Keep the backups of an earlier rebalance until the user has removed them
+    for file_name in replaced:
+        if os.path.exists(file_name + BACKUP_SUFFIX):
+            raise ValueError('%s exists: remove the files set aside by the previous rebalance first'
+                             % (file_name + BACKUP_SUFFIX))
+
+    # Write the catalog file of each new shard next to its final name
+    for index, shard in enumerate(shards):
+        write_catalog(outputs[index] + WRITING_SUFFIX, fields, rows[shard])
+        print("%s: %s (%d products)" % (shard, outputs[index], len(rows[shard])))
+
+    # Set the replaced files aside, then move the new catalog files to their final names
+    for file_name in replaced:
+        os.replace(file_name, file_name + BACKUP_SUFFIX)
+        print("Set aside %s" % (file_name + BACKUP_SUFFIX))
+    for file_name in outputs:
+        os.replace(file_name + WRITING_SUFFIX, file_name)
+
+    print("Remove the %s files once the new shards are running" % BACKUP_SUFFIX)
+    if len(old_shards) > 0:
+        print("Moved %d of %d products" % (moved, len(products)))
+
+
+if __name__ == '__main__':
+    main(parse())
@@ -0,0 +1,343 @@
+# Import required packages
+import threading
+import collections
+import grpc
+from concurrent import futures
+import time
+import os, sys
+
+# Import other files
+import catalog_pb2 as pb2
+import catalog_pb2_grpc as pb2_grpc
+from metrics import Metrics
+from csv_tools import parse_cents, format_cents
+
+# Get the address of the primary catalog component, CATALOG_PORT, and MAX_WORKERS
+# through the os.getenv function.
+# The addresses of a primary / hot standby pair are separated by ',' (ex. "127.0.0.1:1130,127.0.0.1:1131")
+CATALOG_PRIMARY = os.getenv("CATALOG_PRIMARY", "127.0.0.1:1130")
+CATALOG_PORT = int(os.getenv("CATALOG_PORT", 1140))
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", 100))
+
+# Seconds the replica may be behind the primary before it stops answering queries
+MAX_STALENESS = float(os.getenv("MAX_STALENESS", 5))
+
+# Seconds between the checks of the roles of a primary / hot standby pair
+ROLE_CHECK_INTERVAL = float(os.getenv("ROLE_CHECK_INTERVAL", 1))
+
+
+class ReplicaServicer(pb2_grpc.CatalogServicer):
+    """
+    A read-only replica of a catalog component
+    A thread tails the Replicate stream of the primary and applies its mutations in order.
+    Query and QueryMany are answered from the replicated records without locks, like the primary,
+    and report how far the replica might be behind the primary.
+    Queries are rejected with UNAVAILABLE when the replica is more than max_staleness seconds behind,
+    so that clients can fall back to the primary. Orders are only accepted by the primary.
+    The replica of a primary / hot standby pair tails whichever component is the primary (see find_primary),
+    and moves to the standby when it takes over.
+    """
+
+    def __init__(self, primary, max_staleness=MAX_STALENESS):
+        """
+        :param primary: address ("host:port") of the primary catalog component, or the addresses of
+                        a primary / hot standby pair separated by ','
+        :param max_staleness: seconds the replica may be behind the primary before it rejects queries
+        """
+        self.max_staleness = max_staleness
+
+        # Stubs of the components that can be the primary, and the stub that sends the mutations
+        # with the term of its primary and the Replicate call it streams
+        self.primary_stubs = [pb2_grpc.CatalogStub(grpc.insecure_channel(address.strip()))
+                              for address in primary.split(',') if address.strip() != '']
+        self.primary_stub = self.primary_stubs[0]
+        self.primary_term = 0
+        self.stream = None
+
+        # (retriever, catalog, versions) of the replicated products
+        # The tuple is replaced at once when a snapshot is applied, so readers take all three from one snapshot
+        self.table = (dict(), [], [])
+
+        # The position of the replica in the mutation stream of the primary
+        self.epoch, self.sequence = 0, 0
+
+        # The replica has every mutation the primary had at caught_up_at (time.monotonic)
+        # Each received event tells the sequence number of the primary when it was sent, so the replica keeps
+        # (primary sequence, receive time) until it has applied that sequence number. Under a steady stream
+        # of mutations the replica never reaches the last mutation of the primary, but it keeps reaching
+        # the positions the primary had a moment ago.
+        self.caught_up_at = None
+        self.primary_positions = collections.deque()
+        self.primary_sequence = 0
+
+        # Metrics reported through the Metrics rpc call
+        self.metrics = Metrics()
+        self.metrics.derive('replication_staleness', lambda metrics: min(self.staleness(), 1e9))
+        self.metrics.derive('replication_lag_mutations', lambda metrics: max(self.primary_sequence - self.sequence, 0))
+
+        # A thread applies the mutations streamed by the primary
+        self.replication_thread = threading.Thread(target=self.replicate, daemon=True)
+        self.replication_thread.start()
+
+        # A thread moves the replica to the new primary of a pair after a failover
+        if len(self.primary_stubs) > 1:
+            self.role_thread = threading.Thread(target=self.watch_roles, daemon=True)
+            self.role_thread.start()
+
+    def staleness(self):
+        """
+        Seconds the replica might be behind the primary (infinite before the first snapshot)
+        """
+        if self.caught_up_at is None:
+            return float('inf')
+        return time.monotonic() - self.caught_up_at
+
+    def check_staleness(self, context):
+        """
+        Reject the rpc call if the replica is too far behind the primary
+        :return: the staleness of the replica
+        """
+        staleness = self.staleness()
+        if staleness > self.max_staleness:
+            self.metrics.increment('stale_queries_rejected')
+            context.abort(grpc.StatusCode.UNAVAILABLE, "replica is %.1f seconds behind the primary" % staleness)
+        return staleness
+
+    def Query(self, request, context):
+        """
+        Query rpc call
+        """
+        staleness = self.check_staleness(context)
+        retriever, catalog, versions = self.table
+
+        # If the product_name is not found, return -1, -1 to the client
+        if request.product_name not in retriever.keys():
+            price, price_cents, quantity, version = '-1', -1, -1, 0
+        else:
+            # Read the version before the record, so the record is never older than the version
+            index = retriever[request.product_name]
+            version = versions[index]
+            _, price_cents, quantity = catalog[index]
+            price = format_cents(price_cents)
+
+        # Send back the response to the client
+        result = {'price': price, 'price_cents': price_cents, 'quantity': quantity, 'version': version,
+                  'staleness': staleness}
+
+        # Print Results
+        print("[ReplicaServicer]", "Query(%s):" % request.product_name, result)
+
+        # Reply to the client
+        return pb2.query_response(**result)
+
+    def QueryMany(self, request, context):
+        """
+        QueryMany rpc call
+        """
+        staleness = self.check_staleness(context)
+        retriever, catalog, versions = self.table
+
+        products = []
+        for product_name in request.product_names:
+            # If the product_name is not found, return -1, -1 for the product
+            if product_name not in retriever.keys():
+                price, price_cents, quantity, version = '-1', -1, -1, 0
+            else:
+                version = versions[retriever[product_name]]
+                _, price_cents, quantity = catalog[retriever[product_name]]
+                price = format_cents(price_cents)
+
+            products.append({'product_name': product_name, 'price': price, 'price_cents': price_cents,
+                             'quantity': quantity, 'version': version})
+
+        # Print Results
+        print("[ReplicaServicer]", "QueryMany(%d products):" % len(products), products)
+
+        # Reply to the client
+        return pb2.query_many_response(products=[pb2.product_info(**product) for product in products],
+                                       staleness=staleness)
+
+    def Order(self, request, context):
+        context.abort(grpc.StatusCode.FAILED_PRECONDITION, "read replica: send orders to the primary")
+
+    def OrderMany(self, request, context):
+        context.abort(grpc.StatusCode.FAILED_PRECONDITION, "read replica: send orders to the primary")
+
+    def CancelMany(self, request, context):
+        context.abort(grpc.StatusCode.FAILED_PRECONDITION, "read replica: send orders to the primary")
+
+    def Metrics(self, request, context):
+        """
+        Metrics rpc call
+        """
+        metrics = self.metrics.snapshot()
+
+        # Reply to the client
+        return pb2.metrics_response(metrics=[pb2.metric(name=name, value=value) for name, value in sorted(metrics.items())])
+
+    def replicate(self):
+        """
+        Tail the Replicate stream of the primary and apply its events in order
+        The stream is reopened after the last applied mutation when it breaks. A new primary after a failover
+        has another epoch, so the replica starts again from a snapshot of the new primary.
+        This function will be executed in a separate thread
+        """
+        while True:
+            # Find the primary of a pair again every time the stream is opened
+            if len(self.primary_stubs) > 1:
+                found = self.find_primary()
+                if found is None:
+                    print("[ReplicaServicer] No component of the pair is the primary")
+                    time.sleep(1)
+                    continue
+                self.primary_stub, self.primary_term = found
+
+            try:
+                snapshot = None
+                stream = self.primary_stub.Replicate(pb2.subscription(epoch=self.epoch, since_sequence=self.sequence))
+                self.stream = stream
+                for event in stream:
+                    self.received(event)
+                    if event.snapshot:
+                        # Collect the chunks of a snapshot and replace every product at once
+                        snapshot = (snapshot or []) + list(event.products)
+                        if event.snapshot_done:
+                            self.apply_snapshot(snapshot)
+                            snapshot = None
+                    elif len(event.products) > 0:
+                        if event.epoch != self.epoch or event.sequence != self.sequence + 1:
+                            # Should not happen on one stream: start again from a snapshot
+                            print("[ReplicaServicer] Unexpected mutation (%d, %d) after (%d, %d)"
+                                  % (event.epoch, event.sequence, self.epoch, self.sequence))
+                            self.epoch, self.sequence = 0, 0
+                            stream.cancel()
+                            break
+                        self.apply(event.products)
+
+                    # Wait for the rest of a snapshot before moving the position of the replica
+                    if snapshot is not None:
+                        continue
+                    self.epoch, self.sequence = event.epoch, event.sequence
+                    self.applied()
+            except grpc.RpcError as e:
+                print("[ReplicaServicer] Replication stream closed:", e.code())
+
+            # Wait before reopening the stream
+            time.sleep(1)
+
+    def find_primary(self):
+        """
+        Ask the components of a primary / hot standby pair for their roles (Role rpc call)
+        :return: (stub, term) of the component that is the primary of the newest term, or None if none is
+        """
+        found = None
+        for stub in self.primary_stubs:
+            try:
+                response = stub.Role(pb2.role_request(), timeout=1)
+            except grpc.RpcError:
+                continue
+            if response.role == 'primary' and (found is None or response.term > found[1]):
+                found = (stub, response.term)
+        return found
+
+    def watch_roles(self):
+        """
+        Close the Replicate stream when another component of the pair has become the primary of a newer term
+        (ex. an old primary that was cut off from its standby still streams, but no longer answers orders)
+        This function will be executed in a separate thread
+        """
+        while True:
+            time.sleep(ROLE_CHECK_INTERVAL)
+            found = self.find_primary()
+            if found is not None and found[0] is not self.primary_stub and found[1] > self.primary_term:
+                print("[ReplicaServicer] Moving to the primary of term %d" % found[1])
+                if self.stream is not None:
+                    self.stream.cancel()
+
+    def received(self, event):
+        """
+        Remember the position of the primary when it sent an event
+        """
+        # A new epoch restarts the sequence numbers of the primary
+        if event.epoch != self.epoch:
+            self.primary_positions.clear()
+        if len(self.primary_positions) == 0 or event.primary_sequence > self.primary_positions[-1][0]:
+            self.primary_positions.append((event.primary_sequence, time.monotonic()))
+        self.primary_sequence = event.primary_sequence
+
+    def applied(self):
+        """
+        Move caught_up_at to the receive time of the last event whose primary position the replica has reached
+        """
+        while len(self.primary_positions) > 0 and self.primary_positions[0][0] <= self.sequence:
+            _, self.caught_up_at = self.primary_positions.popleft()
+
+    def apply_snapshot(self, products):
+        """
+        Replace every replicated product with a snapshot of the primary
+        :param products: product_info messages
+        """
+        retriever = {product.product_name: i for i, product in enumerate(products)}
+        catalog = [(product.product_name, price_cents(product), product.quantity) for product in products]
+        versions = [product.version for product in products]
+        self.table = (retriever, catalog, versions)
+        self.metrics.increment('replication_snapshots')
+        print("[ReplicaServicer] Applied a snapshot of %d products" % len(products))
+
+    def apply(self, products):
+        """
+        Apply the new records of one mutation
+        :param products: product_info messages with the records after the mutation
+        """
+        retriever, catalog, versions = self.table
+        for product in products:
+            if product.product_name not in retriever.keys():
+                # A product added by an import: publish its record and version before readers can find it
+                catalog.append((product.product_name, price_cents(product), product.quantity))
+                versions.append(product.version)
+                retriever[product.product_name] = len(catalog) - 1
+                continue
+            index = retriever[product.product_name]
+
+            # Publish the record before the version, so readers never see a version newer than the record
+            catalog[index] = (product.product_name, price_cents(product), product.quantity)
+            versions[index] = product.version
+        self.metrics.increment('replicated_mutations')
+
+
+def price_cents(product):
+    """
+    Get the price in cents of a product_info message
+    Primaries that do not send price_cents yet only send the decimal price string
+    """
+    if product.price_cents == 0 and product.price != '':
+        return parse_cents(product.price)
+    return product.price_cents
+
+
+def serve(primary, port, max_workers):
+    # Make a server that consist of a dynamic thread pool using a built-in method
+    # with limited maximum number of threads passed on using the argument "max_workers"
+    print(port)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+
+    # Register ReplicaServicer to the thread pool
+    pb2_grpc.add_CatalogServicer_to_server(ReplicaServicer(primary), server)
+
+    # Connect the server to a port number
+    server.add_insecure_port(f'[::]:{port}')
+
+    # Start the server
+    server.start()
+
+    # Block current thread until the server stops
+    server.wait_for_termination()
+
+
+if __name__ == '__main__':
+
+    # disable print
+    sys.stdout = open(os.devnull, 'w')
+
+    # Start the server
+    serve(CATALOG_PRIMARY, CATALOG_PORT, MAX_WORKERS)
@@ -0,0 +1,125 @@
+import asyncio
+import heapq
+import threading
+import time
+
+
+class RestockScheduler(object):
+    """
+    A timer heap of products that are out of stock
+    A product is scheduled when its quantity reaches zero and it is restocked when its restock delay has passed.
+    All products that are due at the same time are given to the restock function as one batch.
+    """
+
+    def __init__(self, restock, default_delay, default_level, config=None):
+        """
+        :param restock: a function that receives a list of (product_name, restock level) to restock
+        :param default_delay: seconds between a product going out of stock and its restock
+        :param default_level: quantity of a product after its restock
+        :param config: a dictionary that maps product names to their own (restock delay, restock level)
+        """
+        self.restock = restock
+        self.default_delay = default_delay
+        self.default_level = default_level
+        self.config = config if config is not None else dict()
+
+        # A heap of (due time, product name) and the set of product names in the heap
+        self.heap = []
+        self.scheduled = set()
+
+        # A condition variable used to wake up the restock thread when an earlier restock is scheduled
+        self.condition = threading.Condition()
+
+        # The event loop and the event used to wake up the restock task when the scheduler runs on asyncio
+        self.loop = None
+        self.wakeup = None
+
+    def delay(self, product_name):
+        """
+        Get the restock delay of a product
+        """
+        return self.config.get(product_name, (self.default_delay, self.default_level))[0]
+
+    def level(self, product_name):
+        """
+        Get the restock level of a product
+        """
+        return self.config.get(product_name, (self.default_delay, self.default_level))[1]
+
+    def schedule(self, product_name):
+        """
+        Schedule the restock of a product that is out of stock
+        A product that is already scheduled keeps its earlier due time
+        """
+        self.condition.acquire()
+        if product_name not in self.scheduled:
+            heapq.heappush(self.heap, (time.monotonic() + self.delay(product_name), product_name))
+            self.scheduled.add(product_name)
+
+            # Wake up the restock thread or task since the earliest due time might have changed
+            self.condition.notify()
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self.wakeup.set)
+        self.condition.release()
+
+    def pop_due(self):
+        """
+        Pop every product that is due
+        Called while holding self.condition
+        :return: a list of (product_name, restock level)
+        """
+        batch = []
+        while len(self.heap) > 0 and self.heap[0][0] <= time.monotonic():
+            _, product_name = heapq.heappop(self.heap)
+            self.scheduled.discard(product_name)
+            batch.append((product_name, self.level(product_name)))
+        return batch
+
+    def run(self):
+        """
+        Wait for the earliest due time and restock every product that is due as one batch
+        This function will be executed in a separate thread
+        """
+        while True:
+            self.condition.acquire()
+
+            # Sleep until the earliest scheduled restock is due
+            while len(self.heap) == 0 or self.heap[0][0] > time.monotonic():
+                self.condition.wait(timeout=self.heap[0][0] - time.monotonic() if len(self.heap) > 0 else None)
+
+            # Pop every product that is due
+            batch = self.pop_due()
+
+            self.condition.release()
+
+            # Restock the batch
+            self.restock(batch)
+
+    async def run_async(self):
+        """
+        Wait for the earliest due time and restock every product that is due as one batch
+        This coroutine will be executed as an asyncio task instead of run()
+        The restock takes the locks of the products and may wait for the disk, so it runs in the default executor.
+        """
+        self.wakeup = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+
+        while True:
+            # Clear the event before checking the heap, so a product scheduled after the check wakes up the task
+            self.wakeup.clear()
+
+            self.condition.acquire()
+            batch = self.pop_due()
+            timeout = self.heap[0][0] - time.monotonic() if len(self.heap) > 0 else None
+            self.condition.release()
+
+            if len(batch) > 0:
+                # Restock the batch
+                await self.loop.run_in_executor(None, self.restock, batch)
+                continue
+
+            # Sleep until the earliest scheduled restock is due or an earlier restock is scheduled
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
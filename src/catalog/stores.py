@@ -0,0 +1,290 @@
+import os
+import sys
+from array import array
+
+from csv_tools import read_catalog, write_catalog
+from wal import WriteAheadLog, read_wal, rotated_file_name, previous_file_name, temporary_file_name, \
+    fsync_file, fsync_directory, append_file
+from binary_store import BinaryStore
+
+
+class CsvStore(object):
+    """
+    A storage engine that keeps the catalog in memory as a list of immutable records
+    Each record is (product_name, price in cents, quantity).
+    Every mutation is appended to a write-ahead log before it is published.
+    The catalog file is a checkpoint that is rewritten only periodically,
+    and the log records after the checkpoint are replayed on startup.
+
+    A checkpoint is written to a temporary file that replaces the catalog file with a rename, so a crash
+    never leaves a half-written catalog file behind. The replaced checkpoint is kept as the previous checkpoint
+    together with the log of the records between the two checkpoints, and startup falls back to them
+    when the catalog file is missing or does not match its trailer.
+    """
+
+    def __init__(self, catalog_file, wal_file=None, **wal_options):
+        """
+        :param catalog_file: path to the csv catalog file
+        :param wal_file: path to the write-ahead log (default: catalog_file with the extension ".wal")
+        :param wal_options: durability, window, max_batch and metrics of the write-ahead log (see WriteAheadLog)
+        """
+        self.catalog_file = catalog_file
+        self.wal_file = wal_file if wal_file is not None else os.path.splitext(catalog_file)[0] + ".wal"
+        self.wal_options = wal_options
+
+        # Checkpoints are written to disk before the log records they include are removed,
+        # unless records are only handed to the operating system
+        self.durable = wal_options.get('durability', 'flush') != 'flush'
+
+        # Read the catalog file (or the previous checkpoint) and keep each product as an immutable record
+        self.fields, rows = self.load()
+        self.records = self.make_records(rows)
+
+        # Recover mutations that were logged after the checkpoint
+        self.wal = self.recover()
+
+    def load(self):
+        """
+        Read the last checkpoint, or the previous checkpoint if the last one is missing or invalid
+        :return: the fields and the rows of the checkpoint
+        """
+        # A temporary file is left behind by a crash while a checkpoint was written
+        if os.path.exists(temporary_file_name(self.catalog_file)):
+            os.remove(temporary_file_name(self.catalog_file))
+
+        # Once a checkpoint has replaced the catalog file, every complete catalog file has a trailer
+        has_previous = os.path.exists(previous_file_name(self.catalog_file))
+        self.fallback = False
+        try:
+            return read_catalog(self.catalog_file, require_trailer=has_previous)
+        except (OSError, ValueError, IndexError) as e:
+            if not has_previous:
+                raise
+            print("[CsvStore] Invalid checkpoint %s (%s), falling back to the previous checkpoint"
+                  % (self.catalog_file, e))
+
+        self.fallback = True
+        return read_catalog(previous_file_name(self.catalog_file))
+
+    def recover(self):
+        """
+        Replay the write-ahead log on top of the catalog file
+        A rotated log is left behind when the process stopped during a checkpoint, so it is replayed first,
+        and the log of the previous checkpoint is replayed before it when the previous checkpoint was loaded
+        :return: a WriteAheadLog that continues after the replayed records
+        """
+        logs = [rotated_file_name(self.wal_file), self.wal_file]
+        if self.fallback:
+            logs.insert(0, previous_file_name(self.wal_file))
+        records = [record for log in logs for record in read_wal(log)]
+        retriever = {record[0]: i for i, record in enumerate(self.records)}
+
+        # Each record holds the quantity of the product after the mutation,
+        # and records of imported products also hold the price
+        for sequence, product_name, quantity, price in records:
+            if product_name in retriever.keys():
+                index = retriever[product_name]
+                self.records[index] = (product_name, self.records[index][1] if price is None else price, quantity)
+            elif price is not None:
+                # A product added by an import after the checkpoint
+                retriever[product_name] = len(self.records)
+                self.records.append((product_name, price, quantity))
+
+        if len(records) > 0:
+            print("[CsvStore] Recovered %d records from %s" % (len(records), self.wal_file))
+
+        # Include the records of a rotated log in a checkpoint before the log is rotated again
+        if self.fallback or os.path.exists(rotated_file_name(self.wal_file)):
+            if self.fallback:
+                # The invalid catalog file is not kept as the previous checkpoint, so the log of the previous
+                # checkpoint keeps every record after it
+                if os.path.exists(self.catalog_file):
+                    os.remove(self.catalog_file)
+                if os.path.exists(rotated_file_name(self.wal_file)):
+                    append_file(rotated_file_name(self.wal_file), previous_file_name(self.wal_file))
+                    os.remove(rotated_file_name(self.wal_file))
+            self.write_checkpoint(self.records)
+
+        return WriteAheadLog(self.wal_file, sequence=max([record[0] for record in records], default=0),
+                             **self.wal_options)
+
+    def make_records(self, rows):
+        """
+        Make the records of the catalog from the rows of the catalog file
+        :return: a list of (product_name, price in cents, quantity)
+        """
+        return [tuple(row) for row in rows]
+
+    def copy_records(self):
+        """
+        Copy the records for a checkpoint
+        Records are immutable, so copying the list of references is enough
+        """
+        return list(self.records)
+
+    def log(self, records):
+        """
+        Append mutations to the write-ahead log
+        Called while holding the locks of the products, before the new records are published
+        :param records: a list of (product_name, quantity) after the mutation,
+                        or (product_name, quantity, price in cents) for imported products
+        """
+        return self.wal.append(records)
+
+    def sync(self, sequence):
+        """
+        Wait until the mutations up to a sequence number returned by log are on disk
+        Called after the locks of the products are released
+        """
+        self.wal.sync(sequence)
+
+    def checkpoint(self, catalog_lock):
+        """
+        Write a snapshot of the catalog to the catalog file
+        The write-ahead log is rotated with the snapshot, and the rotated log is kept with the previous checkpoint
+        :param catalog_lock: the StripedLock of the catalog used to take a consistent snapshot
+        """
+        # Copy the records while holding every lock for a consistent snapshot
+        # Mutations logged after the rotation are not included in the snapshot and stay in the new log
+        catalog_lock.acquire_all()
+        self.wal.rotate()
+        to_write = self.copy_records()
+        catalog_lock.release_all()
+
+        # Write the copied data to disk
+        self.write_checkpoint(to_write)
+
+    def write_checkpoint(self, records):
+        """
+        Replace the catalog file with a checkpoint of records
+        The records are written to a temporary file (and to disk when the write-ahead log is durable)
+        that replaces the catalog file with a rename. The replaced catalog file becomes the previous checkpoint,
+        and the rotated log, whose records are between the two checkpoints, becomes the log of the previous checkpoint.
+        A crash at any point leaves either the new checkpoint or the previous checkpoint with every log record after it.
+        """
+        write_catalog(temporary_file_name(self.catalog_file), self.fields, records)
+        if self.durable:
+            fsync_file(temporary_file_name(self.catalog_file))
+
+        if os.path.exists(self.catalog_file):
+            os.replace(self.catalog_file, previous_file_name(self.catalog_file))
+        os.replace(temporary_file_name(self.catalog_file), self.catalog_file)
+
+        # The records of the rotated log are in the new checkpoint
+        if os.path.exists(rotated_file_name(self.wal_file)):
+            os.replace(rotated_file_name(self.wal_file), previous_file_name(self.wal_file))
+
+        if self.durable:
+            fsync_directory(self.catalog_file)
+
+
+class ColumnarRecords(object):
+    """
+    A compact sequence of (product_name, price in cents, quantity) records kept in columns
+    Names are interned strings, and the price in cents and the quantity of a product are packed
+    into one 64-bit integer of an array (price << 32 | quantity).
+    A record is replaced with one assignment to the array, so lock-free readers never see half of an update.
+    Records are appended by imports. The length is the length of the array, and a name is appended
+    before its value, so a reader never finds a value without a name.
+    """
+
+    def __init__(self, names, values):
+        """
+        :param names: a list of interned product names
+        :param values: an array('q') of packed prices and quantities
+        """
+        self.names = names
+        self.values = values
+
+    @staticmethod
+    def from_rows(rows):
+        """
+        Make columns from rows of (product_name, price in cents, quantity)
+        """
+        names = [sys.intern(row[0]) for row in rows]
+        values = array('q', (pack(row[1], row[2]) for row in rows))
+        return ColumnarRecords(names, values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        for i in range(len(self.values)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        """
+        Read a record from the columns
+        :return: (product_name, price in cents, quantity)
+        """
+        value = self.values[index]
+        return self.names[index], value >> 32, value & 0xFFFFFFFF
+
+    def __setitem__(self, index, record):
+        """
+        Replace a record with one assignment to the array
+        The name of a product never changes, so only its price and quantity are written
+        :param record: (product_name, price in cents, quantity)
+        """
+        self.values[index] = pack(record[1], record[2])
+
+    def append(self, record):
+        """
+        Add a record after the last record
+        :param record: (product_name, price in cents, quantity)
+        """
+        value = pack(record[1], record[2])
+        self.names.append(sys.intern(record[0]))
+        self.values.append(value)
+
+    def copy(self):
+        """
+        Copy the columns for a checkpoint
+        Names are only appended and the length comes from the array, so only the array is copied
+        """
+        return ColumnarRecords(self.names, array('q', self.values))
+
+
+def pack(price, quantity):
+    """
+    Pack a price in cents and a quantity into one integer of ColumnarRecords
+    """
+    if not 0 <= quantity < 2 ** 32:
+        raise ValueError('Quantity %d cannot be stored in a columnar record' % quantity)
+    return price << 32 | quantity
+
+
+class ColumnarStore(CsvStore):
+    """
+    A storage engine that keeps the catalog in memory as ColumnarRecords
+    The catalog file and the write-ahead log are the same as CsvStore,
+    but each product takes 8 bytes of an array and one interned name instead of a tuple of Python objects,
+    and a checkpoint copies one array instead of a list of references.
+    """
+
+    def make_records(self, rows):
+        return ColumnarRecords.from_rows(rows)
+
+    def copy_records(self):
+        return self.records.copy()
+
+
+def open_store(store, catalog_file, wal_file=None, **wal_options):
+    """
+    Open the storage engine of the catalog
+    :param store: 'csv' (csv catalog file with a write-ahead log), 'columnar' (same files as 'csv' with
+                  columnar records in memory) or 'mmap' (memory-mapped binary catalog file)
+    :param catalog_file: path to the catalog file
+    :param wal_file: path to the write-ahead log of the csv storage engine
+    :param wal_options: options of the write-ahead log of the csv and columnar storage engines (see WriteAheadLog)
+    """
+    if store == 'mmap':
+        # The binary catalog file has no write-ahead log, so only the default durability is available
+        if wal_options.get('durability', 'flush') != 'flush':
+            raise ValueError('The mmap catalog store does not support durability "%s"' % wal_options['durability'])
+        return BinaryStore(catalog_file)
+    elif store == 'csv':
+        return CsvStore(catalog_file, wal_file, **wal_options)
+    elif store == 'columnar':
+        return ColumnarStore(catalog_file, wal_file, **wal_options)
+    raise ValueError('Unknown catalog store "%s"' % store)
@@ -0,0 +1,54 @@
+import threading
+
+
+class StripedLock(object):
+    """
+    A fixed pool of locks shared by the products of the catalog
+    The product at index i of the catalog is guarded by the lock at i % n_stripes,
+    so that operations on products in different stripes do not block each other
+    """
+
+    def __init__(self, n_stripes):
+        """
+        :param n_stripes: number of locks in the pool (1 behaves as a single global lock)
+        """
+        self.locks = [threading.Lock() for _ in range(max(1, n_stripes))]
+
+    def stripes(self, indices):
+        """
+        Get the stripes that guard the products at the given indices
+        Stripes are sorted so that every caller acquires them in the same order, which prevents deadlocks
+        :param indices: indices of products in the catalog
+        :return: sorted list of stripe numbers
+        """
+        return sorted(set(index % len(self.locks) for index in indices))
+
+    def acquire(self, indices):
+        """
+        Acquire the locks that guard the products at the given indices
+        :param indices: indices of products in the catalog
+        """
+        for stripe in self.stripes(indices):
+            self.locks[stripe].acquire()
+
+    def release(self, indices):
+        """
+        Release the locks that guard the products at the given indices
+        :param indices: indices of products in the catalog
+        """
+        for stripe in reversed(self.stripes(indices)):
+            self.locks[stripe].release()
+
+    def acquire_all(self):
+        """
+        Acquire every lock in the pool to take a consistent snapshot of the whole catalog
+        """
+        for lock in self.locks:
+            lock.acquire()
+
+    def release_all(self):
+        """
+        Release every lock in the pool after taking a snapshot of the whole catalog
+        """
+        for lock in reversed(self.locks):
+            lock.release()
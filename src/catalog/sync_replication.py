@@ -0,0 +1,162 @@
+"""
+Synchronous replication from a primary catalog component to its hot standby.
+The standby follows the mutation stream of the primary (Follow rpc call) and acknowledges the sequence number
+of the last mutation it has applied. While the standby is in sync, the primary answers an order only after
+the standby has acknowledged the mutation of the order, so a failover never loses an answered order.
+
+A standby that does not acknowledge a mutation within the timeout falls out of sync. The order is not answered,
+and the primary rejects orders until the standby is in sync again (it acknowledged the last mutation of the primary):
+a standby that is cut off from the primary takes over after a while, so a primary that answered orders without it
+could lose them in the failover. The primary proceeds alone (answers orders without the standby) once the standby
+has been out of sync for longer than the failover timeout, and a standby that has taken over proceeds alone
+at once, since the old primary cannot answer orders without following it. Either stops proceeding alone when
+a standby is in sync again.
+"""
+
+import threading
+import time
+
+
+class SyncReplication(object):
+    """
+    The acknowledgements of the hot standby of a primary catalog component
+    """
+
+    def __init__(self, timeout, metrics, required=False):
+        """
+        :param timeout: seconds an order waits for the acknowledgement of the standby before the standby
+                        is considered out of sync
+        :param metrics: the Metrics instance that reports the state of the standby
+        :param required: True for a catalog component with a hot standby: mutations are only answered
+                         once the standby has acknowledged them
+        """
+        self.timeout = timeout
+        self.metrics = metrics
+        self.required = required
+
+        # A primary answers mutations alone while its standby is out of sync after proceed_alone
+        self.alone = False
+
+        # The sequence number of the last mutation acknowledged by any standby
+        self.confirmed = 0
+
+        # The number of the Follow call of the current standby (0 when no standby is attached),
+        # the sequence number of the last mutation it has acknowledged, and whether orders wait for it
+        self.follower = 0
+        self.acknowledged = 0
+        self.in_sync = False
+
+        # The time the standby fell out of sync (see out_of_sync_for)
+        self.out_of_sync_since = time.monotonic()
+
+        # A condition variable used to wake up orders waiting for acknowledgements
+        self.condition = threading.Condition()
+
+        self.metrics.derive('standby_in_sync', lambda metrics: 1 if self.in_sync else 0)
+        self.metrics.derive('standby_acknowledged_sequence', lambda metrics: self.acknowledged)
+        self.metrics.derive('standby_required', lambda metrics: 1 if self.required and not self.alone else 0)
+
+    def attach(self):
+        """
+        Start following a new standby (a standby that follows again is a new standby)
+        The standby is out of sync until it has acknowledged the last mutation.
+        :return: the number of the follower, to pass to acknowledge and detach
+        """
+        self.condition.acquire()
+        self.follower += 1
+        self.acknowledged = 0
+        self.fall_out_of_sync()
+        follower = self.follower
+        self.condition.notify_all()
+        self.condition.release()
+
+        return follower
+
+    def detach(self, follower):
+        """
+        Stop waiting for a standby whose Follow call has ended
+        """
+        self.condition.acquire()
+        if follower == self.follower:
+            self.follower = 0
+            self.fall_out_of_sync()
+            self.condition.notify_all()
+        self.condition.release()
+
+    def acknowledge(self, follower, sequence, last_sequence):
+        """
+        Record the acknowledgement of a standby
+        :param follower: the number of the follower returned by attach
+        :param sequence: the sequence number of the last mutation the standby has applied
+        :param last_sequence: the sequence number of the last mutation of the primary
+        """
+        self.condition.acquire()
+        if follower == self.follower:
+            self.acknowledged = max(self.acknowledged, sequence)
+            self.confirmed = max(self.confirmed, sequence)
+
+            # The standby is back in sync once it has caught up with the primary,
+            # and mutations wait for it again from now on
+            if not self.in_sync and self.acknowledged >= last_sequence:
+                self.in_sync = True
+                self.alone = False
+                print("[SyncReplication] Standby in sync at %d" % self.acknowledged)
+            self.condition.notify_all()
+        self.condition.release()
+
+    def fall_out_of_sync(self):
+        """
+        Stop waiting for the standby (called while holding self.condition)
+        """
+        if self.in_sync:
+            self.in_sync = False
+            self.out_of_sync_since = time.monotonic()
+
+    def out_of_sync_for(self):
+        """
+        Seconds the standby has been out of sync (0 while it is in sync)
+        """
+        return 0 if self.in_sync else time.monotonic() - self.out_of_sync_since
+
+    def proceed_alone(self):
+        """
+        Answer mutations without waiting for a standby until a standby is in sync again
+        Called when the standby takes over (the old primary only answers the orders that this component
+        has acknowledged), and when the standby of a primary has been out of sync for too long (ex. it is down).
+        """
+        self.condition.acquire()
+        self.alone = not self.in_sync
+        self.condition.release()
+
+    def writable(self):
+        """
+        Whether mutations can be answered now
+        :return: False for a primary whose standby is out of sync (its orders are rejected until the standby catches up)
+        """
+        return not self.required or self.alone or self.in_sync
+
+    def wait(self, sequence):
+        """
+        Wait until the standby has acknowledged a mutation, if the standby is in sync
+        Called after the locks of the products are released
+        :param sequence: the sequence number of the mutation in the mutation stream
+        :return: True if the mutation can be answered, False if the standby did not acknowledge it
+        """
+        if sequence is None:
+            return True
+
+        self.condition.acquire()
+        deadline = time.monotonic() + self.timeout
+        while self.in_sync and self.acknowledged < sequence:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Stop waiting for a standby that is dead or too slow
+                self.fall_out_of_sync()
+                self.metrics.increment('standby_timeouts')
+                print("[SyncReplication] Standby out of sync at %d < %d" % (self.acknowledged, sequence))
+                break
+            self.condition.wait(remaining)
+        acknowledged = self.acknowledged >= sequence or not self.required or self.alone
+        self.condition.release()
+
+        return acknowledged
@@ -0,0 +1,282 @@
+import csv
+import os
+import threading
+import time
+
+from metrics import LATENCY_BOUNDS
+
+# How records are made durable
+# 'flush': records are handed to the operating system (they survive a crash of the process, not of the machine)
+# 'fsync': every append is written to disk with fsync before it returns
+# 'group': appends are handed to the operating system, and sync() waits for a group commit,
+#          where one fsync writes the records of every waiter of a short window to disk
+DURABILITY_MODES = ('flush', 'fsync', 'group')
+
+
+class WriteAheadLog(object):
+    """
+    An append-only log of catalog mutations
+    Each record is a line of "sequence number,product name,quantity after the mutation".
+    Records of imported products also have the price in cents after the mutation as a fourth column,
+    so new products and new prices are recovered as well.
+    Since records hold the new quantity instead of the difference, replaying a record twice is harmless.
+    """
+
+    def __init__(self, file_name, sequence=0, durability='flush', window=0.002, max_batch=64, metrics=None):
+        """
+        :param file_name: path to the log file
+        :param sequence: the last sequence number that has been used
+        :param durability: how records are made durable (see DURABILITY_MODES)
+        :param window: the most seconds the leader of a group commit waits for more records before the fsync
+        :param max_batch: the number of waiters that ends the window of a group commit early
+        :param metrics: a Metrics instance that observes fsync latencies and group commit sizes (optional)
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError('Unknown durability mode "%s"' % durability)
+        self.file_name = file_name
+        self.sequence = sequence
+        self.durability = durability
+        self.window = window
+        self.max_batch = max_batch
+        self.metrics = metrics
+
+        # A lock that keeps records in the order of their sequence numbers
+        self.lock = threading.Lock()
+
+        # The last sequence number that is known to be on disk
+        self.synced_sequence = sequence
+
+        # Group commit: appends that have not called sync() yet, waiters of sync(),
+        # and whether a leader is running a group commit
+        self.sync_condition = threading.Condition()
+        self.pending = 0
+        self.waiting = 0
+        self.syncing = False
+
+        # Remove an incomplete last record left by a crash so that new records start on a new line
+        truncate_incomplete_record(self.file_name)
+
+        # Open the log file to add records at the end
+        self.file = open(self.file_name, 'a', newline='')
+        self.writer = csv.writer(self.file)
+
+    def append(self, records):
+        """
+        Add records to the end of the log
+        :param records: a list of (product_name, quantity) or (product_name, quantity, price in cents)
+                        after the mutation
+        :return: the sequence number of the last record
+        """
+        self.lock.acquire()
+        for record in records:
+            self.sequence += 1
+            self.writer.writerow((self.sequence,) + tuple(record))
+
+        # Hand the records to the operating system so that they survive a crash of this process
+        self.file.flush()
+        sequence = self.sequence
+
+        # Write the records to disk before returning
+        if self.durability == 'fsync':
+            self.fsync(self.file.fileno())
+            self.synced_sequence = sequence
+        self.lock.release()
+
+        # The caller is expected to call sync() next, so a group commit can wait for it
+        if self.durability == 'group':
+            self.sync_condition.acquire()
+            self.pending += 1
+            self.sync_condition.release()
+
+        return sequence
+
+    def sync(self, sequence):
+        """
+        Wait until every record up to a sequence number is on disk (only in the 'group' durability mode)
+        The first waiter becomes the leader of a group commit: it waits while appends that have already been
+        logged are on their way to sync(), for up to self.window seconds or until self.max_batch waiters have joined.
+        Then one fsync writes the records of the whole group. Waiters that arrive during the fsync
+        are covered by the next group, so a single client is never delayed by the window.
+        Called without holding the locks of the catalog, so other orders can be logged during the window.
+        :param sequence: the sequence number returned by append
+        """
+        if self.durability != 'group' or sequence is None:
+            return
+
+        self.sync_condition.acquire()
+        self.pending -= 1
+        self.waiting += 1
+
+        # Let a leader that waits for more records count the new waiter
+        self.sync_condition.notify_all()
+        try:
+            while self.synced_sequence < sequence:
+                if self.syncing:
+                    # Another waiter leads the group commit
+                    self.sync_condition.wait()
+                    continue
+
+                # Lead a group commit: wait for logged appends to join until the window closes or the batch is full
+                self.syncing = True
+                deadline = time.monotonic() + self.window
+                while self.pending > 0 and self.waiting < self.max_batch and time.monotonic() < deadline:
+                    self.sync_condition.wait(deadline - time.monotonic())
+                batch = self.waiting
+
+                # Write every record that has been appended so far with one fsync
+                synced_sequence = None
+                self.sync_condition.release()
+                try:
+                    self.lock.acquire()
+                    last_sequence = self.sequence
+                    fd = os.dup(self.file.fileno())
+                    self.lock.release()
+
+                    # A duplicate of the file descriptor stays valid if the log is rotated during the fsync
+                    try:
+                        self.fsync(fd)
+                    finally:
+                        os.close(fd)
+                    synced_sequence = last_sequence
+                finally:
+                    # Wake up the group (and hand the lead to the next waiter if the fsync failed)
+                    self.sync_condition.acquire()
+                    if synced_sequence is not None:
+                        self.synced_sequence = max(self.synced_sequence, synced_sequence)
+                    self.syncing = False
+                    self.sync_condition.notify_all()
+
+                if self.metrics is not None:
+                    self.metrics.observe('group_commit_size', batch)
+        finally:
+            self.waiting -= 1
+            self.sync_condition.release()
+
+    def fsync(self, fd):
+        """
+        Write a file to disk and observe the latency of the fsync
+        """
+        start = time.time()
+        os.fsync(fd)
+        if self.metrics is not None:
+            self.metrics.increment('wal_fsyncs')
+            self.metrics.observe('wal_fsync_us', (time.time() - start) * 1e6, LATENCY_BOUNDS)
+
+    def rotate(self):
+        """
+        Move the current log to rotated_file_name(self.file_name) and start a new empty log
+        Records in the rotated log can be removed once a checkpoint that includes them has been written
+        """
+        self.lock.acquire()
+
+        # Records of the rotated log must stay on disk until the checkpoint that includes them is on disk
+        if self.durability != 'flush':
+            self.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.file_name, rotated_file_name(self.file_name))
+        self.file = open(self.file_name, 'a', newline='')
+        self.writer = csv.writer(self.file)
+        self.lock.release()
+
+
+def rotated_file_name(file_name):
+    """
+    Path to the log that is being included in a checkpoint
+    """
+    return file_name + '.old'
+
+
+def previous_file_name(file_name):
+    """
+    Path to the previous checkpoint of a catalog file, or to the log of the records between
+    the previous checkpoint and the last one
+    """
+    return file_name + '.prev'
+
+
+def temporary_file_name(file_name):
+    """
+    Path to a checkpoint that is being written, before it replaces the catalog file
+    """
+    return file_name + '.tmp'
+
+
+def truncate_incomplete_record(file_name):
+    """
+    Cut a log file after its last line break
+    :param file_name: path to the log file
+    """
+    if not os.path.exists(file_name):
+        return
+
+    with open(file_name, 'rb+') as walfile:
+        data = walfile.read()
+        if len(data) > 0 and not data.endswith(b'\n'):
+            walfile.truncate(data.rfind(b'\n') + 1)
+
+
+def read_wal(file_name):
+    """
+    Read records from a log file
+    A crash while appending can leave an incomplete last line, so reading stops at the first invalid line
+    :param file_name: path to the log file
+    :return: a list of (sequence, product_name, quantity, price in cents or None if the price did not change)
+    """
+    records = []
+    if not os.path.exists(file_name):
+        return records
+
+    with open(file_name, 'r', newline='') as walfile:
+        for raw_line in walfile:
+            # A complete record always ends with a line break
+            if not raw_line.endswith('\n'):
+                break
+            line = next(csv.reader([raw_line]))
+            if len(line) not in (3, 4):
+                break
+            try:
+                sequence, product_name, quantity = int(line[0]), line[1], int(line[2])
+                price = int(line[3]) if len(line) == 4 else None
+            except ValueError:
+                break
+            records.append((sequence, product_name, quantity, price))
+
+    return records
+
+
+def fsync_file(file_name):
+    """
+    Write a file that has been closed to disk
+    :param file_name: path to the file
+    """
+    fd = os.open(file_name, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_directory(file_name):
+    """
+    Write the directory entries of a file to disk (ex. after the file has been renamed)
+    :param file_name: path to a file in the directory
+    """
+    fd = os.open(os.path.dirname(os.path.abspath(file_name)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def append_file(source_file, destination_file):
+    """
+    Add the content of a file at the end of another file
+    :param source_file: path to the file that is read
+    :param destination_file: path to the file that is extended (created if it does not exist)
+    """
+    with open(source_file, 'rb') as source, open(destination_file, 'ab') as destination:
+        while True:
+            data = source.read(1 << 20)
+            if len(data) == 0:
+                break
+            destination.write(data)
@@ -0,0 +1,283 @@
+"""
+Consistent-hash routing of products to catalog shards.
+Each catalog shard is a catalog component that owns the products whose names hash into its ranges of the ring.
+
+This file is shared by the catalog, order and front-end components.
+Edit src/catalog_router.py and copy it with compile_proto.sh.
+"""
+
+import bisect
+import hashlib
+import itertools
+import time
+
+import grpc
+import catalog_pb2_grpc
+
+# The number of points of each shard on the ring
+# More points spread the products more evenly between the shards
+VIRTUAL_NODES = 64
+
+# Seconds a unary call keeps trying the components of a shard with a hot standby during a failover,
+# and seconds between two tries
+FAILOVER_WAIT = 10
+FAILOVER_RETRY = 0.1
+
+# Errors of a component that is down (UNAVAILABLE) or that does not take orders (FAILED_PRECONDITION):
+# the standby, or a primary whose standby is out of sync
+FAILOVER_CODES = (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.FAILED_PRECONDITION)
+
+# Rpc calls that stream their responses (never retried, see FailoverStub)
+STREAM_METHODS = ('SubscribeInvalidations', 'Replicate', 'Changes', 'ExportProducts', 'Follow')
+
+
+def parse_shards(spec, default=None):
+    """
+    Parse a comma separated list of shard addresses
+    ex. "127.0.0.1:1130,127.0.0.1:1131"
+    :param spec: the list of shard addresses
+    :param default: the address used when spec is empty
+    :return: a list of addresses ("host:port")
+    """
+    shards = [address.strip() for address in spec.split(',') if address.strip() != '']
+    if len(shards) == 0 and default is not None:
+        shards = [default]
+    return shards
+
+
+def parse_replicas(spec, n_shards):
+    """
+    Parse the addresses of the read replicas of each shard
+    Replicas of different shards are separated by ';' in the order of the shards
+    ex. "127.0.0.1:1140,127.0.0.1:1141;127.0.0.1:1142" (two replicas of the first shard, one of the second)
+    :param spec: the list of replica addresses
+    :param n_shards: the number of shards
+    :return: a list with the list of replica addresses of each shard
+    """
+    replicas = [parse_shards(addresses) for addresses in spec.split(';')] if spec.strip() != '' else []
+    if len(replicas) > n_shards:
+        raise ValueError('Replicas are given for %d shards, but there are %d shards' % (len(replicas), n_shards))
+    return replicas + [[] for _ in range(n_shards - len(replicas))]
+
+
+def parse_standbys(spec, n_shards):
+    """
+    Parse the address of the hot standby of each shard
+    Standbys of different shards are separated by ';' in the order of the shards, and a shard without
+    a standby has an empty address
+    ex. "127.0.0.1:1131;;127.0.0.1:1133" (standbys of the first and the third shard)
+    :param spec: the list of standby addresses
+    :param n_shards: the number of shards
+    :return: a list with the standby address of each shard ('' for no standby)
+    """
+    standbys = [address.strip() for address in spec.split(';')] if spec.strip() != '' else []
+    if len(standbys) > n_shards:
+        raise ValueError('Standbys are given for %d shards, but there are %d shards' % (len(standbys), n_shards))
+    return standbys + ['' for _ in range(n_shards - len(standbys))]
+
+
+def hash_key(key):
+    """
+    Hash a string to a point of the ring
+    The hash does not depend on the process (unlike hash()), so every component agrees on the owners
+    """
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing(object):
+    """
+    A consistent-hash ring of shards
+    Adding or removing a shard only moves the products in the ranges of that shard.
+    """
+
+    def __init__(self, shards, virtual_nodes=VIRTUAL_NODES):
+        """
+        :param shards: names of the shards (the addresses of the catalog components)
+        :param virtual_nodes: the number of points of each shard on the ring
+        """
+        if len(shards) == 0:
+            raise ValueError('A hash ring needs at least one shard')
+        self.shards = list(shards)
+
+        # Sorted points of the ring and the shard of each point
+        points = sorted((hash_key('%s#%d' % (shard, i)), shard) for shard in self.shards for i in range(virtual_nodes))
+        self.points = [point for point, _ in points]
+        self.owners = [shard for _, shard in points]
+
+    def owner(self, product_name):
+        """
+        Get the shard that owns a product: the first point of the ring at or after the hash of the name
+        """
+        index = bisect.bisect_left(self.points, hash_key(product_name)) % len(self.points)
+        return self.owners[index]
+
+    def split(self, product_names):
+        """
+        Group product names by their shards while keeping their order
+        :return: a dictionary that maps shards to lists of product names
+        """
+        groups = dict()
+        for product_name in product_names:
+            groups.setdefault(self.owner(product_name), []).append(product_name)
+        return groups
+
+
+class FailoverStub(object):
+    """
+    A stub of a catalog shard with a hot standby
+    Calls go to the component that answered last. A unary call that finds it down (UNAVAILABLE)
+    or finds the standby (FAILED_PRECONDITION) is tried on the other component until one of them answers
+    or failover_wait seconds have passed, so callers ride through a failover. A call gives up at once when both
+    components have refused it in turn (neither is down, and neither takes orders).
+    Calls that stream requests or responses are not retried: their errors make the next call
+    try the other component.
+    An order without a request ID can be applied twice when the primary fails after applying it,
+    so orders that must not be repeated carry request IDs.
+    """
+
+    def __init__(self, addresses, failover_wait=FAILOVER_WAIT):
+        """
+        :param addresses: addresses ("host:port") of the primary and the standby of the shard
+        :param failover_wait: seconds a unary call keeps trying during a failover
+        """
+        self.addresses = list(addresses)
+        self.stubs = [catalog_pb2_grpc.CatalogStub(grpc.insecure_channel(address)) for address in self.addresses]
+        self.failover_wait = failover_wait
+
+        # The index of the component that answered last
+        self.active = 0
+
+    def __getattr__(self, method):
+        """
+        Get a function that makes an rpc call like the method of a CatalogStub
+        """
+        if method.startswith('_'):
+            raise AttributeError(method)
+        if method in STREAM_METHODS:
+            return lambda request, **kwargs: FailoverStream(self, method, request, kwargs)
+        if method == 'ImportProducts':
+            return lambda request_iterator, **kwargs: self.call_once(method, request_iterator, kwargs)
+        return lambda request, **kwargs: self.call(method, request, kwargs)
+
+    def call(self, method, request, kwargs):
+        """
+        Make a unary rpc call, trying the other component when the active component fails over
+        :param kwargs: the arguments of the call (ex. timeout, which applies to each try)
+        """
+        deadline = time.monotonic() + self.failover_wait
+
+        # The components that refused the call since the last component that was down
+        refused = set()
+        while True:
+            active = self.active
+            try:
+                return getattr(self.stubs[active], method)(request, **kwargs)
+            except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.FAILED_PRECONDITION:
+                    refused.add(active)
+                else:
+                    refused.clear()
+                if e.code() not in FAILOVER_CODES or len(refused) == len(self.stubs) or time.monotonic() >= deadline:
+                    raise
+                print("[FailoverStub]", "%s failed on %s:" % (method, self.addresses[active]), e.code())
+                self.switch(active)
+                time.sleep(FAILOVER_RETRY)
+
+    def call_once(self, method, request, kwargs):
+        """
+        Make an rpc call without retrying it, and try the other component next time if it fails over
+        """
+        active = self.active
+        try:
+            return getattr(self.stubs[active], method)(request, **kwargs)
+        except grpc.RpcError as e:
+            if e.code() in FAILOVER_CODES:
+                self.switch(active)
+            raise
+
+    def switch(self, failed):
+        """
+        Make the other component active after the component at index failed has failed a call
+        (unless another call has already switched)
+        """
+        if self.active == failed:
+            self.active = 1 - failed
+
+
+class FailoverStream(object):
+    """
+    A response stream of a FailoverStub
+    Iterates like the stream of a CatalogStub; an error makes the next call try the other component.
+    """
+
+    def __init__(self, failover_stub, method, request, kwargs):
+        self.failover_stub = failover_stub
+        self.active = failover_stub.active
+        self.stream = getattr(failover_stub.stubs[self.active], method)(request, **kwargs)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self.stream)
+        except grpc.RpcError as e:
+            if e.code() in FAILOVER_CODES:
+                self.failover_stub.switch(self.active)
+            raise
+
+    def cancel(self):
+        return self.stream.cancel()
+
+
+class CatalogRouter(object):
+    """
+    A routing client of the catalog shards
+    Keeps one gRPC stub per shard and picks the stub of the shard that owns a product
+    Reads can be spread across the read replicas of a shard (see read_stubs)
+    A shard with a hot standby gets a FailoverStub, so its calls follow a failover.
+    """
+
+    def __init__(self, shards, replicas=None, standbys=None, failover_wait=FAILOVER_WAIT):
+        """
+        :param shards: addresses ("host:port") of the catalog shards
+        :param replicas: a list with the addresses of the read replicas of each shard (see parse_replicas)
+        :param standbys: a list with the address of the hot standby of each shard (see parse_standbys)
+        :param failover_wait: seconds a call to a shard with a standby keeps trying during a failover
+        """
+        self.ring = HashRing(shards)
+
+        # Make a channel and a stub for each shard (a failover stub for a shard with a standby)
+        standbys = standbys if standbys is not None else ['' for _ in shards]
+        self.stubs = {shard: catalog_pb2_grpc.CatalogStub(grpc.insecure_channel(shard)) if standby == ''
+                      else FailoverStub([shard, standby], failover_wait)
+                      for shard, standby in zip(shards, standbys)}
+
+        # Make a stub for each read replica and take turns between the replicas of each shard
+        replicas = replicas if replicas is not None else [[] for _ in shards]
+        self.replica_stubs = {shard: [catalog_pb2_grpc.CatalogStub(grpc.insecure_channel(address))
+                                      for address in addresses]
+                              for shard, addresses in zip(shards, replicas)}
+        self.turns = {shard: itertools.cycle(range(len(stubs))) for shard, stubs in self.replica_stubs.items()}
+
+    def stub(self, product_name):
+        """
+        Get the stub of the shard that owns a product
+        """
+        return self.stubs[self.ring.owner(product_name)]
+
+    def read_stubs(self, shard):
+        """
+        Get the stubs to try for a read of a shard: the next read replica in turn, then the shard itself
+        The shard is also tried when the replica is down or too far behind.
+        """
+        if len(self.replica_stubs[shard]) == 0:
+            return [self.stubs[shard]]
+        return [self.replica_stubs[shard][next(self.turns[shard])], self.stubs[shard]]
+
+    def split(self, product_names):
+        """
+        Group product names by the stubs of their shards
+        :return: a list of (shard, stub, product names)
+        """
+        return [(shard, self.stubs[shard], names) for shard, names in self.ring.split(product_names).items()]
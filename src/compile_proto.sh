@@ -25,6 +25,16 @@ cp front_end_pb2_grpc.py ./front-end/front_end_pb2_grpc.py
 cp front_end_pb2.py ./catalog/front_end_pb2.py
 cp front_end_pb2_grpc.py ./catalog/front_end_pb2_grpc.py
 
+cp catalog_router.py ./front-end/catalog_router.py
+cp catalog_router.py ./order/catalog_router.py
+cp catalog_router.py ./catalog/catalog_router.py
+
+cp dedup.py ./order/dedup.py
+cp dedup.py ./catalog/dedup.py
+
+cp prices.py ./front-end/prices.py
+cp prices.py ./catalog/prices.py
+
 rm order_pb2.py
 rm order_pb2_grpc.py
 rm order2_pb2.py
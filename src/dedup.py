@@ -0,0 +1,118 @@
+"""
+A bounded table of the results of requests with client-supplied request IDs.
+A retried or hedged request with the same request ID gets the result of the first request
+instead of being applied again.
+
+This file is shared by the catalog and order components.
+Edit src/dedup.py and copy it with compile_proto.sh.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class DedupTable(object):
+    """
+    Results of requests kept by request ID for ttl seconds (at most capacity results)
+    A request that arrives while the first request with the same ID is still running waits for its result.
+    """
+
+    def __init__(self, capacity, ttl, metrics=None):
+        """
+        :param capacity: the most results kept; the oldest results are evicted first
+        :param ttl: seconds a result is kept after the request finished
+        :param metrics: a Metrics instance that counts replays and evictions (optional)
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self.metrics = metrics
+
+        # An ordered dictionary that maps request IDs to (expiry time, result) in the order of their expiry
+        self.results = OrderedDict()
+
+        # A dictionary that maps the request IDs of running requests to events set when they finish
+        self.running = dict()
+
+        self.lock = threading.Lock()
+
+    def run(self, request_id, function):
+        """
+        Run function once for a request ID and return its result
+        A replay returns the result of the first run without calling function.
+        If function raises an exception, nothing is kept and a replay runs function again.
+        :param request_id: the request ID (ex. ('Order', '<uuid>'))
+        :param function: a function without arguments that applies the request
+        :return: the result of function
+        """
+        while True:
+            self.lock.acquire()
+            self.evict(time.monotonic())
+            if request_id in self.results.keys():
+                # Replay of a finished request
+                result = self.results[request_id][1]
+                self.lock.release()
+                self.increment('dedup_replays')
+                return result
+
+            event = self.running.get(request_id)
+            if event is None:
+                # First request with this ID
+                event = threading.Event()
+                self.running[request_id] = event
+                self.lock.release()
+                break
+            self.lock.release()
+
+            # Replay of a running request: wait for it and look up its result again
+            event.wait()
+
+        try:
+            result = function()
+            self.put(request_id, result)
+        finally:
+            self.lock.acquire()
+            self.running.pop(request_id)
+            self.lock.release()
+            event.set()
+
+        return result
+
+    def put(self, request_id, result):
+        """
+        Keep the result of a request
+        Also used to record requests that were applied elsewhere (ex. orders propagated by the leader)
+        """
+        self.lock.acquire()
+        self.results.pop(request_id, None)
+        self.results[request_id] = (time.monotonic() + self.ttl, result)
+        self.evict(time.monotonic())
+        self.lock.release()
+
+    def discard(self, request_id):
+        """
+        Forget the result of a request, so that the next request with its ID is applied again
+        (ex. an order whose effect has been undone by a cancellation)
+        """
+        self.lock.acquire()
+        self.results.pop(request_id, None)
+        self.lock.release()
+
+    def evict(self, now):
+        """
+        Remove expired results and the oldest results beyond the capacity
+        Called while holding self.lock
+        """
+        while len(self.results) > 0:
+            request_id, (expiry, _) = next(iter(self.results.items()))
+            if expiry > now and len(self.results) <= self.capacity:
+                break
+            self.results.popitem(last=False)
+            self.increment('dedup_evictions')
+
+    def increment(self, name):
+        if self.metrics is not None:
+            self.metrics.increment(name)
+
+    def __len__(self):
+        return len(self.results)
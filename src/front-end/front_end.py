@@ -13,6 +13,9 @@ from socketserver import ThreadingMixIn
 import threading
 import json
 import re
+import uuid
+import base64
+from urllib.parse import parse_qs
 from concurrent import futures
 import time
 
@@ -23,9 +26,11 @@ import order_pb2 as order_pb2
 import order_pb2_grpc as order_pb2_grpc
 import front_end_pb2 as pb2
 import front_end_pb2_grpc as pb2_grpc
+from catalog_router import CatalogRouter, parse_shards, parse_replicas, parse_standbys
+from prices import parse_cents, format_cents
 
 # Get information about the port number to use
-REST_API_PORT = os.getenv("RESTFUL_API_PORT", 1110)
+REST_API_PORT = int(os.getenv("RESTFUL_API_PORT", 1110))
 FRONT_PORT = int(os.getenv("FRONT_PORT", 1111))
 
 # Get information about order component addresses
@@ -40,6 +45,34 @@ ORDER_PORT_3 = int(os.getenv("ORDER_PORT_3", 1123))
 CATALOG_HOST = os.getenv("CATALOG_HOST", "127.0.0.1")
 CATALOG_PORT = int(os.getenv("CATALOG_PORT", 1130))
 
+# Addresses of the catalog shards (ex. "127.0.0.1:1130,127.0.0.1:1131", default: CATALOG_HOST:CATALOG_PORT)
+CATALOG_SHARDS = parse_shards(os.getenv("CATALOG_SHARDS", ""), default='{}:{}'.format(CATALOG_HOST, CATALOG_PORT))
+
+# Addresses of the read replicas of each catalog shard, used to spread Query requests (default: no replica)
+# ex. "127.0.0.1:1140,127.0.0.1:1141" for one shard, "127.0.0.1:1140;127.0.0.1:1141" for two shards
+CATALOG_REPLICAS = parse_replicas(os.getenv("CATALOG_REPLICAS", ""), len(CATALOG_SHARDS))
+
+# Address of the hot standby of each catalog shard, separated by ';' (default: no standby)
+# and seconds a request keeps trying the primary and the standby of a shard during a failover
+CATALOG_STANDBYS = parse_standbys(os.getenv("CATALOG_STANDBYS", ""), len(CATALOG_SHARDS))
+FAILOVER_WAIT = float(os.getenv("FAILOVER_WAIT", 10))
+
+# How cached products are invalidated
+# 'push': the catalog component sends Invalidate requests to FRONT_PORT of this front-end component
+# 'subscribe': this front-end component subscribes to the invalidation stream of the catalog component,
+#              so any number of front-end components can run (FRONT_PORT is not used)
+INVALIDATION_MODE = os.getenv("INVALIDATION_MODE", "push")
+
+# What a change of a cached product does to the cache
+# 'update': overwrite the cached product with the price, quantity and version carried by the change,
+#           so products that are bought often stay in cache
+# 'invalidate': remove the cached product, so the next query reads it from the catalog component
+CACHE_UPDATE_MODE = os.getenv("CACHE_UPDATE_MODE", "update")
+
+# The default and the largest number of products in a page of GET /products
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", 100))
+LIST_MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", 1000))
+
 # Max workers that will be used to handle requests
 MAX_WORKERS = int(os.getenv("MAX_WORKERS", 100))
 
@@ -51,36 +84,129 @@ ORDER_SELECTION_IN_PROCESS_LOCK = threading.Lock()
 class CatalogStub(object):
     """
     A stub to make a Query call to Catalog Service
+    Each request is sent to the catalog shard that owns the product (see catalog_router.py)
+    Queries take turns between the read replicas of the shard and fall back to the shard
+    when a replica is down or too far behind.
     """
-    def __init__(self, host, port):
+    def __init__(self, shards, replicas=None, standbys=None):
         """
         Initiate the stub
-        :param host: server ip address
-        :param port: server port number
+        :param shards: addresses ("host:port") of the catalog shards
+        :param replicas: a list with the addresses of the read replicas of each shard
+        :param standbys: a list with the address of the hot standby of each shard
         """
-        # Make a channel
-        channel = grpc.insecure_channel('{}:{}'.format(host, port))
+        # Make a channel and a stub for each shard and each read replica
+        self.router = CatalogRouter(shards, replicas, standbys, FAILOVER_WAIT)
 
-        # Initialize the stub
-        self.stub = catalog_pb2_grpc.CatalogStub(channel)
+    def read(self, shard, method, message, primary=False):
+        """
+        Make a read rpc call to a read replica of a shard, or to the shard if every replica fails
+        :param method: the name of the rpc call
+        :param primary: True to read from the shard itself
+        :return: results from the reply
+        """
+        stubs = self.router.read_stubs(shard) if not primary else [self.router.stubs[shard]]
+        for i, stub in enumerate(stubs):
+            try:
+                return getattr(stub, method)(message, timeout=3)
+            except grpc.RpcError as e:
+                # Give up after the shard itself fails
+                if i == len(stubs) - 1:
+                    raise
+                print("[CatalogStub]", "%s failed on a read replica:" % method, e.code())
 
     def Query(self, product_name):
         """
         Make a Query rpc call to Catalog Service
         :param product_name: the product name to query
-        :return: results from the reply
+        :return: price in cents, quantity and version from the reply
         """
         # Construct a message
         message = catalog_pb2.product(product_name=product_name)
 
-        # Make the rpc call
-        result = self.stub.Query(message, timeout=3)
+        # Make the rpc call to the shard that owns the product or to its read replica
+        result = self.read(self.router.ring.owner(product_name), 'Query', message)
 
         # Print the result
-        print("[CatalogStub]", "Query(%s):" % product_name, "{'price': %s, 'quantity': %d)" %(result.price, result.quantity))
+        print("[CatalogStub]", "Query(%s):" % product_name, "{'price_cents': %d, 'quantity': %d, 'version': %d, 'staleness': %.3f)" %(price_cents(result), result.quantity, result.version, result.staleness))
 
         # Return the result
-        return result.price, result.quantity
+        return price_cents(result), result.quantity, result.version
+
+    def QueryMany(self, product_names, primary=False):
+        """
+        Make a QueryMany rpc call to each catalog shard that owns some of the products
+        :param product_names: the product names to query
+        :param primary: True to read from the shards instead of their read replicas
+        :return: a dictionary that maps each product name to its price in cents, quantity and version
+        """
+        products = dict()
+        for shard, stub, names in self.router.split(product_names):
+            # Construct a message with the products of the shard
+            message = catalog_pb2.product_list(product_names=names)
+
+            # Make the rpc call
+            result = self.read(shard, 'QueryMany', message, primary)
+
+            # Print the result
+            print("[CatalogStub]", "QueryMany(%s, %s):" % (shard, ','.join(names)),
+                  ["{'name': %s, 'price_cents': %d, 'quantity': %d}" % (product.product_name, price_cents(product), product.quantity)
+                   for product in result.products])
+
+            for product in result.products:
+                products[product.product_name] = (price_cents(product), product.quantity, product.version)
+
+        # Return the result
+        return products
+
+    def ListProducts(self, prefix, after, page_size):
+        """
+        Make a ListProducts rpc call to each catalog shard and merge their pages
+        The name of the last listed product is the cursor of every shard, so each shard lists at most
+        page_size products after it, and the merged pages are cut to page_size products.
+        :param prefix: the prefix of the product names
+        :param after: the name of the last product of the previous page ('' for the first page)
+        :param page_size: the most products in the page
+        :return: a list of (product_name, price in cents, quantity) in the order of the names,
+                 and the name of the last product if more products follow ('' otherwise)
+        """
+        products = []
+        more = False
+        for shard in self.router.stubs.keys():
+            # Construct a message
+            message = catalog_pb2.list_request(prefix=prefix, page_token=after, page_size=page_size)
+
+            # Make the rpc call to the shard itself, since read replicas do not keep the index of names
+            result = self.read(shard, 'ListProducts', message, primary=True)
+
+            # Print the result
+            print("[CatalogStub]", "ListProducts(%s, %s, %s, %d): %d products"
+                  % (shard, prefix, after, page_size, len(result.products)))
+
+            products += [(product.product_name, price_cents(product), product.quantity) for product in result.products]
+            more = more or result.next_page_token != ''
+
+        # Products after the page are listed on the next page
+        products.sort()
+        more = more or len(products) > page_size
+        products = products[:page_size]
+
+        # Return the result
+        return products, products[-1][0] if more and len(products) > 0 else ''
+
+    def SubscribeInvalidations(self, shard, epoch, since_sequence):
+        """
+        Make a SubscribeInvalidations rpc call to a catalog shard
+        :param shard: the address of the shard
+        :param epoch: the epoch of the last received event (0 if none)
+        :param since_sequence: the sequence number of the last received event (0 if none)
+        :return: an iterator of invalidation events
+        """
+        # Construct a message
+        message = catalog_pb2.subscription(epoch=epoch, since_sequence=since_sequence)
+
+        # Make the rpc call without a timeout since the stream is long-lived
+        return self.router.stubs[shard].SubscribeInvalidations(message)
 
 
 class OrderStub(object):
@@ -103,15 +229,16 @@ class OrderStub(object):
         # Save the stub id
         self.stub_id = stub_id
 
-    def Buy(self, product_name, quantity):
+    def Buy(self, product_name, quantity, request_id=''):
         """
         Make a Buy rpc call to Order Service
         :param product_name: the name of the product
         :param quantity: the quantity to buy
+        :param request_id: the request ID reused by every retry of the same purchase
         :return: results from the reply
         """
         # Construct a message
-        message = order_pb2.order_details(product_name=product_name, quantity=quantity)
+        message = order_pb2.order_details(product_name=product_name, quantity=quantity, request_id=request_id)
 
         # Make the rpc call
         result = self.stub.Buy(message, timeout=1)
@@ -122,6 +249,27 @@ class OrderStub(object):
         # Return the result
         return result.order_number
 
+    def BuyMany(self, items, request_id=''):
+        """
+        Make a Buy rpc call to Order Service for a cart checkout
+        :param items: a list of (product_name, quantity) to buy all-or-nothing
+        :param request_id: the request ID reused by every retry of the same purchase
+        :return: results from the reply
+        """
+        # Construct a message
+        message = order_pb2.order_details(
+            items=[order_pb2.order_item(product_name=product_name, quantity=quantity) for product_name, quantity in items],
+            request_id=request_id)
+
+        # Make the rpc call
+        result = self.stub.Buy(message, timeout=1)
+
+        # Print the result
+        print("[OrderStub %d]" % self.stub_id, "Buy(%s):" % items, "{\'order_number\': %d}" % result.order_number)
+
+        # Return the result
+        return result.order_number
+
     def Check(self, order_number):
         """
         Make a Check rpc call to Order Service to get order details
@@ -139,7 +287,8 @@ class OrderStub(object):
               % (result.product_name, result.quantity), "{\'order_number\': %d}" % order_number)
 
         # Return the result
-        return result.product_name, result.quantity
+        return result.product_name, result.quantity, \
+               [(item.product_name, item.quantity, item.price_cents) for item in result.items]
 
     def Ping(self, ping_number):
 
@@ -155,6 +304,90 @@ class OrderStub(object):
         return result.ping_number
 
 
+class VersionedCache(object):
+    """
+    A cache of product information that only accepts information at least as new as the last invalidation
+    A query result that was read before an invalidation can arrive after the invalidation,
+    so each invalidation leaves the version of the product, and older query results are not cached.
+    """
+
+    def __init__(self):
+        # A dictionary that maps product names to (price in cents, quantity, version)
+        self.entries = dict()
+
+        # A dictionary that maps product names to the version of their last invalidation
+        self.min_versions = dict()
+
+        self.lock = threading.Lock()
+
+    def get(self, product_name):
+        """
+        Get the cached price in cents and quantity of a product
+        :return: (price in cents, quantity), or None if the product is not cached
+        """
+        entry = self.entries.get(product_name)
+        return entry[:2] if entry is not None else None
+
+    def put(self, product_name, price, quantity, version):
+        """
+        Cache the information of a product unless a newer version has been cached or invalidated
+        :return: True if the information is cached
+        """
+        self.lock.acquire()
+        entry = self.entries.get(product_name)
+        accepted = version >= self.min_versions.get(product_name, 0) and (entry is None or version >= entry[2])
+        if accepted:
+            self.entries[product_name] = (price, quantity, version)
+        self.lock.release()
+
+        return accepted
+
+    def invalidate(self, product_name, version):
+        """
+        Remove the cached information of a product if it is older than the version
+        :return: True if the information is removed
+        """
+        self.lock.acquire()
+        self.min_versions[product_name] = max(version, self.min_versions.get(product_name, 0))
+        entry = self.entries.get(product_name)
+        removed = entry is not None and entry[2] < version
+        if removed:
+            self.entries.pop(product_name)
+        self.lock.release()
+
+        return removed
+
+    def update(self, product_name, price, quantity, version):
+        """
+        Overwrite the cached information of a product with a newer version
+        A product that is not cached stays uncached, but older query results of it are no longer cached.
+        :return: True if the information is updated
+        """
+        self.lock.acquire()
+        self.min_versions[product_name] = max(version, self.min_versions.get(product_name, 0))
+        entry = self.entries.get(product_name)
+        updated = entry is not None and entry[2] < version
+        if updated:
+            self.entries[product_name] = (price, quantity, version)
+        self.lock.release()
+
+        return updated
+
+    def pop(self, product_name):
+        """
+        Remove the cached information of a product regardless of its version
+        """
+        self.lock.acquire()
+        self.entries.pop(product_name, None)
+        self.lock.release()
+
+    def keys(self):
+        """
+        Get the names of cached products
+        """
+        return list(self.entries.keys())
+
+
 class FrontServicer(pb2_grpc.FrontServicer):
     def Invalidate(self, request, context):
         """
@@ -165,14 +398,32 @@ class FrontServicer(pb2_grpc.FrontServicer):
         result = {'response': 0}
 
         # Print out the result
-        print("[FrontServicer]", "Invalidate(%s):" % request.product_name, result)
+        print("[FrontServicer]", "Invalidate(%s, %d):" % (request.product_name, request.version), result)
 
-        try:
-            # Remove the relevant information from cache if available
-            cache.pop(request.product_name)
+        # Remove the relevant information from cache if it is older than the invalidation
+        if cache.invalidate(request.product_name, request.version):
             print('[Cache] pop(%s)' % request.product_name)
-        except KeyError:
-            pass
+
+        return pb2.invalidation_response(**result)
+
+    def InvalidateMany(self, request, context):
+        """
+        This servicer is made to receive batched invalidate requests from the catalog component
+        """
+
+        # Always return 0 as a response
+        result = {'response': 0}
+
+        # Print out the result
+        print("[FrontServicer]", "InvalidateMany(%s):" % ('resync' if request.resync else ','.join(request.product_names)),
+              result)
+
+        if request.resync:
+            # The catalog component dropped invalidations: query every cached product again in the background,
+            # so the catalog component does not wait for the queries
+            threading.Thread(target=resync_all, daemon=True).start()
+
+        apply_changes(request)
 
         return pb2.invalidation_response(**result)
 
@@ -222,8 +473,12 @@ class NotFlask():
         return None
 
     def serve(self, handler):
+        # Separate the query string from the path and save the parsed parameters in the handler
+        path, _, query_string = handler.path.partition('?')
+        handler.query_params = parse_qs(query_string)
+
         # Find if there is a pattern match
-        route_match = self.get_route_match(handler.path)
+        route_match = self.get_route_match(path)
         if route_match:
             # If there is a match, call the corresponding function
             kwargs, view_function = route_match
@@ -247,14 +502,20 @@ def query(handler, product_name):
     :return: status code and paylaod
     """
 
-    try:
-        # First try to get the required information from cache
-        price, quantity = cache[product_name]
-        print('[Cache] query request(%s): {price: %s, quantity: %d}' % (product_name, price, quantity))
-    except:
+    # First try to get the required information from cache
+    cached = cache.get(product_name)
+    if cached is not None:
+        price, quantity = cached
+        print('[Cache] query request(%s): {price_cents: %d, quantity: %d}' % (product_name, price, quantity))
+    else:
         try:
             # Make a stub call
-            price, quantity = catalog_stub.Query(product_name)
+            price, quantity, version = catalog_stub.Query(product_name)
+        except grpc.RpcError as e:
+            if overloaded(e):
+                # Send a "service unavailable" reply if the catalog shed the query
+                return handler.error(503, "catalog overloaded, try again later")
+            return handler.error(500, "internal server error")
         except:
             # If error, send a "internal server error" reply
             return handler.error(500, "internal server error")
@@ -263,12 +524,14 @@ def query(handler, product_name):
             # When the product name is not found in the Catalog Service, return "product not found" error
             return handler.error(404, "product not found")
 
-        cache[product_name] = (price, quantity)
+        # The result is not cached if the product has been invalidated with a newer version in the meantime
+        cache.put(product_name, price, quantity, version)
 
     # Make a payload if there was no error
     data = {
         "name": product_name,
-        "price": price,
+        "price": format_cents(price),
+        "price_cents": price,
         "quantity": quantity
     }
     payload = json.dumps({"data": data})
@@ -277,6 +540,108 @@ def query(handler, product_name):
     return 200, payload
 
 
+@app.route("/products")
+def query_many(handler):
+    """
+    This function handles Query requests for several products (ex. /products?names=Tux,Whale)
+    Products found in cache are answered directly and the others are queried with one QueryMany rpc call
+    Without product names, a page of products is listed (see list_products)
+    :param handler: the request handler that has information about parsed HTTP request
+    :return: status code and paylaod
+    """
+
+    # List products if product names are not given
+    if 'names' not in handler.query_params.keys():
+        return list_products(handler)
+
+    # Parse product names while removing duplicates and keeping their order
+    product_names = []
+    for names in handler.query_params['names']:
+        for product_name in names.split(','):
+            if product_name and product_name not in product_names:
+                product_names.append(product_name)
+
+    # First try to get the required information from cache
+    products = dict()
+    for product_name in product_names:
+        cached = cache.get(product_name)
+        if cached is not None:
+            products[product_name] = cached
+            print('[Cache] query request(%s): {price_cents: %d, quantity: %d}' % ((product_name,) + products[product_name]))
+
+    # Query all products that were not found in cache using one rpc call
+    misses = [product_name for product_name in product_names if product_name not in products.keys()]
+    if len(misses) > 0:
+        try:
+            # Make a stub call
+            results = catalog_stub.QueryMany(misses)
+        except grpc.RpcError as e:
+            if overloaded(e):
+                # Send a "service unavailable" reply if the catalog shed the query
+                return handler.error(503, "catalog overloaded, try again later")
+            return handler.error(500, "internal server error")
+        except:
+            # If error, send a "internal server error" reply
+            return handler.error(500, "internal server error")
+
+        for product_name, (price, quantity, version) in results.items():
+            products[product_name] = (price, quantity)
+            if quantity != -1:
+                cache.put(product_name, price, quantity, version)
+
+    # Make a payload in the requested order
+    data = []
+    for product_name in product_names:
+        price, quantity = products[product_name]
+        if quantity == -1:
+            # When the product name is not found in the Catalog Service, leave a "product not found" error
+            data.append({"name": product_name, "error": {"code": 404, "message": "product not found"}})
+        else:
+            data.append({"name": product_name, "price": format_cents(price), "price_cents": price, "quantity": quantity})
+    payload = json.dumps({"data": data})
+
+    # Return a status code of 200 and the payload
+    return 200, payload
+
+
+def list_products(handler):
+    """
+    This function handles listing requests (ex. /products?prefix=Lego&page_size=20)
+    Products are listed in the order of their names. A page with more products after it has a next_page_token,
+    and the next page is requested with it (ex. /products?prefix=Lego&page_token=TGVnb19DaXR5).
+    :param handler: the request handler that has information about parsed HTTP request
+    :return: status code and paylaod
+    """
+    prefix = handler.query_params.get('prefix', [''])[0]
+
+    # A page token is the name of the last product of the previous page in url-safe base64
+    try:
+        after = base64.b64decode(handler.query_params.get('page_token', [''])[0], altchars=b'-_', validate=True).decode()
+        page_size = int(handler.query_params.get('page_size', [LIST_PAGE_SIZE])[0])
+    except ValueError:
+        return handler.error(400, "invalid page_token or page_size")
+    if not 1 <= page_size <= LIST_MAX_PAGE_SIZE:
+        return handler.error(400, "page_size must be between 1 and %d" % LIST_MAX_PAGE_SIZE)
+
+    try:
+        # Make a stub call
+        products, last = catalog_stub.ListProducts(prefix, after, page_size)
+    except grpc.RpcError as e:
+        if overloaded(e):
+            # Send a "service unavailable" reply if the catalog shed the request
+            return handler.error(503, "catalog overloaded, try again later")
+        return handler.error(500, "internal server error")
+
+    # Make a payload with the token of the next page ('' for the last page)
+    data = [{"name": product_name, "price": format_cents(price), "price_cents": price, "quantity": quantity}
+            for product_name, price, quantity in products]
+    next_page_token = base64.urlsafe_b64encode(last.encode()).decode() if last != '' else ''
+    payload = json.dumps({"data": data, "next_page_token": next_page_token})
+
+    # Return a status code of 200 and the payload
+    return 200, payload
+
+
 @app.route("/orders")
 def buy(handler):
     """
@@ -305,21 +670,55 @@ def buy(handler):
         # Send an error reply if the json payload is not interpretable
         return handler.error(400, "invalid json file")
 
+    # Send an error reply if the json payload is not an object
+    if not isinstance(data, dict):
+        return handler.error(400, "invalid json file (a json object is required)")
+
+    # A cart checkout sends a list of line items (ex. {"items": [{"name": "Tux", "quantity": 1}, ...]})
+    if "items" in data.keys():
+        # Send an error reply if the json payload doesn't contain required information
+        if not isinstance(data["items"], list) or len(data["items"]) == 0 or \
+                any(not isinstance(item, dict) or "name" not in item.keys() or "quantity" not in item.keys()
+                    for item in data["items"]):
+            return handler.error(400, "invalid json file (required keys: items, and name, quantity for each item)")
+        items = [(item["name"], item["quantity"]) for item in data["items"]]
+
     # Send an error reply if the json payload doesn't contain required information
-    if "name" not in data.keys() or "quantity" not in data.keys():
+    elif "name" not in data.keys() or "quantity" not in data.keys():
         return handler.error(400, "invalid json file (required keys: name, quantity)")
-
-    if data["quantity"] < 1:
+    else:
+        items = None
+
+    # Send an error reply if a product name is not a string or a quantity is not an integer
+    # (bool is a subclass of int in python, but true is not a quantity)
+    line_items = items or [(data["name"], data["quantity"])]
+    if any(not isinstance(product_name, str) for product_name, _ in line_items):
+        return handler.error(400, "invalid product name (a string is required)")
+    if any(not isinstance(quantity, int) or isinstance(quantity, bool) for _, quantity in line_items):
+        return handler.error(400, "invalid quantity (an integer is required)")
+
+    if any(quantity < 1 for _, quantity in line_items):
         # Send an error reply for invalid quantity
         return handler.error(400, "invalid quantity.")
 
+    # Every retry of the purchase uses the same request ID, so a Buy call that timed out after it was ordered
+    # is not ordered again. Clients can send their own request ID to make their retries safe as well.
+    request_id = str(data.get("request_id") or uuid.uuid4())
+
     global ORDER_LEADER_ID
     while True:
         try:
             # Make a Buy rpc call to the Order service
-            order_number = order_stubs[ORDER_LEADER_ID-1].Buy(data["name"], data["quantity"])
+            if items is not None:
+                order_number = order_stubs[ORDER_LEADER_ID-1].BuyMany(items, request_id)
+            else:
+                order_number = order_stubs[ORDER_LEADER_ID-1].Buy(data["name"], data["quantity"], request_id)
             break
         except _InactiveRpcError as e:
+            if overloaded(e):
+                # Send a "service unavailable" reply if the catalog shed the order
+                # (the order was not placed, so the client can retry it with the same request ID)
+                return handler.error(503, "catalog overloaded, try again later")
             # If the order leader component is inactive, perform leader selection again
             print('_InactiveRpcError', e)
             orderstub_leader_selection(order_stubs)
@@ -353,7 +752,7 @@ def check(handler, order_number):
     while True:
         try:
             # Make a stub call
-            product_name, quantity = order_stubs[ORDER_LEADER_ID-1].Check(int(order_number))
+            product_name, quantity, items = order_stubs[ORDER_LEADER_ID-1].Check(int(order_number))
 
             if quantity == -1:
                 # When the product name is not found in the Catalog Service, return "product not found" error
@@ -371,11 +770,17 @@ def check(handler, order_number):
 
 
     # Make a payload if there was no error
+    # price_cents is the unit price the product was bought at (-1 for orders logged without prices)
     data = {
         "number": order_number,
         "name": product_name,
-        "quantity": quantity
+        "quantity": quantity,
+        "price_cents": items[0][2]
     }
+
+    # Add every line item for cart checkouts
+    if len(items) > 1:
+        data["items"] = [{"name": name, "quantity": count, "price_cents": price_cents} for name, count, price_cents in items]
     payload = json.dumps({"data": data})
 
     # Return a status code of 200 and the payload
@@ -543,6 +948,102 @@ def check_alive(order_stubs):
             orderstub_leader_selection(order_stubs)
         time.sleep(1)
 
+def overloaded(e):
+    """
+    Check whether an rpc call failed because an overloaded catalog component shed it
+    :param e: a grpc.RpcError
+    """
+    return e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+
+
+def price_cents(reply):
+    """
+    Get the price in cents of a query_response or product_info message
+    Catalog components that do not send price_cents yet only send the decimal price string
+    """
+    if reply.price_cents == 0 and reply.price not in ('', '-1'):
+        return parse_cents(reply.price)
+    return reply.price_cents
+
+
+def apply_changes(message):
+    """
+    Apply the changed products of an InvalidateMany request or an invalidation event to the cache
+    Cached products are overwritten with the values carried by the message in the 'update' mode,
+    and removed otherwise (also when the catalog component does not send the values).
+    :param message: a product_list_front or invalidation_event message
+    """
+    update = CACHE_UPDATE_MODE == 'update' and len(message.price_cents) == len(message.product_names)
+
+    for i, (product_name, version) in enumerate(zip(message.product_names, message.versions)):
+        if update:
+            # Overwrite the relevant information in cache if it is older than the change
+            if cache.update(product_name, message.price_cents[i], message.quantities[i], version):
+                print('[Cache] update(%s, %d, %d)' % (product_name, message.price_cents[i], message.quantities[i]))
+        elif cache.invalidate(product_name, version):
+            # Remove the relevant information from cache if it is older than the invalidation
+            print('[Cache] pop(%s)' % product_name)
+
+
+def resync_cache(catalog_stub, shard):
+    """
+    Query every cached product of a catalog shard again after invalidation events of the shard have been missed
+    Products that are not cached stay uncached, so the cache is not flushed
+    """
+    product_names = [product_name for product_name in cache.keys() if catalog_stub.router.ring.owner(product_name) == shard]
+    if len(product_names) == 0:
+        return
+
+    try:
+        # Read from the shard itself, since a read replica might not have applied the missed changes yet
+        products = catalog_stub.QueryMany(product_names, primary=True)
+    except:
+        # The catalog component is not reachable: drop the cached products that cannot be checked
+        products = dict()
+
+    for product_name in product_names:
+        price, quantity, version = products.get(product_name, (-1, -1, 0))
+        if quantity == -1:
+            cache.pop(product_name)
+        else:
+            cache.put(product_name, price, quantity, version)
+    print('[Cache] resync(%d products)' % len(product_names))
+
+
+def resync_all():
+    """
+    Query every cached product again after invalidations have been dropped by a catalog component
+    """
+    for shard in catalog_stub.router.stubs.keys():
+        resync_cache(catalog_stub, shard)
+
+
+def subscribe_invalidations(catalog_stub, shard):
+    """
+    Apply the invalidation events streamed by a catalog shard to the cache
+    A resync event, a new epoch or a skipped sequence number means that events have been missed,
+    so the cached products are queried again.
+    The subscription is reopened after the last received event when the stream breaks.
+    """
+    epoch, sequence = 0, 0
+    while True:
+        try:
+            for event in catalog_stub.SubscribeInvalidations(shard, epoch, sequence):
+                if event.resync or event.epoch != epoch or event.sequence != sequence + 1:
+                    print('[Cache] invalidation events missed: (%d, %d) -> (%d, %d)'
+                          % (epoch, sequence, event.epoch, event.sequence))
+                    resync_cache(catalog_stub, shard)
+
+                apply_changes(event)
+
+                epoch, sequence = event.epoch, event.sequence
+        except grpc.RpcError as e:
+            print('[Cache] invalidation stream closed:', e.code())
+
+        # Wait before subscribing again
+        time.sleep(1)
+
+
 def serve_grpc(port, max_workers):
     # Make a server that consist of a dynamic thread pool using a built-in method
     # with limited maximum number of threads passed on using the argument "max_workers"
@@ -564,9 +1065,15 @@ def serve_grpc(port, max_workers):
 
 
 def main():
-    # Run the FrontServicer using a threadpool from a separate thread
-    t = threading.Thread(target=serve_grpc, args=(FRONT_PORT, MAX_WORKERS))
-    t.start()
+    if INVALIDATION_MODE == 'subscribe':
+        # Receive invalidations from the invalidation stream of each catalog shard
+        for shard in CATALOG_SHARDS:
+            t = threading.Thread(target=subscribe_invalidations, args=(catalog_stub, shard), daemon=True)
+            t.start()
+    else:
+        # Run the FrontServicer using a threadpool from a separate thread
+        t = threading.Thread(target=serve_grpc, args=(FRONT_PORT, MAX_WORKERS))
+        t.start()
 
     t = threading.Thread(target=check_alive, args=(order_stubs,))
     t.start()
@@ -581,7 +1088,7 @@ def main():
     server.serve_forever()
 
 # Make a catalog stub and a order stub to send rpc calls to Catalog Service and Order Service respectively.
-catalog_stub = CatalogStub(CATALOG_HOST, CATALOG_PORT)
+catalog_stub = CatalogStub(CATALOG_SHARDS, CATALOG_REPLICAS, CATALOG_STANDBYS)
 order_stubs = [
     OrderStub(ORDER_HOST_1, ORDER_PORT_1, 1),
     OrderStub(ORDER_HOST_2, ORDER_PORT_2, 2),
@@ -590,7 +1097,8 @@ order_stubs = [
 
 # A cache that will be used to save product information received from the catalog component
 # reduced 21.4% in time consumption when connected through wireless connections
-cache = dict()
+# Each cached product keeps its version, so an invalidation is never undone by an older query result
+cache = VersionedCache()
 
 
 if __name__ == "__main__":
@@ -6,7 +6,7 @@ import front_end_pb2 as front__end__pb2
 
 
 class FrontStub(object):
-    """The catalog component will send invalidate message to the front-end component using Invalidate rpc call
+    """The catalog component will send invalidate message to the front-end component using Invalidate RPC call
     """
 
     def __init__(self, channel):
@@ -20,14 +20,26 @@ class FrontStub(object):
                 request_serializer=front__end__pb2.product_front.SerializeToString,
                 response_deserializer=front__end__pb2.invalidation_response.FromString,
                 )
+        self.InvalidateMany = channel.unary_unary(
+                '/unary.Front/InvalidateMany',
+                request_serializer=front__end__pb2.product_list_front.SerializeToString,
+                response_deserializer=front__end__pb2.invalidation_response.FromString,
+                )
 
 
 class FrontServicer(object):
-    """The catalog component will send invalidate message to the front-end component using Invalidate rpc call
+    """The catalog component will send invalidate message to the front-end component using Invalidate RPC call
     """
 
     def Invalidate(self, request, context):
-        """Declare the rpc call "Invalidation" as an unary rpc
+        """Declare the rpc call "Invalidation" as an unary RPC
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def InvalidateMany(self, request, context):
+        """Declare the rpc call "InvalidateMany" as an unary RPC that invalidates several products at once
         """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
@@ -41,6 +53,11 @@ def add_FrontServicer_to_server(servicer, server):
                     request_deserializer=front__end__pb2.product_front.FromString,
                     response_serializer=front__end__pb2.invalidation_response.SerializeToString,
             ),
+            'InvalidateMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.InvalidateMany,
+                    request_deserializer=front__end__pb2.product_list_front.FromString,
+                    response_serializer=front__end__pb2.invalidation_response.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'unary.Front', rpc_method_handlers)
@@ -49,7 +66,7 @@ def add_FrontServicer_to_server(servicer, server):
 
  # This class is part of an EXPERIMENTAL API.
 class Front(object):
-    """The catalog component will send invalidate message to the front-end component using Invalidate rpc call
+    """The catalog component will send invalidate message to the front-end component using Invalidate RPC call
     """
 
     @staticmethod
@@ -68,3 +85,20 @@ class Front(object):
             front__end__pb2.invalidation_response.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def InvalidateMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.Front/InvalidateMany',
+            front__end__pb2.product_list_front.SerializeToString,
+            front__end__pb2.invalidation_response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
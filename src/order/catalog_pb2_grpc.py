@@ -25,6 +25,66 @@ class CatalogStub(object):
                 request_serializer=catalog__pb2.order.SerializeToString,
                 response_deserializer=catalog__pb2.order_result.FromString,
                 )
+        self.QueryMany = channel.unary_unary(
+                '/unary.Catalog/QueryMany',
+                request_serializer=catalog__pb2.product_list.SerializeToString,
+                response_deserializer=catalog__pb2.query_many_response.FromString,
+                )
+        self.OrderMany = channel.unary_unary(
+                '/unary.Catalog/OrderMany',
+                request_serializer=catalog__pb2.order_list.SerializeToString,
+                response_deserializer=catalog__pb2.order_result.FromString,
+                )
+        self.CancelMany = channel.unary_unary(
+                '/unary.Catalog/CancelMany',
+                request_serializer=catalog__pb2.order_list.SerializeToString,
+                response_deserializer=catalog__pb2.order_result.FromString,
+                )
+        self.Metrics = channel.unary_unary(
+                '/unary.Catalog/Metrics',
+                request_serializer=catalog__pb2.metrics_request.SerializeToString,
+                response_deserializer=catalog__pb2.metrics_response.FromString,
+                )
+        self.SubscribeInvalidations = channel.unary_stream(
+                '/unary.Catalog/SubscribeInvalidations',
+                request_serializer=catalog__pb2.subscription.SerializeToString,
+                response_deserializer=catalog__pb2.invalidation_event.FromString,
+                )
+        self.Replicate = channel.unary_stream(
+                '/unary.Catalog/Replicate',
+                request_serializer=catalog__pb2.subscription.SerializeToString,
+                response_deserializer=catalog__pb2.replication_event.FromString,
+                )
+        self.Changes = channel.unary_stream(
+                '/unary.Catalog/Changes',
+                request_serializer=catalog__pb2.subscription.SerializeToString,
+                response_deserializer=catalog__pb2.replication_event.FromString,
+                )
+        self.ImportProducts = channel.stream_unary(
+                '/unary.Catalog/ImportProducts',
+                request_serializer=catalog__pb2.product_chunk.SerializeToString,
+                response_deserializer=catalog__pb2.import_result.FromString,
+                )
+        self.ExportProducts = channel.unary_stream(
+                '/unary.Catalog/ExportProducts',
+                request_serializer=catalog__pb2.export_request.SerializeToString,
+                response_deserializer=catalog__pb2.product_chunk.FromString,
+                )
+        self.ListProducts = channel.unary_unary(
+                '/unary.Catalog/ListProducts',
+                request_serializer=catalog__pb2.list_request.SerializeToString,
+                response_deserializer=catalog__pb2.list_response.FromString,
+                )
+        self.Follow = channel.stream_stream(
+                '/unary.Catalog/Follow',
+                request_serializer=catalog__pb2.subscription.SerializeToString,
+                response_deserializer=catalog__pb2.replication_event.FromString,
+                )
+        self.Role = channel.unary_unary(
+                '/unary.Catalog/Role',
+                request_serializer=catalog__pb2.role_request.SerializeToString,
+                response_deserializer=catalog__pb2.role_response.FromString,
+                )
 
 
 class CatalogServicer(object):
@@ -32,14 +92,106 @@ class CatalogServicer(object):
     """
 
     def Query(self, request, context):
-        """Declare the rpc call "Query" as an unary rpc
+        """Declare the rpc call "Query" as an unary RPC
         """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
     def Order(self, request, context):
-        """Declare the rpc call "Buy" as an unary rpc
+        """Declare the rpc call "Buy" as an unary RPC
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def QueryMany(self, request, context):
+        """Declare the rpc call "QueryMany" as an unary RPC that answers several products at once
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def OrderMany(self, request, context):
+        """Declare the rpc call "OrderMany" as an unary RPC that orders several products all-or-nothing
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CancelMany(self, request, context):
+        """Declare the rpc call "CancelMany" as an unary RPC that gives back the quantities of an OrderMany call
+        Used when an order with products of several catalog shards fails on one of the shards
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Metrics(self, request, context):
+        """Declare the rpc call "Metrics" as an unary RPC that reports the metrics of the catalog component
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SubscribeInvalidations(self, request, context):
+        """Declare the rpc call "SubscribeInvalidations" as a server-streaming RPC
+        that sends invalidation events in the order of their sequence numbers
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Replicate(self, request, context):
+        """Declare the rpc call "Replicate" as a server-streaming RPC that sends the mutations of the catalog
+        to a read replica: a snapshot when the replica cannot continue from since_sequence, then every mutation
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Changes(self, request, context):
+        """Declare the rpc call "Changes" as a server-streaming RPC that sends every price and quantity change
+        to a downstream consumer (ex. a search indexer) in the same way as Replicate
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ImportProducts(self, request_iterator, context):
+        """Declare the rpc call "ImportProducts" as a client-streaming RPC that adds or overwrites products
+        Each chunk is applied on its own, so the catalog keeps serving other rpc calls during a large import
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ExportProducts(self, request, context):
+        """Declare the rpc call "ExportProducts" as a server-streaming RPC that sends every product in chunks
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ListProducts(self, request, context):
+        """Declare the rpc call "ListProducts" as an unary RPC that lists products in the order of their names
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Follow(self, request_iterator, context):
+        """Declare the rpc call "Follow" as a bidirectional-streaming RPC between the primary and its hot standby
+        The primary sends the mutations as in Replicate, and the standby sends its position first
+        and then acknowledges the last mutation it has applied
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Role(self, request, context):
+        """Declare the rpc call "Role" as an unary RPC that tells whether the catalog component is the primary
+        or the hot standby of its shard
         """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
@@ -58,6 +210,66 @@ def add_CatalogServicer_to_server(servicer, server):
                     request_deserializer=catalog__pb2.order.FromString,
                     response_serializer=catalog__pb2.order_result.SerializeToString,
             ),
+            'QueryMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.QueryMany,
+                    request_deserializer=catalog__pb2.product_list.FromString,
+                    response_serializer=catalog__pb2.query_many_response.SerializeToString,
+            ),
+            'OrderMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.OrderMany,
+                    request_deserializer=catalog__pb2.order_list.FromString,
+                    response_serializer=catalog__pb2.order_result.SerializeToString,
+            ),
+            'CancelMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.CancelMany,
+                    request_deserializer=catalog__pb2.order_list.FromString,
+                    response_serializer=catalog__pb2.order_result.SerializeToString,
+            ),
+            'Metrics': grpc.unary_unary_rpc_method_handler(
+                    servicer.Metrics,
+                    request_deserializer=catalog__pb2.metrics_request.FromString,
+                    response_serializer=catalog__pb2.metrics_response.SerializeToString,
+            ),
+            'SubscribeInvalidations': grpc.unary_stream_rpc_method_handler(
+                    servicer.SubscribeInvalidations,
+                    request_deserializer=catalog__pb2.subscription.FromString,
+                    response_serializer=catalog__pb2.invalidation_event.SerializeToString,
+            ),
+            'Replicate': grpc.unary_stream_rpc_method_handler(
+                    servicer.Replicate,
+                    request_deserializer=catalog__pb2.subscription.FromString,
+                    response_serializer=catalog__pb2.replication_event.SerializeToString,
+            ),
+            'Changes': grpc.unary_stream_rpc_method_handler(
+                    servicer.Changes,
+                    request_deserializer=catalog__pb2.subscription.FromString,
+                    response_serializer=catalog__pb2.replication_event.SerializeToString,
+            ),
+            'ImportProducts': grpc.stream_unary_rpc_method_handler(
+                    servicer.ImportProducts,
+                    request_deserializer=catalog__pb2.product_chunk.FromString,
+                    response_serializer=catalog__pb2.import_result.SerializeToString,
+            ),
+            'ExportProducts': grpc.unary_stream_rpc_method_handler(
+                    servicer.ExportProducts,
+                    request_deserializer=catalog__pb2.export_request.FromString,
+                    response_serializer=catalog__pb2.product_chunk.SerializeToString,
+            ),
+            'ListProducts': grpc.unary_unary_rpc_method_handler(
+                    servicer.ListProducts,
+                    request_deserializer=catalog__pb2.list_request.FromString,
+                    response_serializer=catalog__pb2.list_response.SerializeToString,
+            ),
+            'Follow': grpc.stream_stream_rpc_method_handler(
+                    servicer.Follow,
+                    request_deserializer=catalog__pb2.subscription.FromString,
+                    response_serializer=catalog__pb2.replication_event.SerializeToString,
+            ),
+            'Role': grpc.unary_unary_rpc_method_handler(
+                    servicer.Role,
+                    request_deserializer=catalog__pb2.role_request.FromString,
+                    response_serializer=catalog__pb2.role_response.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'unary.Catalog', rpc_method_handlers)
@@ -102,3 +314,207 @@ class Catalog(object):
             catalog__pb2.order_result.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def QueryMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.Catalog/QueryMany',
+            catalog__pb2.product_list.SerializeToString,
+            catalog__pb2.query_many_response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def OrderMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.Catalog/OrderMany',
+            catalog__pb2.order_list.SerializeToString,
+            catalog__pb2.order_result.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def CancelMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.Catalog/CancelMany',
+            catalog__pb2.order_list.SerializeToString,
+            catalog__pb2.order_result.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Metrics(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.Catalog/Metrics',
+            catalog__pb2.metrics_request.SerializeToString,
+            catalog__pb2.metrics_response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def SubscribeInvalidations(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/unary.Catalog/SubscribeInvalidations',
+            catalog__pb2.subscription.SerializeToString,
+            catalog__pb2.invalidation_event.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Replicate(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/unary.Catalog/Replicate',
+            catalog__pb2.subscription.SerializeToString,
+            catalog__pb2.replication_event.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Changes(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/unary.Catalog/Changes',
+            catalog__pb2.subscription.SerializeToString,
+            catalog__pb2.replication_event.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ImportProducts(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(request_iterator, target, '/unary.Catalog/ImportProducts',
+            catalog__pb2.product_chunk.SerializeToString,
+            catalog__pb2.import_result.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ExportProducts(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/unary.Catalog/ExportProducts',
+            catalog__pb2.export_request.SerializeToString,
+            catalog__pb2.product_chunk.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ListProducts(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.Catalog/ListProducts',
+            catalog__pb2.list_request.SerializeToString,
+            catalog__pb2.list_response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Follow(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/unary.Catalog/Follow',
+            catalog__pb2.subscription.SerializeToString,
+            catalog__pb2.replication_event.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Role(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.Catalog/Role',
+            catalog__pb2.role_request.SerializeToString,
+            catalog__pb2.role_response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
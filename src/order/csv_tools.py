@@ -1,7 +1,9 @@
 import csv
 import os
-import shutil
-from datetime import datetime
+from array import array
+
+# Price of line items that were logged before prices were added to the log
+UNKNOWN_PRICE = -1
 
 
 def write_csv(file_name, rows, mode='a'):
@@ -22,7 +24,7 @@ def make_new_order_log_file(file_name):
     :param file_name: path to the file
     """
     # Write the fields to the log file
-    fields = ['Order number', 'Product name', 'Quantity']
+    fields = ['Order number', 'Product name', 'Quantity', 'Price cents']
     write_csv(file_name, [fields], 'w')
 
 
@@ -32,6 +34,8 @@ def read_log_file(file_name):
     Order numbers: unique, incremental order, starting from 0
     :param file_name: path of the file
     :return: logs and the next order number to use
+        logs: each order number is mapped to a list of (product_name, quantity, price_cents) line items
+              Lines written before prices were logged have 3 columns and UNKNOWN_PRICE as their price.
     """
 
     if not os.path.exists(file_name):
@@ -56,11 +60,33 @@ def read_log_file(file_name):
 
         reader = csv.reader(csvfile, delimiter=',')
         for line in reader:
-            if len(line) != 3:
+            if len(line) not in (3, 4):
                 make_new_order_log_file(file_name)
                 return dict(), 0
-            log[int(line[0])] = (line[1], int(line[2]))
+            price_cents = int(line[3]) if len(line) == 4 else UNKNOWN_PRICE
+            # Line items of the same order share the order number
+            log.setdefault(int(line[0]), []).append((line[1], int(line[2]), price_cents))
             max_order_number = max(max_order_number, int(line[0]))
 
     # Return the next order number
     return log, max_order_number + 1
+
+
+def read_log_columns(file_name):
+    """
+    Read the line items of an order log file into columns
+    :param file_name: path of the file
+    :return: product names (list), quantities (array) and unit prices in cents (array) of the line items
+    """
+    names, quantities, prices = [], array('q'), array('q')
+    with open(file_name, 'r') as csvfile:
+        reader = csv.reader(csvfile)
+
+        # Skip the header
+        next(reader, None)
+        for line in reader:
+            names.append(line[1])
+            quantities.append(int(line[2]))
+            prices.append(int(line[3]) if len(line) == 4 else UNKNOWN_PRICE)
+
+    return names, quantities, prices
@@ -4,11 +4,14 @@ from concurrent import futures
 import order_pb2, order_pb2_grpc, catalog_pb2, catalog_pb2_grpc, order2_pb2, order2_pb2_grpc
 import threading
 import os
+import uuid
 from readerwriterlock import rwlock
 from time import sleep
 
 # import required files
-from csv_tools import write_csv, read_log_file
+from csv_tools import write_csv, read_log_file, UNKNOWN_PRICE
+from catalog_router import CatalogRouter, parse_shards, parse_standbys
+from dedup import DedupTable
 import sys
 
 # Use the os.getenv function to get values for
@@ -33,8 +36,21 @@ ORDER2_PORT_3 = int(os.getenv("ORDER2_PORT_1", 1126))
 # Catalog component address
 CATALOG_HOST = os.getenv("CATALOG_HOST", "127.0.0.1")
 CATALOG_PORT = int(os.getenv("CATALOG_PORT", 1130))
+
+# Addresses of the catalog shards (ex. "127.0.0.1:1130,127.0.0.1:1131", default: CATALOG_HOST:CATALOG_PORT)
+CATALOG_SHARDS = parse_shards(os.getenv("CATALOG_SHARDS", ""), default='{}:{}'.format(CATALOG_HOST, CATALOG_PORT))
+
+# Address of the hot standby of each catalog shard, separated by ';' (default: no standby)
+# and seconds an order keeps trying the primary and the standby of a shard during a failover
+CATALOG_STANDBYS = parse_standbys(os.getenv("CATALOG_STANDBYS", ""), len(CATALOG_SHARDS))
+FAILOVER_WAIT = float(os.getenv("FAILOVER_WAIT", 10))
 MAX_WORKERS = int(os.getenv("MAX_WORKERS", 100))
 
+# Seconds the order number of a Buy request with a request ID is kept to answer its retries,
+# and the most order numbers kept (the oldest are evicted first)
+DEDUP_TTL = float(os.getenv("DEDUP_TTL", 600))
+DEDUP_CAPACITY = int(os.getenv("DEDUP_CAPACITY", 100000))
+
 # Component information
 ORDER_HOSTS = [ORDER_HOST_1, ORDER_HOST_2, ORDER_HOST_3]
 ORDER_PORTS = [ORDER_PORT_1, ORDER_PORT_2, ORDER_PORT_3]
@@ -49,39 +65,107 @@ IS_LEADER = False
 class CatalogStub(object):
     """
     A stub to make a Order call to Catalog Service
+    Each request is sent to the catalog shard that owns the product (see catalog_router.py)
     """
-    def __init__(self, host, port):
+    def __init__(self, shards, standbys=None):
         """
         Initiate the stub
-        :param host: server ip address
-        :param port: server port number
+        :param shards: addresses ("host:port") of the catalog shards
+        :param standbys: a list with the address of the hot standby of each shard
         """
-        # Make a channel
-        channel = grpc.insecure_channel('{}:{}'.format(host, port))
-
-        # Initialize the stub
-        self.stub = catalog_pb2_grpc.CatalogStub(channel)
+        # Make a channel and a stub for each shard
+        self.router = CatalogRouter(shards, standbys=standbys, failover_wait=FAILOVER_WAIT)
 
-    def Order(self, product_name, quantity):
+    def Order(self, product_name, quantity, request_id=''):
         """
         Make an Order rpc call to Catalog Service
         :param product_name: the name of the product to order
         :param quantity: the quantity to order
-        :return: results from the reply
+        :param request_id: the request ID that makes the catalog apply the order only once
+        :return: results from the reply and the unit price in cents the product was bought at
         """
         # Construct a message
         message = catalog_pb2.order(product_name=product_name,
-                                    quantity=quantity)
+                                    quantity=quantity,
+                                    request_id=request_id)
 
-        # Make the rpc call
-        result = self.stub.Order(message, timeout=3)
+        # Make the rpc call to the shard that owns the product
+        result = self.router.stub(product_name).Order(message, timeout=3)
 
         # Print the result
         print("[CatalogStub]", "Order(%s, %d):" % (product_name, quantity),
-              "{'order_result': %d}" % result.order_result)
+              "{'order_result': %d, 'price_cents': %s}" % (result.order_result, list(result.price_cents)))
+
+        # Return the result (catalog components that do not send prices yet leave the price unknown)
+        return result.order_result, result.price_cents[0] if len(result.price_cents) > 0 else UNKNOWN_PRICE
+
+    def OrderMany(self, items, request_id=''):
+        """
+        Make an OrderMany rpc call to each catalog shard that owns products of the order
+        The line items of each shard are ordered all-or-nothing by the shard.
+        If a shard fails, the line items bought from the other shards are given back with CancelMany,
+        so the order is still all-or-nothing (other clients might briefly see the reduced quantities).
+        :param items: a list of (product_name, quantity) to order all-or-nothing
+        :param request_id: the request ID that makes each shard apply its part of the order only once
+        :return: results from the reply (the result of the first failed shard if any)
+                 and the unit price in cents each line item was bought at
+        """
+        quantities = dict()
+        for product_name, quantity in items:
+            quantities.setdefault(product_name, []).append(quantity)
+
+        done = []
+        prices = dict()
+        order_result = 1
+        for shard, stub, product_names in self.router.split(quantities.keys()):
+            # Construct a message with the line items of the shard
+            message = catalog_pb2.order_list(orders=[catalog_pb2.order(product_name=product_name, quantity=quantity)
+                                                     for product_name in product_names
+                                                     for quantity in quantities[product_name]],
+                                             request_id=request_id)
+
+            # Make the rpc call
+            try:
+                result = stub.OrderMany(message, timeout=3)
+            except grpc.RpcError:
+                # Give back the line items bought from the other shards
+                # The failed shard is not cancelled since it is unknown whether it applied the order
+                self.cancel(done)
+                raise
+
+            # Print the result
+            print("[CatalogStub]", "OrderMany(%s, %s):" % (shard, [(order.product_name, order.quantity) for order in message.orders]),
+                  "{'order_result': %d}" % result.order_result)
+
+            if result.order_result != 1:
+                order_result = result.order_result
+                break
+            done.append((shard, stub, message))
+
+            # Keep the price of each product bought from the shard
+            for order, price_cents in zip(message.orders, result.price_cents):
+                prices[order.product_name] = price_cents
+
+        # Give back the line items bought from the other shards
+        if order_result != 1:
+            self.cancel(done)
 
         # Return the result
-        return result.order_result
+        return order_result, [prices.get(product_name, UNKNOWN_PRICE) for product_name, _ in items]
+
+    def cancel(self, done):
+        """
+        Make a CancelMany rpc call to each shard that has bought line items of a failed order
+        The request ID of the OrderMany call is reused: a shard forgets the order it cancels, so a retry of the order
+        with the same request ID takes the products again (and is cancelled again if another shard fails again).
+        :param done: a list of (shard, stub, order_list message)
+        """
+        for shard, stub, message in done:
+            try:
+                result = stub.CancelMany(message, timeout=3)
+                print("[CatalogStub]", "CancelMany(%s):" % shard, "{'order_result': %d}" % result.order_result)
+            except grpc.RpcError as e:
+                print("[CatalogStub]", "CancelMany(%s) failed:" % shard, e)
 
 
 class OrderStub(object):
@@ -109,8 +193,21 @@ class OrderStub(object):
         # Save the OrderServicer instance
         self.servicer = servicer
 
-    def Propagate(self, order_number, product_name, quantity):
-        message = order_pb2.order_information(order_number=order_number, product_name=product_name, quantity=quantity)
+    def Propagate(self, order_number, items, request_id=''):
+        """
+        Send the log information of an order to another order component
+        :param order_number: order number
+        :param items: a list of (product_name, quantity, price_cents) in the order
+        :param request_id: the request ID of the Buy request of the order
+        """
+        message = order_pb2.order_information(
+            order_number=order_number,
+            product_name=items[0][0],
+            quantity=items[0][1],
+            items=[order_pb2.order_item(product_name=product_name, quantity=quantity, price_cents=price_cents)
+                   for product_name, quantity, price_cents in items],
+            request_id=request_id
+        )
 
         result = self.stub.Propagate(message)
 
@@ -138,6 +235,10 @@ class OrderServicer(order_pb2_grpc.OrderServicer):
         self.log, self.order_number = read_log_file(log_file)
         self.write_number = self.order_number
 
+        # Order numbers of Buy requests with request IDs, so that retried requests are not ordered twice
+        # Orders propagated by the leader are included, so retries sent to a new leader are answered as well
+        self.dedup = DedupTable(DEDUP_CAPACITY, DEDUP_TTL)
+
         # Locks
         self.order_number_lock = threading.Lock()
         self.writer_number_lock = threading.Lock()
@@ -163,18 +264,51 @@ class OrderServicer(order_pb2_grpc.OrderServicer):
 
 
     def Buy(self, request, context):
+        """
+        Handle Buy rpc call made from the front-end component
+        A Buy request with a request ID is ordered once, and its retries get the order number of the first call
+        A Buy request rejected by an overloaded catalog fails with RESOURCE_EXHAUSTED and can be retried later.
+        """
+        try:
+            if request.request_id != '':
+                return self.dedup.run(('Buy', request.request_id), lambda: self.apply_buy(request, context))
+            return self.apply_buy(request, context)
+        except grpc.RpcError as e:
+            # Pass on the rejection of an overloaded catalog, so the front-end does not mistake it for
+            # a failure of this component
+            if e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED:
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, e.details())
+            raise
+
+    def apply_buy(self, request, context):
+
+        # A cart checkout sends every line item in request.items
+        items = order_items(request)
+
+        # The catalog applies the order only once for the request ID, even if the order is sent again
+        request_id = request.request_id if request.request_id != '' else str(uuid.uuid4())
 
         # If the quantity is invalid, -2 will be returned for the order number
         order_number = -2
 
-        # Proceed the order only when the quantity is bigger than 0
-        if request.quantity > 0:
-            # Make an Order rpc call to Catalog and get the result
-            order_result = self.catalog_client.Order(request.product_name, request.quantity)
+        # Proceed the order only when every quantity is bigger than 0
+        if all(quantity > 0 for _, quantity in items):
+            if len(request.items) > 0:
+                # Make an OrderMany rpc call to Catalog and get the result
+                order_result, prices = self.catalog_client.OrderMany(items, request_id)
+            else:
+                # Make an Order rpc call to Catalog and get the result
+                order_result, price_cents = self.catalog_client.Order(request.product_name, request.quantity,
+                                                                      request_id)
+                prices = [price_cents]
 
             # If the order was successful
             if order_result == 1:
 
+                # Log each line item with the unit price it was bought at
+                items = [(product_name, quantity, price_cents)
+                         for (product_name, quantity), price_cents in zip(items, prices)]
+
                 # Get the order number and increase self.order_number
                 self.order_number_lock.acquire()
                 order_number = self.order_number
@@ -183,11 +317,11 @@ class OrderServicer(order_pb2_grpc.OrderServicer):
 
                 # Write the purchase information in memory
                 self.log_writer_lock.acquire()
-                self.log[order_number] = (request.product_name, request.quantity)
+                self.log[order_number] = items
                 self.log_writer_lock.release()
 
                 # Propagate the purchase information to other components
-                self.threadpool.submit(self._propagate, order_number, request.product_name, request.quantity)
+                self.threadpool.submit(self._propagate, order_number, items, request.request_id)
 
             # If the order was not successful, return the order_result as the order_number
             else:
@@ -197,7 +331,7 @@ class OrderServicer(order_pb2_grpc.OrderServicer):
         result = {"order_number": order_number}
 
         # Print the result
-        print("[OrderSerivcer]", "Buy(%s, %d):" % (request.product_name, request.quantity), result)
+        print("[OrderSerivcer]", "Buy(%s):" % items, result)
 
         # Make a reply to the client
         return order_pb2.order_query(**result)
@@ -212,11 +346,15 @@ class OrderServicer(order_pb2_grpc.OrderServicer):
         self.log_reader_lock.acquire()
         if request.order_number not in self.log.keys():
             product_name, quantity = -1, -1
+            items = []
         else:
-            product_name, quantity = self.log[request.order_number]
+            items = self.log[request.order_number]
+            product_name, quantity, _ = items[0]
         self.log_reader_lock.release()
 
-        result = {"product_name": product_name, "quantity": quantity}
+        result = {"product_name": product_name, "quantity": quantity,
+                  "items": [order_pb2.order_item(product_name=name, quantity=count, price_cents=price_cents)
+                            for name, count, price_cents in items]}
 
         # Print the result
         print("[OrderSerivcer]", "Check(%d):" % (request.order_number), result)
@@ -251,9 +389,13 @@ class OrderServicer(order_pb2_grpc.OrderServicer):
 
         # Save the log information received from the leader component in memory.
         self.log_writer_lock.acquire()
-        self.log[request.order_number] = (request.product_name, request.quantity)
+        self.log[request.order_number] = logged_items(request)
         self.log_writer_lock.release()
 
+        # Answer retries of the Buy request with the same order number if this component becomes the leader
+        if request.request_id != '':
+            self.dedup.put(('Buy', request.request_id), order_pb2.order_query(order_number=request.order_number))
+
         # Update the order number
         self.order_number_lock.acquire()
         self.order_number = request.order_number + 1
@@ -263,31 +405,31 @@ class OrderServicer(order_pb2_grpc.OrderServicer):
         result = {"ping_number": 0}
 
         # Print out the result
-        print("[OrderSerivcer]", "Propagate(%d, %s, %d):" % (request.order_number, request.product_name, request.quantity), result)
+        print("[OrderSerivcer]", "Propagate(%d, %s):" % (request.order_number, logged_items(request)), result)
 
         return order_pb2.ping(**result)
 
-    def _propagate(self, order_number, product_name, quantity, component_id=None):
+    def _propagate(self, order_number, items, request_id='', component_id=None):
         """
         This function will send propagate messages using threadpool to one or multiple other components
         """
         # If component id is given, propagate to the corresponding order component
         if component_id != None:
-            self.threadpool.submit(self.__propagate, self.order_stubs[component_id], order_number, product_name, quantity)
+            self.threadpool.submit(self.__propagate, self.order_stubs[component_id], order_number, items, request_id)
             return
 
         # If component id is not given, propagate to all other order components
         for order_stub in self.order_stubs.values():
-            self.threadpool.submit(self.__propagate, order_stub, order_number, product_name, quantity)
+            self.threadpool.submit(self.__propagate, order_stub, order_number, items, request_id)
 
-    def __propagate(self, order_stub, order_number, product_name, quantity):
+    def __propagate(self, order_stub, order_number, items, request_id=''):
         """
         This function will be executed in a threadpool to propagate log information to other order components
         :param i: the index of the order stub in self.order_stubs
         other parameters: log information
         """
         try:
-            order_stub.Propagate(order_number, product_name, quantity)
+            order_stub.Propagate(order_number, items, request_id)
         except:
             print('Propagate to component %d failed' % order_stub.stub_id)
         return
@@ -344,10 +486,12 @@ class OrderServicer(order_pb2_grpc.OrderServicer):
                 if flag:
                     # Append logs to write to a list
                     self.log_reader_lock.acquire()
-                    product_name, quantity = self.log[order_number]
+                    items = self.log[order_number]
                     self.log_reader_lock.release()
 
-                    to_write.append([order_number, product_name, quantity])
+                    # Each line item of an order is written in a separate line with the same order number
+                    for product_name, quantity, price_cents in items:
+                        to_write.append([order_number, product_name, quantity, price_cents])
 
                     order_number += 1
                 else:
@@ -425,10 +569,15 @@ class RecoveryStub(object):
         # Track the max order number received
         max_order_number = -1
 
+        # Line items of the same order are received in separate messages
+        received = dict()
+
         for response in self.stub.RequestMissingLogs(self.missing_number_iterator(order_numbers)):
             # Save received log information in memory
+            received.setdefault(response.order_number, []).append(
+                (response.product_name, response.quantity, response.price_cents))
             self.order_servicer.log_writer_lock.acquire()
-            self.order_servicer.log[response.order_number] = (response.product_name, response.quantity)
+            self.order_servicer.log[response.order_number] = received[response.order_number]
             self.order_servicer.log_writer_lock.release()
 
             print('[RecoveryStub %d]' % self.stub_id, 'RequestMissing(%d): (%d, %s, %d)' %
@@ -469,21 +618,48 @@ class RecoveryServicer(order2_pb2_grpc.RecoveryServicer):
 
             # Get the log information
             self.order_servicer.log_reader_lock.acquire()
-            product_name, quantity = self.order_servicer.log[request.order_number]
+            items = self.order_servicer.log[request.order_number]
             self.order_servicer.log_reader_lock.release()
 
-            message = order2_pb2.order_information2(
-                order_number=request.order_number,
-                product_name=product_name,
-                quantity=quantity
-            )
+            # Send one message for each line item of the order
+            for product_name, quantity, price_cents in items:
+                message = order2_pb2.order_information2(
+                    order_number=request.order_number,
+                    product_name=product_name,
+                    quantity=quantity,
+                    price_cents=price_cents
+                )
 
-            print('[RecoveryServicer] RequestMissingLogs(%d): (%d, %s, %d)' %
-                  (request.order_number, request.order_number, product_name, quantity))
-            yield message
+                print('[RecoveryServicer] RequestMissingLogs(%d): (%d, %s, %d)' %
+                      (request.order_number, request.order_number, product_name, quantity))
+                yield message
 
         print('[RecoveryServicer]', 'RequestMissingLogs')
 
+def order_items(request):
+    """
+    Get the line items of an order_details or order_information message
+    :param request: the received message
+    :return: a list of (product_name, quantity)
+    """
+    # Messages without items are single item orders
+    if len(request.items) == 0:
+        return [(request.product_name, request.quantity)]
+    return [(item.product_name, item.quantity) for item in request.items]
+
+
+def logged_items(request):
+    """
+    Get the line items of an order_information message with their unit prices
+    :param request: the received message
+    :return: a list of (product_name, quantity, price_cents)
+    """
+    # Messages without items leave the price unknown
+    if len(request.items) == 0:
+        return [(request.product_name, request.quantity, UNKNOWN_PRICE)]
+    return [(item.product_name, item.quantity, item.price_cents) for item in request.items]
+
+
 def serve_order(order_log_file, max_workers):
     """
     Run the OrderServicer
@@ -540,7 +716,7 @@ if __name__ == '__main__':
 
     sys.stdout = open(os.devnull, 'w')
 
-    order_servicer = OrderServicer(CatalogStub(CATALOG_HOST, CATALOG_PORT), ORDER_LOG_FILE)
+    order_servicer = OrderServicer(CatalogStub(CATALOG_SHARDS, CATALOG_STANDBYS), ORDER_LOG_FILE)
 
     # Call the serve function to start a new thread pool that runs OrderServicer
     t = threading.Thread(target=serve_recovery, args=(order_servicer, MAX_WORKERS))
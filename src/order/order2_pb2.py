@@ -14,11 +14,12 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0corder2.proto\x12\x05unary\"<\n\x0emissing_number\x12\x14\n\x0corder_number\x18\x01 \x01(\x05\x12\x14\n\x0c\x63omponent_id\x18\x02 \x01(\x05\"\x1c\n\x05ping2\x12\x13\n\x0bping_number\x18\x01 \x01(\x05\x32u\n\x08Recovery\x12=\n\x12RequestMissingLogs\x12\x15.unary.missing_number\x1a\x0c.unary.ping2\"\x00(\x01\x12*\n\nBackOnline\x12\x0c.unary.ping2\x1a\x0c.unary.ping2\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0corder2.proto\x12\x05unary\"<\n\x0emissing_number\x12\x14\n\x0corder_number\x18\x01 \x01(\x05\x12\x14\n\x0c\x63omponent_id\x18\x02 \x01(\x05\"g\n\x12order_information2\x12\x14\n\x0corder_number\x18\x01 \x01(\x05\x12\x14\n\x0cproduct_name\x18\x02 \x01(\t\x12\x10\n\x08quantity\x18\x03 \x01(\x05\x12\x13\n\x0bprice_cents\x18\x04 \x01(\x03\"\x1c\n\x05ping2\x12\x13\n\x0bping_number\x18\x01 \x01(\x05\x32\x84\x01\n\x08Recovery\x12L\n\x12RequestMissingLogs\x12\x15.unary.missing_number\x1a\x19.unary.order_information2\"\x00(\x01\x30\x01\x12*\n\nBackOnline\x12\x0c.unary.ping2\x1a\x0c.unary.ping2\"\x00\x62\x06proto3')
 
 
 
 _MISSING_NUMBER = DESCRIPTOR.message_types_by_name['missing_number']
+_ORDER_INFORMATION2 = DESCRIPTOR.message_types_by_name['order_information2']
 _PING2 = DESCRIPTOR.message_types_by_name['ping2']
 missing_number = _reflection.GeneratedProtocolMessageType('missing_number', (_message.Message,), {
   'DESCRIPTOR' : _MISSING_NUMBER,
@@ -27,6 +28,13 @@ missing_number = _reflection.GeneratedProtocolMessageType('missing_number', (_me
   })
 _sym_db.RegisterMessage(missing_number)
 
+order_information2 = _reflection.GeneratedProtocolMessageType('order_information2', (_message.Message,), {
+  'DESCRIPTOR' : _ORDER_INFORMATION2,
+  '__module__' : 'order2_pb2'
+  # @@protoc_insertion_point(class_scope:unary.order_information2)
+  })
+_sym_db.RegisterMessage(order_information2)
+
 ping2 = _reflection.GeneratedProtocolMessageType('ping2', (_message.Message,), {
   'DESCRIPTOR' : _PING2,
   '__module__' : 'order2_pb2'
@@ -40,8 +48,10 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._options = None
   _MISSING_NUMBER._serialized_start=23
   _MISSING_NUMBER._serialized_end=83
-  _PING2._serialized_start=85
-  _PING2._serialized_end=113
-  _RECOVERY._serialized_start=115
-  _RECOVERY._serialized_end=232
+  _ORDER_INFORMATION2._serialized_start=85
+  _ORDER_INFORMATION2._serialized_end=188
+  _PING2._serialized_start=190
+  _PING2._serialized_end=218
+  _RECOVERY._serialized_start=221
+  _RECOVERY._serialized_end=353
 # @@protoc_insertion_point(module_scope)
@@ -14,10 +14,10 @@ class RecoveryStub(object):
         Args:
             channel: A grpc.Channel.
         """
-        self.RequestMissingLogs = channel.stream_unary(
+        self.RequestMissingLogs = channel.stream_stream(
                 '/unary.Recovery/RequestMissingLogs',
                 request_serializer=order2__pb2.missing_number.SerializeToString,
-                response_deserializer=order2__pb2.ping2.FromString,
+                response_deserializer=order2__pb2.order_information2.FromString,
                 )
         self.BackOnline = channel.unary_unary(
                 '/unary.Recovery/BackOnline',
@@ -44,10 +44,10 @@ class RecoveryServicer(object):
 
 def add_RecoveryServicer_to_server(servicer, server):
     rpc_method_handlers = {
-            'RequestMissingLogs': grpc.stream_unary_rpc_method_handler(
+            'RequestMissingLogs': grpc.stream_stream_rpc_method_handler(
                     servicer.RequestMissingLogs,
                     request_deserializer=order2__pb2.missing_number.FromString,
-                    response_serializer=order2__pb2.ping2.SerializeToString,
+                    response_serializer=order2__pb2.order_information2.SerializeToString,
             ),
             'BackOnline': grpc.unary_unary_rpc_method_handler(
                     servicer.BackOnline,
@@ -75,9 +75,9 @@ class Recovery(object):
             wait_for_ready=None,
             timeout=None,
             metadata=None):
-        return grpc.experimental.stream_unary(request_iterator, target, '/unary.Recovery/RequestMissingLogs',
+        return grpc.experimental.stream_stream(request_iterator, target, '/unary.Recovery/RequestMissingLogs',
             order2__pb2.missing_number.SerializeToString,
-            order2__pb2.ping2.FromString,
+            order2__pb2.order_information2.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
 
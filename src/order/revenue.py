@@ -0,0 +1,62 @@
+"""
+Add up the revenue of the orders in an order log file.
+Each line item of the log has the unit price in cents it was bought at, so revenue is integer arithmetic
+on columns of the log instead of parsing price strings.
+ex. python3 revenue.py --log_file data/log1.csv --top 10
+
+Line items logged before prices were added to the log have no price and are only counted.
+"""
+
+import argparse
+import operator
+
+from csv_tools import read_log_columns, UNKNOWN_PRICE
+
+
+def parse():
+    """
+    This function will be used to parse input arguments to the main function
+    Returns: arguments
+    """
+    parser = argparse.ArgumentParser(description='Add up the revenue of an order log file.')
+    parser.add_argument('--log_file', type=str, default='data/log1.csv')
+    # Number of products with the most revenue to print
+    parser.add_argument('--top', type=int, default=10)
+
+    args = parser.parse_args()
+    return args
+
+
+def revenue(names, quantities, prices):
+    """
+    Add up the revenue of line items in cents
+    :param names: product names of the line items
+    :param quantities: quantities of the line items
+    :param prices: unit prices in cents of the line items (UNKNOWN_PRICE if unknown)
+    :return: total revenue, revenue of each product, and the number of line items without a price
+    """
+    # Line items without a price count as no revenue
+    amounts = [amount if price != UNKNOWN_PRICE else 0
+               for amount, price in zip(map(operator.mul, quantities, prices), prices)]
+
+    by_product = dict()
+    for product_name, amount in zip(names, amounts):
+        by_product[product_name] = by_product.get(product_name, 0) + amount
+
+    return sum(amounts), by_product, prices.count(UNKNOWN_PRICE)
+
+
+def main(args):
+    total, by_product, unknown = revenue(*read_log_columns(args.log_file))
+
+    # Print the products with the most revenue
+    for product_name, amount in sorted(by_product.items(), key=lambda item: -item[1])[:args.top]:
+        print("%-32s %12d.%02d" % ((product_name,) + divmod(amount, 100)))
+    print("%-32s %12d.%02d" % (("Total",) + divmod(total, 100)))
+
+    if unknown > 0:
+        print("%d line items have no price" % unknown)
+
+
+if __name__ == '__main__':
+    main(parse())
@@ -0,0 +1,27 @@
+"""
+Conversions between decimal price strings and integer numbers of cents.
+Prices are kept in cents everywhere but in csv catalog files and JSON payloads.
+
+This file is shared by the catalog and front-end components.
+Edit src/prices.py and copy it with compile_proto.sh.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def parse_cents(price):
+    """
+    Parse a decimal price string into an integer number of cents (ex. '26.89' -> 2689, '26.8' -> 2680)
+    Prices with more than two decimal places are rounded to the nearest cent.
+    """
+    whole, _, fraction = price.strip().partition('.')
+    if len(fraction) <= 2 and whole.isdigit() and (fraction == '' or fraction.isdigit()):
+        return int(whole) * 100 + int(fraction.ljust(2, '0'))
+    return int((Decimal(price) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def format_cents(cents):
+    """
+    Format a non-negative integer number of cents as a decimal price string (ex. 2689 -> '26.89')
+    """
+    return '%d.%02d' % divmod(cents, 100)
@@ -0,0 +1,116 @@
+"""
+Shared helpers of the behavior tests.
+The tests call the rpc handlers of the components in the same process (or through grpc servers on local ports),
+with the catalog files in temporary directories.
+Run from the root of the repository: python -m pytest test/behavior
+"""
+
+import importlib
+import os
+import sys
+from concurrent import futures
+
+import grpc
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src')
+CATALOG_DIR = os.path.join(SRC_DIR, 'catalog')
+
+# Invalidations are not pushed to a front-end component during the tests
+os.environ['FRONT_HOST'] = ''
+sys.path.insert(0, CATALOG_DIR)
+
+import catalog_pb2 as pb2
+import catalog_pb2_grpc as pb2_grpc
+from catalog import CatalogServicer
+
+
+class Aborted(Exception):
+    """
+    Raised by Context.abort
+    """
+
+    def __init__(self, code, details):
+        super().__init__(code, details)
+        self.code, self.details = code, details
+
+
+class Context(object):
+    """
+    A grpc.ServicerContext for rpc handlers that are called directly
+    """
+
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+    def time_remaining(self):
+        return None
+
+    def abort(self, code, details):
+        raise Aborted(code, details)
+
+
+def write_catalog_file(directory, products):
+    """
+    Write a catalog file
+    :param products: a list of (product_name, price, quantity)
+    :return: path to the catalog file
+    """
+    file_name = os.path.join(str(directory), 'catalog.csv')
+    with open(file_name, 'w') as catalog_file:
+        catalog_file.write('product_name,price,quantity\n')
+        for product_name, price, quantity in products:
+            catalog_file.write('%s,%s,%d\n' % (product_name, price, quantity))
+    return file_name
+
+
+def make_servicer(catalog_file, **kwargs):
+    """
+    Make a CatalogServicer without restock configuration
+    """
+    kwargs.setdefault('restock_file', 'none')
+    return CatalogServicer(catalog_file, **kwargs)
+
+
+def quantity(servicer, product_name):
+    """
+    Get the quantity of a product with a Query call
+    """
+    return servicer.Query(pb2.product(product_name=product_name), Context()).quantity
+
+
+def start_server(servicer):
+    """
+    Serve a servicer on a local port
+    :return: the server and its address
+    """
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    pb2_grpc.add_CatalogServicer_to_server(servicer, server)
+    port = server.add_insecure_port('127.0.0.1:0')
+    server.start()
+    return server, '127.0.0.1:%d' % port
+
+
+def import_component(directory, module_name, shadowed=('csv_tools',)):
+    """
+    Import the module of another component
+    The components have their own modules with the same names (ex. csv_tools), so those modules are imported
+    from the directory of the component and then removed from sys.modules again.
+    """
+    saved = {name: sys.modules.pop(name) for name in shadowed if name in sys.modules}
+    sys.path.insert(0, os.path.join(SRC_DIR, directory))
+    try:
+        return importlib.import_module(module_name)
+    finally:
+        sys.path.pop(0)
+        for name in shadowed:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved)
+
+
+@pytest.fixture
+def catalog_file(tmp_path):
+    return write_catalog_file(tmp_path, [('Tux', '19.43', 100), ('Whale', '30.00', 100), ('Lego', '25.00', 5)])
@@ -0,0 +1,60 @@
+"""
+Admission control: shed rpc calls are rejected at once, even when every worker thread is busy
+"""
+
+import threading
+import time
+
+import grpc
+import pytest
+
+from conftest import pb2, pb2_grpc
+from admission import PriorityExecutor, AdmissionInterceptor, ORDER, QUERY
+from metrics import Metrics
+
+
+class BlockedCatalog(pb2_grpc.CatalogServicer):
+    """
+    A catalog whose orders wait until they are released
+    """
+
+    def __init__(self):
+        self.released = threading.Event()
+
+    def Order(self, request, context):
+        self.released.wait()
+        return pb2.order_result(order_result=1)
+
+
+def test_shed_calls_are_rejected_while_every_worker_is_busy():
+    metrics = Metrics()
+    executor = PriorityExecutor(2, metrics)
+    server = grpc.server(executor, interceptors=[AdmissionInterceptor(executor, {ORDER: 1, QUERY: 1}, metrics)])
+    servicer = BlockedCatalog()
+    pb2_grpc.add_CatalogServicer_to_server(servicer, server)
+    port = server.add_insecure_port('127.0.0.1:0')
+    server.start()
+    stub = pb2_grpc.CatalogStub(grpc.insecure_channel('127.0.0.1:%d' % port))
+    try:
+        # Two orders take both workers, and a third one fills the queue of the orders.
+        # Each order is sent once the previous one is in place, so none of them is shed.
+        calls = []
+        for running, queued in [(1, 0), (2, 0), (2, 1)]:
+            calls.append(stub.Order.future(pb2.order(product_name='Tux', quantity=1), timeout=10))
+            deadline = time.monotonic() + 5
+            while executor.running < running or executor.queued(ORDER) < queued:
+                assert time.monotonic() < deadline, 'timed out'
+                time.sleep(0.01)
+
+        start = time.monotonic()
+        with pytest.raises(grpc.RpcError) as e:
+            stub.Order(pb2.order(product_name='Tux', quantity=1), timeout=2)
+        assert e.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+        assert time.monotonic() - start < 0.5
+        assert metrics.snapshot()['admission_shed_orders'] == 1
+
+        servicer.released.set()
+        assert [call.result().order_result for call in calls] == [1, 1, 1]
+    finally:
+        servicer.released.set()
+        server.stop(None)
@@ -0,0 +1,33 @@
+"""
+The asyncio server: work that takes the locks of the catalog does not stall the event loop
+"""
+
+import asyncio
+import threading
+import time
+
+from conftest import pb2, Context
+from catalog import AsyncCatalogServicer
+
+
+def test_orders_waiting_for_a_checkpoint_do_not_stall_the_event_loop(catalog_file):
+    async def run():
+        servicer = AsyncCatalogServicer(catalog_file, restock_file='none')
+
+        # A checkpoint holds every lock of the catalog while it copies the catalog
+        servicer.catalog_lock.acquire_all()
+        threading.Timer(1, servicer.catalog_lock.release_all).start()
+
+        order = asyncio.ensure_future(servicer.Order(pb2.order(product_name='Tux', quantity=1), Context()))
+        await asyncio.sleep(0)
+
+        # Queries are answered while the order waits for the locks
+        start = time.monotonic()
+        reply = await servicer.Query(pb2.product(product_name='Whale'), Context())
+        assert reply.quantity == 100
+        assert time.monotonic() - start < 0.5
+        assert not order.done()
+
+        assert (await asyncio.wait_for(order, 5)).order_result == 1
+
+    asyncio.run(run())
@@ -0,0 +1,18 @@
+"""
+Binary catalog files: prices as integers of cents
+"""
+
+from binary_store import BinaryStore, csv2bin, read_binary
+
+
+def test_prices_are_kept_in_cents(tmp_path, catalog_file):
+    file_name = str(tmp_path / 'catalog.bin')
+    csv2bin(catalog_file, file_name)
+
+    store = BinaryStore(file_name)
+    store[0] = ('Tux', 123456789012345, 7)
+    store.append(('Ball', 5, 1))
+    store.mmap.flush()
+
+    _, rows = read_binary(file_name)
+    assert rows == [['Tux', 123456789012345, 7], ['Whale', 3000, 100], ['Lego', 2500, 5], ['Ball', 5, 1]]
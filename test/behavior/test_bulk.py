@@ -0,0 +1,75 @@
+"""
+ImportProducts and ExportProducts: round-trips through the rpc calls and through bulk.py across shards
+"""
+
+import csv
+
+from conftest import pb2, Context, make_servicer, quantity, start_server, write_catalog_file
+from bulk import import_products, export_products
+from catalog_router import CatalogRouter
+
+
+def product(product_name, price, quantity):
+    return pb2.product_info(product_name=product_name, price=price, quantity=quantity)
+
+
+def exported(servicer, chunk_size):
+    chunks = list(servicer.ExportProducts(pb2.export_request(chunk_size=chunk_size), Context()))
+    assert all(len(chunk.products) <= chunk_size for chunk in chunks)
+    return [(p.product_name, p.price_cents, p.quantity) for chunk in chunks for p in chunk.products]
+
+
+def test_import_adds_updates_and_rejects_rows(catalog_file):
+    servicer = make_servicer(catalog_file)
+    chunks = [
+        pb2.product_chunk(products=[product('Ball', '2.50', 3), product('Tux', '20.00', 7),
+                                    product('Bad price', 'abc', 1), product('Negative', '1.00', -1)]),
+        pb2.product_chunk(products=[product('', '1.00', 1), product('x' * 65, '1.00', 1),
+                                    product('Ball', '2.75', 4), product('Yoyo', '0.99', 0)]),
+    ]
+
+    result = servicer.ImportProducts(iter(chunks), Context())
+    assert (result.added, result.updated, result.rejected) == (2, 2, 4)
+
+    # The last row of a product wins, and rejected rows change nothing
+    assert exported(servicer, 2) == [('Tux', 2000, 7), ('Whale', 3000, 100), ('Lego', 2500, 5),
+                                     ('Ball', 275, 4), ('Yoyo', 99, 0)]
+    assert quantity(servicer, 'Negative') == -1
+
+
+def test_export_imports_into_an_empty_catalog(tmp_path, catalog_file):
+    servicer = make_servicer(catalog_file)
+    servicer.ImportProducts(iter([pb2.product_chunk(products=[product('Ball', '0.05', 1)])]), Context())
+
+    (tmp_path / 'copy').mkdir()
+    copy = make_servicer(write_catalog_file(tmp_path / 'copy', []))
+    result = copy.ImportProducts(servicer.ExportProducts(pb2.export_request(chunk_size=1), Context()), Context())
+    assert (result.added, result.updated, result.rejected) == (4, 0, 0)
+    assert exported(copy, 10) == exported(servicer, 10)
+
+
+def test_bulk_round_trip_across_shards(tmp_path):
+    rows = [('product_%02d' % i, '%d.%02d' % (i, i), i) for i in range(40)]
+    import_file, export_file = str(tmp_path / 'import.csv'), str(tmp_path / 'export.csv')
+    with open(import_file, 'w') as csv_file:
+        csv.writer(csv_file).writerows([('product_name', 'price', 'quantity')] + rows)
+
+    servers, addresses = [], []
+    for i in range(2):
+        (tmp_path / str(i)).mkdir()
+        server, address = start_server(make_servicer(write_catalog_file(tmp_path / str(i), [])))
+        servers.append(server)
+        addresses.append(address)
+
+    try:
+        router = CatalogRouter(addresses)
+        import_products(router, import_file, 7)
+        export_products(router, export_file, 7)
+
+        with open(export_file, 'r') as csv_file:
+            exported_rows = list(csv.reader(csv_file))
+        assert exported_rows[0] == ['product_name', 'price', 'quantity']
+        assert sorted(tuple(row) for row in exported_rows[1:]) == [(name, price, str(n)) for name, price, n in rows]
+    finally:
+        for server in servers:
+            server.stop(None)
@@ -0,0 +1,42 @@
+"""
+The versioned cache of the front-end component: query results older than an invalidation are not cached
+"""
+
+import pytest
+
+from conftest import import_component
+
+
+@pytest.fixture
+def cache():
+    return import_component('front-end', 'front_end').VersionedCache()
+
+
+def test_stale_query_result_is_not_cached_after_an_invalidation(cache):
+    assert cache.put('Tux', 1943, 100, 2)
+
+    # An order made version 3 while a query result of version 2 was on its way
+    assert cache.invalidate('Tux', 3)
+    assert cache.get('Tux') is None
+    assert not cache.put('Tux', 1943, 100, 2)
+    assert cache.get('Tux') is None
+
+    assert cache.put('Tux', 1943, 99, 3)
+    assert cache.get('Tux') == (1943, 99)
+
+
+def test_older_versions_do_not_replace_newer_ones(cache):
+    assert cache.put('Tux', 1943, 99, 5)
+    assert not cache.put('Tux', 1943, 100, 4)
+
+    # An invalidation older than the cached version leaves the product cached
+    assert not cache.invalidate('Tux', 4)
+    assert cache.get('Tux') == (1943, 99)
+
+    # An update only overwrites an older cached version, and never caches a product by itself
+    assert not cache.update('Tux', 1943, 98, 4)
+    assert cache.update('Tux', 1943, 97, 6)
+    assert cache.get('Tux') == (1943, 97)
+    assert not cache.update('Whale', 3000, 1, 1)
+    assert cache.get('Whale') is None
+    assert not cache.put('Whale', 3000, 2, 0)
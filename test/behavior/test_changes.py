@@ -0,0 +1,101 @@
+"""
+Resuming the change feed (Changes rpc call) from a saved position
+"""
+
+import grpc
+
+from conftest import pb2, pb2_grpc, Context, make_servicer, start_server
+from change_log import ChangeLog
+from changes import read_state, write_state
+
+
+class Feed(object):
+    """
+    A Changes call of a consumer
+    """
+
+    def __init__(self, address, epoch, sequence):
+        self.channel = grpc.insecure_channel(address)
+        self.call = pb2_grpc.CatalogStub(self.channel).Changes(
+            pb2.subscription(epoch=epoch, since_sequence=sequence), timeout=10)
+
+    def next_events(self):
+        """
+        Read the events up to the end of a snapshot or up to the next event with changes
+        :return: the events
+        """
+        events = []
+        for event in self.call:
+            events.append(event)
+            if (event.snapshot and event.snapshot_done) or (not event.snapshot and len(event.products) > 0):
+                return events
+
+    def close(self):
+        self.call.cancel()
+        self.channel.close()
+
+
+def changed(events):
+    return [(product.product_name, product.quantity) for event in events for product in event.products]
+
+
+def order(servicer, product_name, quantity):
+    servicer.Order(pb2.order(product_name=product_name, quantity=quantity), Context())
+
+
+def test_resumed_feed_sends_only_the_changes_after_the_saved_position(tmp_path, catalog_file):
+    servicer = make_servicer(catalog_file)
+    server, address = start_server(servicer)
+    state_file = str(tmp_path / 'changes.state')
+    try:
+        # A new consumer starts with a snapshot and saves the position after it
+        feed = Feed(address, *read_state(state_file))
+        snapshot = feed.next_events()
+        assert all(event.snapshot for event in snapshot)
+        assert sorted(changed(snapshot)) == [('Lego', 5), ('Tux', 100), ('Whale', 100)]
+        write_state(state_file, snapshot[-1].epoch, snapshot[-1].sequence)
+        feed.close()
+
+        # Changes made while the consumer is stopped are sent when it resumes, without a snapshot
+        order(servicer, 'Tux', 1)
+        order(servicer, 'Whale', 2)
+        feed = Feed(address, *read_state(state_file))
+        events = feed.next_events() + feed.next_events()
+        assert not any(event.snapshot for event in events)
+        assert changed(events) == [('Tux', 99), ('Whale', 98)]
+        write_state(state_file, events[-1].epoch, events[-1].sequence)
+        feed.close()
+
+        # Resuming from the same position again sends nothing already seen
+        order(servicer, 'Lego', 1)
+        feed = Feed(address, *read_state(state_file))
+        assert changed(feed.next_events()) == [('Lego', 4)]
+        feed.close()
+    finally:
+        server.stop(None)
+
+
+def test_feed_sends_a_snapshot_when_the_position_is_lost(catalog_file):
+    servicer = make_servicer(catalog_file)
+    servicer.mutation_log = ChangeLog(2)
+    server, address = start_server(servicer)
+    try:
+        feed = Feed(address, 0, 0)
+        snapshot = feed.next_events()
+        feed.close()
+        epoch, sequence = snapshot[-1].epoch, snapshot[-1].sequence
+
+        # More changes than the log keeps: the consumer fell off the end of the log
+        for _ in range(3):
+            order(servicer, 'Tux', 1)
+        feed = Feed(address, epoch, sequence)
+        events = feed.next_events()
+        feed.close()
+        assert events[0].snapshot and ('Tux', 97) in changed(events)
+
+        # Another run of the catalog component (another epoch)
+        feed = Feed(address, epoch - 1, events[-1].sequence)
+        assert feed.next_events()[0].snapshot
+        feed.close()
+    finally:
+        server.stop(None)
@@ -0,0 +1,103 @@
+"""
+Recovery of the csv and columnar stores after a crash during or after a checkpoint
+Each test leaves the files as a crash would, opens the store again and checks that no logged mutation is lost.
+"""
+
+import os
+
+import pytest
+
+from csv_tools import write_catalog
+from stores import open_store
+from striped_lock import StripedLock
+from wal import previous_file_name, temporary_file_name
+
+STORES = ['csv', 'columnar']
+
+
+def set_quantity(store, product_name, quantity):
+    """
+    Apply and log a mutation like CatalogServicer does
+    """
+    index = [record[0] for record in store.records].index(product_name)
+    store.sync(store.log([(product_name, quantity)]))
+    store.records[index] = (product_name, store.records[index][1], quantity)
+
+
+def quantities(store):
+    return {product_name: quantity for product_name, _, quantity in store.records}
+
+
+def make_history(catalog_file, store_type):
+    """
+    Two checkpoints with mutations before, between and after them
+    :return: the quantities after the last mutation
+    """
+    store = open_store(store_type, catalog_file)
+    lock = StripedLock(4)
+    set_quantity(store, 'Tux', 90)
+    store.checkpoint(lock)
+    set_quantity(store, 'Tux', 80)
+    set_quantity(store, 'Whale', 50)
+    store.checkpoint(lock)
+    set_quantity(store, 'Tux', 70)
+    return store, quantities(store)
+
+
+def truncate(file_name):
+    # A half-written page at the end of the file: the trailer and part of the last row are lost
+    with open(file_name, 'r+b') as catalog_file:
+        catalog_file.truncate(os.path.getsize(file_name) - 30)
+
+
+def flip_byte(file_name):
+    # A corrupted page: the file still ends with a trailer that does not match the rows
+    with open(file_name, 'r+b') as catalog_file:
+        catalog_file.seek(40)
+        byte = catalog_file.read(1)
+        catalog_file.seek(40)
+        catalog_file.write(bytes([byte[0] ^ 1]))
+
+
+@pytest.mark.parametrize('store_type', STORES)
+@pytest.mark.parametrize('damage', [truncate, flip_byte, os.remove])
+def test_damaged_checkpoint_falls_back_to_the_previous_one(catalog_file, store_type, damage):
+    _, expected = make_history(catalog_file, store_type)
+    damage(catalog_file)
+
+    store = open_store(store_type, catalog_file)
+    assert store.fallback
+    assert quantities(store) == expected
+
+    # The recovered catalog is written as a new checkpoint that is valid on the next start
+    set_quantity(store, 'Lego', 1)
+    expected['Lego'] = 1
+    assert quantities(open_store(store_type, catalog_file)) == expected
+
+
+@pytest.mark.parametrize('store_type', STORES)
+def test_crash_between_the_renames_of_a_checkpoint(catalog_file, store_type):
+    store, expected = make_history(catalog_file, store_type)
+
+    # The third checkpoint stops after the catalog file became the previous checkpoint
+    store.wal.rotate()
+    write_catalog(temporary_file_name(catalog_file), store.fields, store.copy_records())
+    os.replace(catalog_file, previous_file_name(catalog_file))
+
+    store = open_store(store_type, catalog_file)
+    assert not os.path.exists(temporary_file_name(catalog_file))
+    assert quantities(store) == expected
+
+
+@pytest.mark.parametrize('store_type', STORES)
+def test_crash_while_writing_a_checkpoint(catalog_file, store_type):
+    store, expected = make_history(catalog_file, store_type)
+
+    # The third checkpoint stops while the temporary file is written
+    store.wal.rotate()
+    with open(temporary_file_name(catalog_file), 'w') as temporary_file:
+        temporary_file.write('product_name,price,quantity\nTux,19.43,')
+
+    store = open_store(store_type, catalog_file)
+    assert not store.fallback
+    assert quantities(store) == expected
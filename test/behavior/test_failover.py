@@ -0,0 +1,264 @@
+"""
+A primary and its hot standby: failover, partitions and standbys that fall out of sync
+Both components run in this process on grpc servers of their own. A network failure is simulated by pointing
+the stub of a component to its peer at an address where nothing listens.
+"""
+
+import os
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+import catalog
+from conftest import pb2, pb2_grpc, Context, Aborted, make_servicer, quantity, start_server, write_catalog_file
+from catalog_router import FailoverStub
+from replica import ReplicaServicer
+
+
+@pytest.fixture(autouse=True)
+def fast_failover(monkeypatch):
+    monkeypatch.setattr(catalog, 'FAILOVER_TIMEOUT', 0.5)
+    monkeypatch.setattr(catalog, 'REPLICATION_HEARTBEAT', 0.1)
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.05)
+
+
+def unreachable():
+    return pb2_grpc.CatalogStub(grpc.insecure_channel('127.0.0.1:1'))
+
+
+class Pair(object):
+    """
+    A primary and its hot standby
+    """
+
+    def __init__(self, tmp_path, terms=(0, 0)):
+        """
+        :param terms: the terms kept in the term files of the components before they start
+        """
+        self.tmp_path = tmp_path
+        self.servers = [grpc.server(futures.ThreadPoolExecutor(max_workers=10)) for _ in range(2)]
+        self.addresses = ['127.0.0.1:%d' % server.add_insecure_port('127.0.0.1:0') for server in self.servers]
+        self.servicers = [None, None]
+        for i in range(2):
+            self.start(i, terms[i])
+
+    def start(self, i, term=0):
+        """
+        Start a component on its server, in a new directory (a new server at the same address after fail)
+        """
+        role = ['primary', 'standby'][i]
+        if self.servicers[i] is not None:
+            self.servers[i] = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+            self.servers[i].add_insecure_port(self.addresses[i])
+            role = 'restarted-' + role
+
+        (self.tmp_path / role).mkdir()
+        catalog_file = write_catalog_file(self.tmp_path / role, [('Tux', '19.43', 100), ('Whale', '30.00', 100)])
+        if term > 0:
+            with open(os.path.splitext(catalog_file)[0] + '.term', 'w') as term_file:
+                term_file.write('%d' % term)
+
+        self.servicers[i] = make_servicer(catalog_file, peer=self.addresses[1 - i], role=['primary', 'standby'][i])
+        pb2_grpc.add_CatalogServicer_to_server(self.servicers[i], self.servers[i])
+        self.servers[i].start()
+
+    def fail(self, i):
+        """
+        Cut a component off from the network
+        """
+        self.servicers[i].peer_stub = unreachable()
+        if self.servicers[i].follow_stream is not None:
+            self.servicers[i].follow_stream.cancel()
+        self.servers[i].stop(None)
+
+    def stop(self):
+        for i in range(2):
+            self.fail(i)
+
+
+def order(servicer, product_name, quantity, request_id=''):
+    return servicer.Order(pb2.order(product_name=product_name, quantity=quantity, request_id=request_id), Context())
+
+
+def in_sync(primary, standby):
+    return primary.sync_replication.in_sync and standby.synced
+
+
+def test_standby_takes_over_with_every_answered_order(tmp_path):
+    pair = Pair(tmp_path)
+    primary, standby = pair.servicers
+    replica = ReplicaServicer(','.join(pair.addresses))
+    try:
+        wait_until(lambda: in_sync(primary, standby))
+        for i in range(5):
+            order(primary, 'Tux', 1, 'order-%d' % i)
+
+        pair.fail(0)
+        wait_until(lambda: standby.role == 'primary')
+        assert standby.term == 1
+        assert quantity(standby, 'Tux') == 95
+
+        # A retry gets the result of the first call, and the new primary answers orders without its standby
+        order(standby, 'Tux', 1, 'order-4')
+        order(standby, 'Whale', 2)
+        assert quantity(standby, 'Tux') == 95
+
+        # The read replica moves to the new primary
+        wait_until(lambda: replica.primary_stub is not replica.primary_stubs[0] and
+                   replica.table[1][replica.table[0]['Whale']][2] == 98)
+    finally:
+        pair.stop()
+
+
+def test_primary_cut_off_from_its_standby_steps_down_for_it(tmp_path):
+    pair = Pair(tmp_path)
+    primary, standby = pair.servicers
+    try:
+        wait_until(lambda: in_sync(primary, standby))
+        order(primary, 'Tux', 1)
+
+        # The components cannot reach each other, but the clients still reach both
+        stubs = primary.peer_stub, standby.peer_stub
+        primary.peer_stub = standby.peer_stub = unreachable()
+        standby.follow_stream.cancel()
+
+        # The old primary has no standby in sync any more, and rejects orders instead of answering
+        # orders that the new primary would not have
+        wait_until(lambda: not primary.sync_replication.in_sync)
+        with pytest.raises(Aborted) as e:
+            order(primary, 'Tux', 1)
+        assert e.value.code == grpc.StatusCode.FAILED_PRECONDITION
+
+        # Both proceed after FAILOVER_TIMEOUT: the standby takes over, and the primary proceeds alone
+        wait_until(lambda: standby.role == 'primary' and primary.alone_term == 1)
+        order(standby, 'Tux', 2)
+        order(primary, 'Whale', 1)
+
+        # Once they reach each other again, the primary that proceeded alone steps down and follows the new primary
+        primary.peer_stub, standby.peer_stub = stubs
+        wait_until(lambda: primary.role == 'standby' and in_sync(standby, primary))
+        assert standby.role == 'primary'
+        assert quantity(primary, 'Tux') == quantity(standby, 'Tux') == 97
+        assert quantity(primary, 'Whale') == quantity(standby, 'Whale') == 100
+        assert primary.term == standby.term == 1
+        assert primary.read_term() == standby.read_term() == 1
+    finally:
+        pair.stop()
+
+
+def test_primary_proceeds_alone_while_its_standby_is_down(tmp_path):
+    pair = Pair(tmp_path)
+    primary, standby = pair.servicers
+    try:
+        wait_until(lambda: in_sync(primary, standby))
+        pair.fail(1)
+
+        # Orders are rejected until the standby has been out of sync for FAILOVER_TIMEOUT
+        wait_until(lambda: not primary.sync_replication.in_sync)
+        with pytest.raises(Aborted):
+            order(primary, 'Tux', 1)
+        wait_until(lambda: primary.term == 1)
+        order(primary, 'Tux', 2)
+
+        # The restarted standby catches up with the new term, and orders wait for it again
+        pair.start(1)
+        standby = pair.servicers[1]
+        wait_until(lambda: in_sync(primary, standby))
+        assert standby.role == 'standby' and standby.term == 1
+        assert not primary.sync_replication.alone
+        order(primary, 'Tux', 3)
+        assert quantity(standby, 'Tux') == 95
+    finally:
+        pair.stop()
+
+
+def test_unacknowledged_order_is_rejected_and_replayed_on_retry(tmp_path, monkeypatch):
+    # The primary does not proceed alone during the test
+    monkeypatch.setattr(catalog, 'FAILOVER_TIMEOUT', 5)
+    pair = Pair(tmp_path)
+    primary, standby = pair.servicers
+    primary.sync_replication.timeout = 0.3
+    try:
+        wait_until(lambda: in_sync(primary, standby))
+
+        # The acknowledgements of the standby are lost: the order is applied but not answered
+        acknowledge = primary.sync_replication.acknowledge
+        primary.sync_replication.acknowledge = lambda *args: None
+        with pytest.raises(Aborted) as e:
+            order(primary, 'Tux', 3, 'lost-ack')
+        assert e.value.code == grpc.StatusCode.UNAVAILABLE
+
+        # The standby is told that it is out of sync, and orders are rejected until it is in sync again
+        wait_until(lambda: not standby.synced)
+        with pytest.raises(Aborted):
+            order(primary, 'Whale', 1)
+        primary.sync_replication.acknowledge = acknowledge
+        wait_until(lambda: in_sync(primary, standby))
+
+        # The retry gets the result of the first call instead of applying the order twice
+        assert order(primary, 'Tux', 3, 'lost-ack').order_result == 1
+        assert quantity(primary, 'Tux') == quantity(standby, 'Tux') == 97
+        assert quantity(primary, 'Whale') == 100
+    finally:
+        pair.stop()
+
+
+def test_standby_out_of_sync_does_not_take_over(tmp_path):
+    pair = Pair(tmp_path)
+    primary, standby = pair.servicers
+    primary.sync_replication.timeout = 0.3
+    try:
+        wait_until(lambda: in_sync(primary, standby))
+        primary.sync_replication.acknowledge = lambda *args: None
+        with pytest.raises(Aborted):
+            order(primary, 'Tux', 1)
+        wait_until(lambda: not standby.synced)
+
+        pair.fail(0)
+        time.sleep(2)
+        assert standby.role == 'standby'
+    finally:
+        pair.stop()
+
+
+def test_restarted_primary_of_a_newer_term_stays_the_primary(tmp_path):
+    # The standby took over (term 1) while the primary was cut off, and restarted
+    pair = Pair(tmp_path, terms=(0, 1))
+    primary, standby = pair.servicers
+    try:
+        assert standby.role == 'primary'
+        wait_until(lambda: primary.role == 'standby' and in_sync(standby, primary))
+        assert primary.term == 1
+    finally:
+        pair.stop()
+
+
+class Refusing(pb2_grpc.CatalogServicer):
+    """
+    A component that does not take orders (a standby, or a primary whose standby is out of sync)
+    """
+
+    def Order(self, request, context):
+        context.abort(grpc.StatusCode.FAILED_PRECONDITION, "standby: send orders to the primary")
+
+
+def test_failover_stub_gives_up_when_neither_component_takes_orders():
+    servers, addresses = zip(*[start_server(Refusing()) for _ in range(2)])
+    stub = FailoverStub(addresses, failover_wait=10)
+    try:
+        start = time.monotonic()
+        with pytest.raises(grpc.RpcError) as e:
+            stub.Order(pb2.order(product_name='Tux', quantity=1))
+        assert e.value.code() == grpc.StatusCode.FAILED_PRECONDITION
+        assert time.monotonic() - start < 1
+    finally:
+        for server in servers:
+            server.stop(None)
@@ -0,0 +1,110 @@
+"""
+Invalidations sent by the catalog component: coalesced batches, and the bounded push to the front-end component
+"""
+
+import threading
+import time
+from concurrent import futures
+
+from invalidation import InvalidationBatcher, InvalidationSender
+from metrics import Metrics
+
+
+def test_batcher_sends_each_product_once_with_its_latest_version():
+    metrics = Metrics()
+    batches = []
+    sent = threading.Event()
+
+    def send(product_names, versions):
+        batches.append(dict(zip(product_names, versions)))
+        sent.set()
+
+    batcher = InvalidationBatcher(send, 0.2, metrics)
+    threading.Thread(target=batcher.run, daemon=True).start()
+
+    # Versions of one product can be added out of order: the batch keeps the newest one
+    batcher.add(['Tux', 'Whale'], [3, 1])
+    batcher.add(['Tux'], [5])
+    batcher.add(['Tux', 'Lego'], [4, 2])
+    assert sent.wait(5)
+
+    assert batches == [{'Tux': 5, 'Whale': 1, 'Lego': 2}]
+    assert metrics.get('invalidations_requested') == 5
+    assert metrics.get('invalidations_sent') == 3
+    assert metrics.snapshot()['invalidation_dedup_ratio'] == 1 - 3 / 5
+
+
+class Front(object):
+    """
+    The InvalidateMany calls started by an InvalidationSender, finished by the test
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def call(self, product_names, versions, prices, quantities, resync=False):
+        future = futures.Future()
+        self.calls.append((list(product_names), resync, future))
+        return future
+
+    def sent(self):
+        return [(product_names, resync) for product_names, resync, _ in self.calls]
+
+    def finish(self, i, exception=None):
+        if exception is None:
+            self.calls[i][2].set_result(None)
+        else:
+            self.calls[i][2].set_exception(exception)
+
+
+def batch(*product_names):
+    return list(product_names), [1] * len(product_names), [100] * len(product_names), [1] * len(product_names)
+
+
+def test_sender_resyncs_when_its_queue_overflows():
+    front, metrics = Front(), Metrics()
+    sender = InvalidationSender(front.call, 1, 3, metrics)
+
+    sender.send(*batch('a'))
+    sender.send(*batch('b', 'c'))
+    assert front.sent() == [(['a'], False)]
+
+    # The next batch does not fit in the queue: the queued batches are replaced by one resync request
+    sender.send(*batch('d', 'e'))
+    sender.send(*batch('f'))
+    assert metrics.get('invalidation_push_dropped') == 5
+
+    front.finish(0)
+    assert front.sent() == [(['a'], False), ([], True)]
+    front.finish(1)
+    assert metrics.get('invalidation_push_sent') == 1
+    assert metrics.get('invalidation_push_resyncs') == 1
+
+    # Batches are sent again after the resync
+    sender.send(*batch('g'))
+    assert front.sent()[-1] == (['g'], False)
+
+
+def test_sender_resyncs_after_a_failed_call():
+    front, metrics = Front(), Metrics()
+    sender = InvalidationSender(front.call, 1, 10, metrics, retry_delay=0.1)
+
+    sender.send(*batch('a'))
+    sender.send(*batch('b'))
+    front.finish(0, RuntimeError('front-end down'))
+
+    # The failed batch and the queued batch are covered by a resync request
+    assert front.sent() == [(['a'], False), ([], True)]
+    assert metrics.get('invalidation_push_failed') == 1
+    assert metrics.get('invalidation_push_dropped') == 1
+
+    # A failed resync request is sent again after retry_delay
+    front.finish(1, RuntimeError('front-end still down'))
+    assert len(front.calls) == 2
+    deadline = time.monotonic() + 5
+    while len(front.calls) < 3:
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+    assert front.sent()[2] == ([], True)
+    front.finish(2)
+    assert metrics.get('invalidation_push_resyncs') == 1
@@ -0,0 +1,86 @@
+"""
+Pages of ListProducts on one shard and merged across shards by the front-end
+"""
+
+from conftest import pb2, Context, make_servicer, start_server, write_catalog_file, import_component
+
+
+def list_all(list_page, prefix, page_size):
+    """
+    Follow the page tokens until the last page
+    :param list_page: a function that takes (prefix, page_token, page_size) and returns (product names, next page token)
+    :return: the names of every listed product and the number of pages
+    """
+    names, pages, page_token = [], 0, ''
+    while True:
+        page, page_token = list_page(prefix, page_token, page_size)
+        names += page
+        pages += 1
+        assert len(page) <= page_size
+        if page_token == '':
+            return names, pages
+
+
+def test_pages_list_every_product_once(tmp_path):
+    products = [('Toy_%02d' % i, '1.00', 1) for i in range(25)] + [('Ball', '2.00', 1), ('Yoyo', '3.00', 1)]
+    servicer = make_servicer(write_catalog_file(tmp_path, products))
+
+    def list_page(prefix, page_token, page_size):
+        reply = servicer.ListProducts(pb2.list_request(prefix=prefix, page_token=page_token, page_size=page_size),
+                                      Context())
+        return [product.product_name for product in reply.products], reply.next_page_token
+
+    names, pages = list_all(list_page, '', 10)
+    assert names == sorted(name for name, _, _ in products)
+    assert pages == 3
+
+    names, pages = list_all(list_page, 'Toy_', 5)
+    assert names == ['Toy_%02d' % i for i in range(25)]
+    assert pages == 5
+
+
+def test_products_added_after_the_cursor_are_listed(catalog_file):
+    servicer = make_servicer(catalog_file)
+    first = servicer.ListProducts(pb2.list_request(page_size=1), Context())
+    assert [product.product_name for product in first.products] == ['Lego']
+
+    servicer.import_chunk([pb2.product_info(product_name='Abacus', price='1.00', quantity=1),
+                           pb2.product_info(product_name='Robot', price='1.00', quantity=1)])
+    rest = servicer.ListProducts(pb2.list_request(page_token=first.next_page_token, page_size=10), Context())
+
+    assert [product.product_name for product in rest.products] == ['Robot', 'Tux', 'Whale']
+    assert rest.next_page_token == ''
+
+
+def test_front_end_merges_the_pages_of_every_shard(tmp_path):
+    front_end = import_component('front-end', 'front_end')
+
+    # Each shard keeps the products it owns
+    products = [('product_%02d' % i, '10.00', i) for i in range(30)]
+    addresses, servers = [], []
+    for i in range(3):
+        (tmp_path / str(i)).mkdir()
+        server, address = start_server(make_servicer(write_catalog_file(tmp_path / str(i), [])))
+        servers.append(server)
+        addresses.append(address)
+    stub = front_end.CatalogStub(addresses)
+    owners = {name: stub.router.ring.owner(name) for name, _, _ in products}
+    for address in addresses:
+        assert any(owner == address for owner in owners.values())
+
+    try:
+        for address in addresses:
+            owned = [pb2.product_info(product_name=name, price=price, quantity=count)
+                     for name, price, count in products if owners[name] == address]
+            stub.router.stubs[address].ImportProducts(iter([pb2.product_chunk(products=owned)]))
+
+        def list_page(prefix, page_token, page_size):
+            page, last = stub.ListProducts(prefix, page_token, page_size)
+            return [name for name, _, _ in page], last
+
+        names, pages = list_all(list_page, 'product_', 7)
+        assert names == [name for name, _, _ in products]
+        assert pages == 5
+    finally:
+        for server in servers:
+            server.stop(None)
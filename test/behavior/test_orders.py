@@ -0,0 +1,125 @@
+"""
+Orders with request IDs: replays, cancellations, and the cross-shard OrderMany failure path
+"""
+
+import grpc
+import pytest
+
+from conftest import pb2, Context, make_servicer, quantity, start_server, write_catalog_file, import_component
+
+
+def order_list(items, request_id):
+    return pb2.order_list(orders=[pb2.order(product_name=name, quantity=n) for name, n in items], request_id=request_id)
+
+
+def test_retried_order_is_replayed(catalog_file):
+    servicer = make_servicer(catalog_file)
+    message = pb2.order(product_name='Tux', quantity=3, request_id='order-1')
+
+    first = servicer.Order(message, Context())
+    retry = servicer.Order(message, Context())
+
+    assert first.order_result == retry.order_result == 1
+    assert list(retry.price_cents) == [1943]
+    assert quantity(servicer, 'Tux') == 97
+
+
+def test_orders_without_request_id_are_applied_every_time(catalog_file):
+    servicer = make_servicer(catalog_file)
+    message = pb2.order(product_name='Tux', quantity=3)
+
+    servicer.Order(message, Context())
+    servicer.Order(message, Context())
+
+    assert quantity(servicer, 'Tux') == 94
+
+
+def test_cancelled_order_many_is_applied_again_on_retry(catalog_file):
+    servicer = make_servicer(catalog_file)
+    message = order_list([('Tux', 5), ('Whale', 1)], 'cart-1')
+
+    assert servicer.OrderMany(message, Context()).order_result == 1
+    assert servicer.CancelMany(message, Context()).order_result == 1
+    assert (quantity(servicer, 'Tux'), quantity(servicer, 'Whale')) == (100, 100)
+
+    # The retry takes the products again instead of replaying the cancelled order
+    assert servicer.OrderMany(message, Context()).order_result == 1
+    assert (quantity(servicer, 'Tux'), quantity(servicer, 'Whale')) == (95, 99)
+
+    # A replay of the retry is still applied once
+    assert servicer.OrderMany(message, Context()).order_result == 1
+    assert quantity(servicer, 'Tux') == 95
+
+    # A second cancellation gives the products back again instead of replaying the first one
+    assert servicer.CancelMany(message, Context()).order_result == 1
+    assert (quantity(servicer, 'Tux'), quantity(servicer, 'Whale')) == (100, 100)
+
+
+def test_failed_order_many_changes_nothing(catalog_file):
+    servicer = make_servicer(catalog_file)
+
+    result = servicer.OrderMany(order_list([('Tux', 1), ('Lego', 6)], 'cart-2'), Context())
+
+    assert result.order_result == -1
+    assert (quantity(servicer, 'Tux'), quantity(servicer, 'Lego')) == (100, 5)
+
+
+class FailingShard(object):
+    """
+    Wraps the OrderMany handler of a servicer so that the next calls fail with UNAVAILABLE
+    """
+
+    def __init__(self, servicer):
+        self.failures = 0
+        self.order_many = servicer.OrderMany
+        servicer.OrderMany = self.OrderMany
+
+    def OrderMany(self, request, context):
+        if self.failures > 0:
+            self.failures -= 1
+            context.abort(grpc.StatusCode.UNAVAILABLE, 'shard down')
+        return self.order_many(request, context)
+
+
+def test_cross_shard_order_failure_then_retry(tmp_path):
+    order = import_component('order', 'order')
+
+    # Two shards with the same products; each product is only used on the shard that owns it
+    products = [('product_%d' % i, '10.00', 100) for i in range(20)]
+    servicers = []
+    for i in range(2):
+        (tmp_path / str(i)).mkdir()
+        servicers.append(make_servicer(write_catalog_file(tmp_path / str(i), products)))
+    failing = FailingShard(servicers[1])
+    servers = [start_server(servicer) for servicer in servicers]
+    addresses = [address for _, address in servers]
+    by_address = dict(zip(addresses, servicers))
+
+    try:
+        stub = order.CatalogStub(addresses)
+        owners = {name: stub.router.ring.owner(name) for name, _, _ in products}
+        first = next(name for name, owner in owners.items() if owner == addresses[0])
+        second = next(name for name, owner in owners.items() if owner == addresses[1])
+        items = [(first, 2), (second, 3)]
+
+        # The second shard fails: the first shard is cancelled and the order fails
+        failing.failures = 1
+        with pytest.raises(grpc.RpcError):
+            stub.OrderMany(items, 'buy-1')
+        assert quantity(by_address[addresses[0]], first) == 100
+        assert quantity(by_address[addresses[1]], second) == 100
+
+        # The retry with the same request ID takes the products of both shards
+        order_result, prices = stub.OrderMany(items, 'buy-1')
+        assert order_result == 1
+        assert prices == [1000, 1000]
+        assert quantity(by_address[addresses[0]], first) == 98
+        assert quantity(by_address[addresses[1]], second) == 97
+
+        # A replay of the successful retry does not take them again
+        assert stub.OrderMany(items, 'buy-1')[0] == 1
+        assert quantity(by_address[addresses[0]], first) == 98
+        assert quantity(by_address[addresses[1]], second) == 97
+    finally:
+        for server, _ in servers:
+            server.stop(None)
@@ -0,0 +1,40 @@
+"""
+Recovery of the order log between order components (RequestMissingLogs rpc call)
+"""
+
+import threading
+from concurrent import futures
+
+import grpc
+
+from conftest import import_component
+
+
+class OrderLog(object):
+    """
+    The parts of an OrderServicer that the recovery service reads and fills in
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self.order_number = max(log, default=-1) + 1
+        lock = threading.Lock()
+        self.log_reader_lock = self.log_writer_lock = self.order_number_lock = lock
+
+
+def test_missing_orders_are_recovered_with_their_prices():
+    order = import_component('order', 'order')
+    online = OrderLog({0: [('Tux', 2, 1943)], 1: [('Whale', 1, 3000), ('Lego', 3, 2500)]})
+    recovering = OrderLog({})
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    order.order2_pb2_grpc.add_RecoveryServicer_to_server(order.RecoveryServicer(online), server)
+    port = server.add_insecure_port('127.0.0.1:0')
+    server.start()
+    try:
+        order.RecoveryStub('127.0.0.1', port, 2, recovering).RequestMissingLogs([0, 1])
+    finally:
+        server.stop(None)
+
+    assert recovering.log == online.log
+    assert recovering.order_number == 2
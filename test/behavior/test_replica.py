@@ -0,0 +1,60 @@
+"""
+Read replicas: staleness under a steady stream of mutations
+"""
+
+import time
+
+import grpc
+import pytest
+
+from conftest import pb2, pb2_grpc, Context, Aborted, start_server
+from replica import ReplicaServicer
+
+
+class SteadyPrimary(pb2_grpc.CatalogServicer):
+    """
+    A primary whose mutation stream is always a few mutations ahead of the replica
+    (the replica never receives the last mutation of the primary, like under sustained writes)
+    """
+
+    def __init__(self, ahead, rate):
+        self.ahead, self.rate = ahead, rate
+
+    def Replicate(self, request, context):
+        product = pb2.product_info(product_name='Tux', price='19.43', price_cents=1943, quantity=100, version=1)
+        yield pb2.replication_event(epoch=1, sequence=0, products=[product], snapshot=True, snapshot_done=True,
+                                    primary_sequence=self.ahead)
+        sequence = 0
+        while context.is_active():
+            time.sleep(1 / self.rate)
+            sequence += 1
+            product = pb2.product_info(product_name='Tux', price='19.43', price_cents=1943, quantity=100 - sequence,
+                                       version=1 + sequence)
+            yield pb2.replication_event(epoch=1, sequence=sequence, products=[product],
+                                        primary_sequence=sequence + self.ahead)
+
+
+def test_replica_behind_by_a_few_mutations_keeps_answering():
+    server, address = start_server(SteadyPrimary(ahead=5, rate=50))
+    try:
+        replica = ReplicaServicer(address, max_staleness=1)
+        time.sleep(2)
+
+        # The replica has what the primary had 5 mutations (0.1 seconds) ago
+        result = replica.Query(pb2.product(product_name='Tux'), Context())
+        assert result.staleness < 0.5
+        assert replica.metrics.snapshot()['replication_lag_mutations'] == 5
+    finally:
+        server.stop(None)
+
+
+def test_replica_rejects_queries_when_the_primary_goes_silent():
+    server, address = start_server(SteadyPrimary(ahead=5, rate=50))
+    replica = ReplicaServicer(address, max_staleness=0.5)
+    time.sleep(1)
+    server.stop(None)
+    time.sleep(1)
+
+    with pytest.raises(Aborted) as e:
+        replica.Query(pb2.product(product_name='Tux'), Context())
+    assert e.value.code == grpc.StatusCode.UNAVAILABLE
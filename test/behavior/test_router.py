@@ -0,0 +1,79 @@
+"""
+Placement of products on the consistent-hash ring of the catalog shards, and orders split across shards
+"""
+
+from conftest import make_servicer, quantity, start_server, write_catalog_file, import_component
+from catalog_router import HashRing, CatalogRouter
+
+PRODUCTS = ['product_%d' % i for i in range(2000)]
+
+
+def owners(ring):
+    return {product_name: ring.owner(product_name) for product_name in PRODUCTS}
+
+
+def test_placement_does_not_depend_on_the_order_of_the_shards():
+    shards = ['127.0.0.1:%d' % port for port in range(1130, 1134)]
+    assert owners(HashRing(shards)) == owners(HashRing(list(reversed(shards))))
+
+    # Every shard owns a fair share of the products
+    counts = list(owners(HashRing(shards)).values())
+    assert all(len(PRODUCTS) / 8 < counts.count(shard) < len(PRODUCTS) / 2 for shard in shards)
+
+
+def test_adding_a_shard_only_moves_products_to_it():
+    shards = ['127.0.0.1:%d' % port for port in range(1130, 1133)]
+    before = owners(HashRing(shards))
+    after = owners(HashRing(shards + ['127.0.0.1:1133']))
+
+    moved = [product_name for product_name in PRODUCTS if before[product_name] != after[product_name]]
+    assert all(after[product_name] == '127.0.0.1:1133' for product_name in moved)
+    assert len(PRODUCTS) / 8 < len(moved) < len(PRODUCTS) / 2
+
+    # Removing the shard again moves the products back to their first owners
+    assert owners(HashRing(shards)) == before
+
+
+def test_split_groups_products_by_shard_in_order():
+    router = CatalogRouter(['127.0.0.1:1130', '127.0.0.1:1131', '127.0.0.1:1132'])
+    names = PRODUCTS[:50]
+
+    groups = router.split(names)
+    assert sorted(name for _, _, group in groups for name in group) == sorted(names)
+    for shard, stub, group in groups:
+        assert stub is router.stubs[shard]
+        assert all(router.ring.owner(name) == shard for name in group)
+        assert group == [name for name in names if name in group]
+
+
+def test_order_many_sends_each_shard_its_line_items(tmp_path):
+    order = import_component('order', 'order')
+    products = [('product_%d' % i, '1.00', 10) for i in range(20)]
+
+    servicers, servers, addresses = [], [], []
+    for i in range(2):
+        (tmp_path / str(i)).mkdir()
+        servicer = make_servicer(write_catalog_file(tmp_path / str(i), products))
+        server, address = start_server(servicer)
+        servicers.append(servicer)
+        servers.append(server)
+        addresses.append(address)
+
+    try:
+        stub = order.CatalogStub(addresses)
+        owner = stub.router.ring.owner
+        items = [(name, 1) for name, _, _ in products[:10]] + [(products[0][0], 2)]
+        assert len(set(owner(name) for name, _ in items)) == 2
+
+        order_result, prices = stub.OrderMany(items, 'cart-1')
+        assert order_result == 1
+        assert prices == [100] * len(items)
+
+        # Each shard applied only the line items of the products it owns
+        for servicer, address in zip(servicers, addresses):
+            for name, _, _ in products[:10]:
+                ordered = sum(n for item, n in items if item == name) if owner(name) == address else 0
+                assert quantity(servicer, name) == 10 - ordered
+    finally:
+        for server in servers:
+            server.stop(None)